@@ -4,61 +4,47 @@
 # -----------------------------------------------
 # Requiere: streamlit, sqlmodel, reportlab, psycopg2-binary (si usas Postgres)
 # Archiva automáticamente el 5 de cada mes (gracia hasta el día 4 para editar mes anterior).
+from __future__ import annotations  # anotaciones con pd.* sin importar pandas al definir
+
+from time import perf_counter
+_t_imports = perf_counter()
 
 import os
-import io
-from pathlib import Path
-from datetime import date, time, datetime, timedelta
-from zoneinfo import ZoneInfo
+from functools import partial
+from datetime import date, time, timedelta
 
-import pandas as pd
 import streamlit as st
-from sqlmodel import Session, select
 from sqlalchemy import text
 
+from config import (
+    hoy_local, DB_URL, DATA_DIR_PICK_S, REPLICA_LOCAL, RUTA_REPLICA, CARPETA_CACHE_PDF, EMPLEADO_DEFECTO,
+    EMPLEADOS_PERMITIDOS, carpeta_reportes_empleado,
+    TITULO_APP, UMBRAL_DIARIO_H, DESCANSO_DEFECTO_MIN, UMBRAL_SEMANAL_H,
+    GRACIA_DIAS, AVISO_ULTIMOS_DIAS, PDF_WORKERS, CARPETA_EXPORTACIONES, EXPORTACION_MAX_EDAD_S,
+    EXPORTACION_WORKERS,
+)
 from domain import WorkShift
-from repository import WorkShiftRepository, WorkShiftDB
-
-# =========================
-# Zona horaria (Madrid)
-# =========================
-TZ = ZoneInfo("Europe/Madrid")
-
-def hoy_local() -> date:
-    return datetime.now(TZ).date()
-
-# =========================
-# Persistencia por entorno (con fallback seguro)
-# =========================
-def _pick_data_dir() -> Path:
-    """
-    Elige carpeta escribible para DB/PDFs:
-    1) Si DATA_DIR está definido y es escribible, se usa.
-    2) Si /data es escribible (disco montado), se usa.
-    3) Si no, ./data en el working dir.
-    """
-    candidates = []
-    env = os.getenv("DATA_DIR")
-    if env:
-        candidates.append(Path(env))
-    candidates += [Path("/data"), Path.cwd() / "data"]
-
-    for p in candidates:
-        try:
-            p.mkdir(parents=True, exist_ok=True)
-            t = p / ".rwtest"
-            t.write_text("ok")
-            t.unlink(missing_ok=True)
-            return p
-        except Exception:
-            continue
-    return Path.cwd()  # último recurso
-
-# app.py (fragmento)
-DATA_DIR = _pick_data_dir()
-DEFAULT_SQLITE = f"sqlite:///{(DATA_DIR / 'workhours.db').as_posix()}"
-
-DB_URL = os.getenv("DATABASE_URL", DEFAULT_SQLITE)
+from services import WorkHoursCalculator
+from repository import WorkShiftRepository, validate_employee_id
+from replica import ReplicatedWorkShiftRepository
+from snapshots import MonthSnapshotCache
+from pdf_cache import PdfCache
+from formatting import TIME_OPTIONS, ajusta_columna_a_opciones
+from reports import (
+    MonthReports, formatea_minutos_signed, formatea_horas_float,
+    mes_en_letras_esp, clave_mes, yyyymm_to_tuple,
+)
+from archiver import EmployeeArchivers
+from pdf_jobs import PdfJobs
+from export import export_zip, limpia_exportaciones, meses_del_anio, nuevo_zip_temporal
+from lazy import lazy_module, preload
+import perf
+
+# Arranque en frío: pandas (~1 s) se importa en segundo plano mientras se conecta la BD
+pd = lazy_module("pandas")
+preload("pandas")
+perf.STARTUP.add("imports", perf_counter() - _t_imports)
+perf.STARTUP.add("data_dir", DATA_DIR_PICK_S)
 
 # Si estás en Render/Spaces/Streamlit Cloud deberías tener siempre DATABASE_URL.
 # Opcional: si detectas plataforma, exige Postgres.
@@ -69,66 +55,83 @@ if "RENDER" in os.environ or "SPACE_ID" in os.environ or os.getenv("STREAMLIT_RU
 
 @st.cache_resource
 def get_repo(url: str, buster: str):
-    return WorkShiftRepository(url, echo=False)
-
-print("DATABASE_URL =", DB_URL)  # verás esto en los logs de Render
-repo = get_repo(DB_URL, buster=DB_URL)
+    if REPLICA_LOCAL:
+        # Lecturas y escrituras en la réplica; el hilo de sync sube/baja cambios con `url`
+        repo = ReplicatedWorkShiftRepository(url, RUTA_REPLICA)
+        repo.start_sync()
+        print("DATABASE_URL =", repo.sync_status()["remote"], "· réplica local", RUTA_REPLICA)
+    else:
+        repo = WorkShiftRepository(url, echo=False)
+        print("DATABASE_URL =", repo.engine.url.render_as_string(hide_password=True))  # verás esto en los logs de Render
+    for fase, segundos in repo.startup_s.items():
+        perf.STARTUP.add(fase, segundos)
+    return repo
+
+def _nuevos_reports(repo_empleado: WorkShiftRepository) -> MonthReports:
+    # Compartidos entre sesiones del mismo empleado: un mes se consulta una vez por versión de datos
+    with perf.STARTUP.phase("reports"):
+        snapshots = MonthSnapshotCache(repo_empleado, max_entries=6)
+        # Subcarpeta propia: el límite de disco de cada caché cuenta solo sus PDFs
+        pdfs = PdfCache(CARPETA_CACHE_PDF / repo_empleado.employee_id, max_memory_items=8)
+        return MonthReports(snapshots, pdfs)
 
-# Carpeta de PDFs (si falla, cae a ./reportes_mensuales)
-CARPETA_REPORTES = DATA_DIR / "reportes_mensuales"
-try:
-    CARPETA_REPORTES.mkdir(parents=True, exist_ok=True)
-except Exception:
-    CARPETA_REPORTES = Path.cwd() / "reportes_mensuales"
-    CARPETA_REPORTES.mkdir(parents=True, exist_ok=True)
+@st.cache_resource
+def get_archivers(_repo: WorkShiftRepository, buster: str) -> EmployeeArchivers:
+    # Informes y archivador por empleado (solo empleados válidos, ver empleado_actual)
+    # y un único hilo de archivado por proceso que recorre a todos
+    with perf.STARTUP.phase("archiver"):
+        archivers = EmployeeArchivers(_repo, _nuevos_reports, carpeta_reportes_empleado, grace_days=GRACIA_DIAS)
+        archivers.start_background()
+    return archivers
 
-# =========================
-# Parámetros globales
-# =========================
-TITULO_APP = "Registro horas Rorfeny "
-UMBRAL_DIARIO_H = 6.0              # objetivo diario (descanso ya descontado)
-DESCANSO_DEFECTO_MIN = 30          # minutos descanso por defecto
-UMBRAL_SEMANAL_H = 30.0            # contrato: 30 h/semana
-GRACIA_DIAS = 4                    # puedes editar el mes anterior hasta el día 4
-AVISO_ULTIMOS_DIAS = 2             # aviso cuando queden <= 2 días de mes
+@st.cache_resource
+def get_pdf_jobs(buster: str) -> PdfJobs:
+    # Un pool por proceso para todas las sesiones: acota los renders simultáneos
+    return PdfJobs(max_workers=PDF_WORKERS)
 
-# Salario (solo para PDF)
-HOURLY_GROSS_EUR = 13.30           # €/h brutos
-IRPF_EST_PERCENT = 0.15            # IRPF aproximado
+def empleado_actual(repo_base: WorkShiftRepository) -> str:
+    """
+    Empleado de la URL (?empleado=<id>) o el de por defecto. Solo se aceptan empleados
+    con turnos en la BD o en EMPLEADOS_PERMITIDOS: cada empleado abierto reserva
+    cachés y carpeta para todo el proceso.
+    """
+    empleado = st.query_params.get("empleado") or EMPLEADO_DEFECTO
+    try:
+        validate_employee_id(empleado)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    if st.session_state.get("_empleado_ok") == empleado:
+        return empleado
+    if (empleado != EMPLEADO_DEFECTO and empleado not in EMPLEADOS_PERMITIDOS
+            and not repo_base.for_employee(empleado).has_shifts()):
+        st.error(f"Empleado desconocido: {empleado!r}.")
+        st.stop()
+    st.session_state["_empleado_ok"] = empleado
+    return empleado
+
+# Instrumentación: una línea JSON por rerun en los logs con PERF_LOG=1 (ver perf.py)
+_rerun_previo = st.session_state.pop("_perf_rerun", None)
+if _rerun_previo is not None:
+    # El rerun anterior se cortó con st.rerun()/st.stop(): se registra igualmente
+    perf.emit(_rerun_previo.finish(interrupted=True))
+rerun_stats = perf.begin("rerun")
+st.session_state["_perf_rerun"] = rerun_stats
+
+with perf.span("arranque"):
+    repo_base = get_repo(DB_URL, buster=DB_URL)
+    empleado = empleado_actual(repo_base)
+    repo = repo_base.for_employee(empleado)
+    perf.instrument_engine(repo.engine)
+    archiver = get_archivers(repo_base, buster=DB_URL).get(empleado)
+    reports = archiver.reports
+    snapshots = reports.snapshots
+    pdf_jobs = get_pdf_jobs(buster=DB_URL)
+rerun_stats.fields["employee"] = empleado
 
 # =========================
 # Utilidades de formato/tiempo
 # =========================
-def formatea_minutos_signed(minutos: int) -> str:
-    if minutos == 0:
-        return "0 min"
-    sign = "-" if minutos < 0 else ""
-    minutos = abs(int(minutos))
-    h, m = divmod(minutos, 60)
-    if h == 0:
-        return f"{sign}{m} min"
-    if m == 0:
-        return f"{sign}{h} h"
-    return f"{sign}{h} h {m} min"
-
-def formatea_minutos(minutos: int) -> str:
-    minutos = max(0, int(minutos))
-    h, m = divmod(minutos, 60)
-    if h == 0:
-        return f"{m} min"
-    if m == 0:
-        return f"{h} h"
-    return f"{h} h {m} min"
-
-def horas_float_a_minutos(horas: float) -> int:
-    return int(round(float(horas) * 60))
-
-def formatea_horas_float(horas: float) -> str:
-    return formatea_minutos(horas_float_a_minutos(horas))
-
-def eur(x: float) -> str:
-    return f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
 def parse_hhmm(s: str) -> time | None:
     try:
         hh, mm = s.strip().split(":")
@@ -136,56 +139,19 @@ def parse_hhmm(s: str) -> time | None:
     except Exception:
         return None
 
-def opciones_horas(step_min: int = 5, start: str = "06:00", end: str = "00:00") -> list[str]:
-    """Opciones HH:MM cada step_min, de start a 23:55 + 00:00 final."""
-    sh, sm = map(int, start.split(":"))
-    opts = []
-    for h in range(sh, 24):
-        for m in range(0, 60, step_min):
-            if h == sh and m < sm:
-                continue
-            opts.append(f"{h:02d}:{m:02d}")
-    if end == "00:00" and (not opts or opts[-1] != "00:00"):
-        opts.append("00:00")
-    return opts
-
-TIME_OPTIONS = opciones_horas(5, "06:00", "00:00")
-
-def mes_en_letras_esp(yyyy_mm: str) -> str:
-    meses = ["Enero","Febrero","Marzo","Abril","Mayo","Junio","Julio",
-             "Agosto","Septiembre","Octubre","Noviembre","Diciembre"]
-    y, m = yyyy_mm.split("-")
-    return f"Mes de {meses[int(m)-1]} {y}"
-
-def clave_mes(d: date) -> str:
-    return f"{d.year:04d}-{d.month:02d}"
-
-def yyyymm_to_tuple(yyyy_mm: str) -> tuple[int, int]:
-    y, m = yyyy_mm.split("-")
-    return int(y), int(m)
-
-def rango_mes(yyyy_mm: str) -> tuple[date, date]:
-    y, m = map(int, yyyy_mm.split("-"))
-    d1 = date(y, m, 1)
-    d2 = (date(y+1, 1, 1) - timedelta(days=1)) if m == 12 else (date(y, m+1, 1) - timedelta(days=1))
-    return d1, d2
-
 # =========================
-# Cálculo de horas (con fecha base en TZ Madrid)
+# Cálculo de horas (reglas en services.WorkHoursCalculator)
 # =========================
-def calcular_horas_trabajadas(start: time, end: time, break_min: int, base_date: date | None = None) -> float:
-    d = base_date or hoy_local()
-    t0 = datetime.combine(d, start)
-    t1 = datetime.combine(d, end)
-    if t1 < t0:
-        t1 += timedelta(days=1)
-    total = (t1 - t0).total_seconds() / 3600.0
-    total -= max(0, int(break_min)) / 60.0
-    return round(max(0.0, total), 2)
+calc = WorkHoursCalculator(daily_threshold=UMBRAL_DIARIO_H, weekly_threshold=UMBRAL_SEMANAL_H)
 
 def delta_diario_horas(hours_worked: float) -> float:
     return round(hours_worked - UMBRAL_DIARIO_H, 2)
 
+def minutos_del_dia(col: pd.Series) -> pd.Series:
+    """'HH:MM' -> minutos desde medianoche (float, NaN si no es una hora válida)."""
+    partes = col.astype(str).str.strip().str.extract(r"^(\d{1,2}):(\d{2})$").astype(float)
+    return (partes[0] * 60 + partes[1]).where((partes[0] < 24) & (partes[1] < 60))
+
 # =========================
 # Configuración de página + encabezado responsive
 # =========================
@@ -214,9 +180,32 @@ st.markdown("""
 
 st.markdown(f'<div class="app-header">⏱️ {TITULO_APP}</div>', unsafe_allow_html=True)
 st.caption("Mes actual: añade/edita tus horas. Meses anteriores: descárgalos en PDF. L–V por defecto; fines de semana manual.")
+if empleado != EMPLEADO_DEFECTO:
+    st.caption(f"Empleado: **{empleado}**")
 
-# === Indicador de conexión a BD (barra lateral) ===
+# === Indicador de conexión a BD (barra lateral, en el panel de depuración) ===
+def indicador_conexion_bd() -> None:
+    url = repo.engine.url
+    destino = "SQLite (local)" if url.get_backend_name() == "sqlite" else f"Postgres · {url.host}"
+    try:
+        t0 = perf_counter()
+        with repo.engine.connect() as conn:
+            conn.execute(text("select 1"))
+        st.success(f"BD conectada · {destino} · {(perf_counter() - t0) * 1000:.0f} ms", icon="🟢")
+    except Exception as e:
+        st.error(f"Sin conexión a BD · {destino}: {type(e).__name__}", icon="🔴")
+    if isinstance(repo, ReplicatedWorkShiftRepository):
+        estado = repo.sync_status()
+        if estado["last_error"]:
+            st.warning(f"Réplica sin sincronizar ({estado['pending']} pendientes): {estado['last_error']}", icon="🟠")
+        else:
+            st.caption(f"Réplica local → {estado['remote']} · {estado['pending']} pendientes de subir")
+        if estado["conflicts"]:
+            st.warning(f"{estado['conflicts']} edición(es) no subidas: el día ya había cambiado en el remoto "
+                       "(guardadas en replica_conflicts)", icon="⚠️")
 
+def panel_depuracion_activo() -> bool:
+    return st.query_params.get("debug") == "1" or os.getenv("DEBUG_PANEL") == "1"
 
 # =========================
 # Helpers de estado (sin conflictos)
@@ -241,392 +230,333 @@ def selectbox_state(label: str, key: str, default_value: str, options: list[str]
 # BD helpers
 # =========================
 def existe_registro(d: date) -> bool:
-    with Session(repo.engine) as s:
-        return s.exec(select(WorkShiftDB).where(WorkShiftDB.work_date == d)).first() is not None
+    return repo.exists(d)
 
-def listar_meses_con_registros() -> set[str]:
-    with Session(repo.engine) as s:
-        filas = s.exec(select(WorkShiftDB)).all()
-    return {clave_mes(f.work_date) for f in filas}
+def listar_meses_con_registros() -> frozenset[str]:
+    return snapshots.months_with_data()
 
 def cargar_hist_df_de_mes(yyyy_mm: str) -> pd.DataFrame:
-    d1, d2 = rango_mes(yyyy_mm)
-    with Session(repo.engine) as s:
-        filas = s.exec(
-            select(WorkShiftDB)
-            .where(WorkShiftDB.work_date >= d1, WorkShiftDB.work_date <= d2)
-            .order_by(WorkShiftDB.work_date.desc(), WorkShiftDB.id.desc())
-        ).all()
-    # Quedarse con el último registro de cada día
-    vistos, dedup = set(), []
-    for f in filas:
-        if f.work_date in vistos:
-            continue
-        vistos.add(f.work_date)
-        dedup.append(f)
-    dias = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
-    rows = []
-    for f in dedup:
-        hw = float(f.hours_worked or 0.0)
-        delta_min = int(round((hw - UMBRAL_DIARIO_H) * 60))
-        rows.append({
-            "ID": f.id,
-            "Fecha": f.work_date.isoformat(),
-            "Día": dias[f.work_date.weekday()],
-            "Inicio": f.start_time.strftime("%H:%M"),
-            "Fin": f.end_time.strftime("%H:%M"),
-            "Descanso (min)": int(f.break_minutes),
-            "Horas": round(hw, 2),
-            "Extras (min)": delta_min,
-            "Extras": formatea_minutos_signed(delta_min),
-            "Notas": f.notes or ""
-        })
-    return pd.DataFrame(rows)
+    return reports.hist_df(yyyy_mm)
 
 # =========================
-# PDF (bordes + caja resumen estrecha centrada)
+# PDF (tabla + resumen; ver reports.py)
 # =========================
-def dataframe_a_pdf(df: pd.DataFrame, titulo: str, resumen_linea1: str | None = None, resumen_linea2: str | None = None) -> bytes:
+def construir_df_para_pdf_mes(yyyy_mm: str) -> tuple[pd.DataFrame, float, int]:
+    return reports.df_para_pdf(yyyy_mm)
+
+def pdf_del_mes(yyyy_mm: str, wait_s: float = 0.0) -> bytes | None:
+    """
+    PDF del mes desde la caché; si cambió su contenido se renderiza en el pool de fondo.
+    None = aún preparándose (no bloquea el rerun más de `wait_s`).
+    """
+    clave, render = reports.pdf_job(yyyy_mm)
     try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Table as RTable
-        from reportlab.platypus import TableStyle as RTableStyle
-    except Exception:
-        st.error("La exportación a PDF requiere 'reportlab'. Instala: pip install reportlab")
+        pdf = pdf_jobs.request(clave, reports.pdf_cache, render, wait_s=wait_s)
+    except Exception as e:
+        st.error(f"No se pudo generar el PDF: {type(e).__name__}: {e}")
         return b""
-
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=landscape(A4), topMargin=24, bottomMargin=24, leftMargin=24, rightMargin=24)
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(name="TitleCentered", parent=styles["Title"], alignment=TA_CENTER)
-    resumen_main_style = ParagraphStyle(
-        name="ResumenMain", parent=styles["Normal"], alignment=TA_CENTER,
-        textColor=colors.black, fontSize=11, leading=13, spaceBefore=4, spaceAfter=2
-    )
-    resumen_salary_style = ParagraphStyle(
-        name="ResumenSalary", parent=styles["Normal"], alignment=TA_CENTER,
-        textColor=colors.black, fontSize=10, leading=12, spaceBefore=0, spaceAfter=0
+    if pdf is not None and not pdf:
+        st.error("La exportación a PDF requiere 'reportlab'. Instala: pip install reportlab")
+    return pdf
+
+def boton_pdf_mes(yyyy_mm: str, pdf_bytes: bytes | None) -> None:
+    st.download_button(
+        "Descargar PDF del mes mostrado",
+        data=pdf_bytes or b"",
+        file_name=f"reporte_{yyyy_mm}.pdf",
+        mime="application/pdf",
+        disabled=not pdf_bytes,
+        width="stretch",
     )
-    story = [Paragraph(titulo, title_style), Spacer(1, 8)]
-    if df.empty:
-        story.append(Paragraph("Sin datos para mostrar.", styles["Normal"]))
-    else:
-        data = [list(df.columns)] + df.values.tolist()
-        table = Table(data, repeatRows=1, hAlign="CENTER")
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#F5F5F7")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#E0E0E0")),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ]))
-        story.append(table)
-    if resumen_linea1 or resumen_linea2:
-        story += [Spacer(1, 12)]
-        celulas = []
-        if resumen_linea1:
-            celulas.append([Paragraph(resumen_linea1, resumen_main_style)])
-        if resumen_linea2:
-            celulas.append([Paragraph(resumen_linea2, resumen_salary_style)])
-        summary_width = min(520, 0.65 * (doc.width))
-        resumen_box = RTable(celulas, colWidths=[summary_width], hAlign="CENTER")
-        resumen_box.setStyle(RTableStyle([
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("BACKGROUND", (0, 0), (-1, -1), colors.white),
-            ("BOX", (0, 0), (-1, -1), 0.6, colors.HexColor("#C7CCD6")),
-            ("INNERPADDING", (0, 0), (-1, -1), 8),
-        ]))
-        story.append(resumen_box)
-    def draw_page_border(canvas, doc_obj):
-        canvas.saveState()
-        w, h = doc_obj.pagesize
-        canvas.setStrokeColor(colors.HexColor("#C7CCD6"))
-        canvas.setLineWidth(0.8)
-        margin = 12
-        canvas.rect(margin, margin, w - 2*margin, h - 2*margin)
-        canvas.restoreState()
-    doc.build(story, onFirstPage=draw_page_border, onLaterPages=draw_page_border)
-    return buf.getvalue()
 
-def construir_df_para_pdf_mes(yyyy_mm: str) -> tuple[pd.DataFrame, float, int]:
-    df_num = cargar_hist_df_de_mes(yyyy_mm)
-    if df_num.empty:
-        return df_num, 0.0, 0
-    df_tbl = df_num[["Fecha","Día","Inicio","Fin","Descanso (min)","Horas","Extras","Notas"]].copy()
-    df_tbl["Horas (h:min)"] = df_tbl["Horas"].apply(formatea_horas_float)
-    df_tbl = df_tbl.drop(columns=["Horas"]).rename(columns={"Horas (h:min)": "Horas"})
-    horas_mes = float(df_num["Horas"].sum())
-    extras_mes_min = int(df_num["Extras (min)"].sum())
-    return df_tbl, horas_mes, extras_mes_min
-
-def generar_pdf_mes(yyyy_mm: str) -> bytes:
-    df_tbl, horas_mes, extras_mes_min = construir_df_para_pdf_mes(yyyy_mm)
-    titulo_pdf = f"{TITULO_APP} — {mes_en_letras_esp(yyyy_mm)}"
-    bruto_mes = horas_mes * HOURLY_GROSS_EUR
-    neto_mes = bruto_mes * (1 - IRPF_EST_PERCENT)
-    l1 = f"Horas extras acumuladas del mes: {formatea_minutos_signed(extras_mes_min)}"
-    l2 = f"Total bruto del mes: {eur(bruto_mes)} € · Total neto estimado: {eur(neto_mes)} €"
-    return dataframe_a_pdf(df_tbl, titulo=titulo_pdf, resumen_linea1=l1, resumen_linea2=l2)
+@st.fragment(run_every=1.0)
+def pdf_preparandose(yyyy_mm: str) -> None:
+    # Solo este fragmento se reejecuta mientras el render sigue en marcha
+    fallido = f"_pdf_fallido_{empleado}"
+    clave, _ = reports.pdf_job(yyyy_mm)
+    if st.session_state.get(fallido) == clave:
+        # Ya falló con este contenido: no se vuelve a pedir hasta que cambien los datos
+        st.error("No se pudo generar el PDF de este mes.")
+        boton_pdf_mes(yyyy_mm, None)
+        return
+    pdf_bytes = pdf_del_mes(yyyy_mm)
+    if pdf_bytes is None:
+        boton_pdf_mes(yyyy_mm, None)
+        st.caption("⏳ Preparando el PDF… la descarga se activará en cuanto esté listo.")
+    elif pdf_bytes:
+        st.rerun()  # listo: la página completa pinta el botón normal y deja de sondear
+    else:
+        # Error ya mostrado por pdf_del_mes; un rerun aquí volvería a sondear sin fin
+        st.session_state[fallido] = clave
+        boton_pdf_mes(yyyy_mm, None)
 
 # =========================
 # Avisos y archivado automático
 # =========================
-hoy = hoy_local()
-mes_actual = clave_mes(hoy)
-prev_day = (date(hoy.year, hoy.month, 1) - timedelta(days=1))
-mes_anterior = clave_mes(prev_day)
-last_day_curr = (date(hoy.year+1, 1, 1) - timedelta(days=1)) if hoy.month == 12 else (date(hoy.year, hoy.month+1, 1) - timedelta(days=1))
-dias_restantes = (last_day_curr - hoy).days
-
-# Avisos
-if dias_restantes <= AVISO_ULTIMOS_DIAS and dias_restantes >= 0:
-    st.info(f"Este mes se **archivará automáticamente el día {GRACIA_DIAS+1} del próximo mes**. Aún puedes editar hasta final de mes.", icon="ℹ️")
-if 1 <= hoy.day <= GRACIA_DIAS:
-    st.warning(f"⏳ Puedes **editar el mes anterior** ({mes_en_letras_esp(mes_anterior)}) hasta el día {GRACIA_DIAS}.", icon="⏰")
-
-# Archivado automático el día 5
-def auto_archivar_mes_anterior():
-    if hoy.day >= GRACIA_DIAS + 1:  # 5 en nuestro caso
-        df_prev = cargar_hist_df_de_mes(mes_anterior)
-        if df_prev.empty:
-            return
-        destino = CARPETA_REPORTES / f"reporte_{mes_anterior}.pdf"
-        pdf_bytes = generar_pdf_mes(mes_anterior)
-        try:
-            with open(destino, "wb") as fh:
-                fh.write(pdf_bytes)
-        except Exception:
-            st.warning(
-                "No se pudo guardar el PDF en disco (sin permisos). "
-                "Puedes descargarlo desde “PDF del mes mostrado”."
-            )
-
-auto_archivar_mes_anterior()
+with perf.span("avisos"):
+    hoy = hoy_local()
+    mes_actual = clave_mes(hoy)
+    prev_day = (date(hoy.year, hoy.month, 1) - timedelta(days=1))
+    mes_anterior = clave_mes(prev_day)
+    last_day_curr = (date(hoy.year+1, 1, 1) - timedelta(days=1)) if hoy.month == 12 else (date(hoy.year, hoy.month+1, 1) - timedelta(days=1))
+    dias_restantes = (last_day_curr - hoy).days
+
+    # Avisos
+    if dias_restantes <= AVISO_ULTIMOS_DIAS and dias_restantes >= 0:
+        st.info(f"Este mes se **archivará automáticamente el día {GRACIA_DIAS+1} del próximo mes**. Aún puedes editar hasta final de mes.", icon="ℹ️")
+    if 1 <= hoy.day <= GRACIA_DIAS:
+        st.warning(f"⏳ Puedes **editar el mes anterior** ({mes_en_letras_esp(mes_anterior)}) hasta el día {GRACIA_DIAS}.", icon="⏰")
+
+    # Archivado automático el día 5: lo hace el hilo de `get_archivers`; aquí solo se avisa
+    if archiver.last_error:
+        st.warning(
+            "No se pudo archivar el PDF del mes anterior en disco. "
+            "Puedes descargarlo desde “PDF del mes mostrado”."
+        )
 
 # =========================
 # ➕ Añadir (hoy)
 # =========================
-st.subheader("➕ Añadir (hoy)")
-st.caption("Añade SOLO el día de hoy. Para días pasados usa la edición del histórico.")
-def _init_add_form_defaults_wrapper():
-    _flash_success_if_any()
-    _init_add_form_defaults()
-_init_add_form_defaults_wrapper()
-
-if existe_registro(hoy):
-    st.info("Hoy ya tiene un registro. Edita abajo, en **Histórico**.")
-else:
-    st.text_input("Fecha", value=hoy.strftime("%d/%m/%Y"), disabled=True)
-    selectbox_state("Inicio", "inicio_nuevo_str", "08:00", TIME_OPTIONS)
-    selectbox_state("Fin",    "fin_nuevo_str",    "14:30", TIME_OPTIONS)
-    st.number_input("Descanso (min)", min_value=0, step=5, key="descanso_nuevo", value=DESCANSO_DEFECTO_MIN)
-    st.text_input("Notas (opcional)", placeholder="", key="notas_nuevas")
-
-    if st.button("Guardar hoy", use_container_width=True):
-        inicio_nuevo = parse_hhmm(st.session_state.get("inicio_nuevo_str", "08:00"))
-        fin_nuevo    = parse_hhmm(st.session_state.get("fin_nuevo_str", "14:30"))
-        descanso_nv  = int(st.session_state.get("descanso_nuevo", DESCANSO_DEFECTO_MIN))
-        notas_nv     = st.session_state.get("notas_nuevas", "")
-
-        if not inicio_nuevo or not fin_nuevo:
-            st.warning("Selecciona horas válidas.")
-        elif existe_registro(hoy):
-            st.warning("Ese día ya está registrado.")
-        else:
-            hw = calcular_horas_trabajadas(inicio_nuevo, fin_nuevo, descanso_nv, base_date=hoy)
-            delta = delta_diario_horas(hw)
-            repo.add(WorkShift(
-                work_date=hoy,
-                start_time=inicio_nuevo, end_time=fin_nuevo, break_minutes=descanso_nv,
-                hours_worked=hw, overtime_hours=delta, notes=(notas_nv.strip() or None)
-            ))
-            st.session_state["_reset_add_form"] = True
-            st.session_state["_flash_success"] = (
-                f"Guardado: {formatea_horas_float(hw)} · Extra: {formatea_minutos_signed(int(round(delta*60)))}"
-            )
-            st.rerun()
+with perf.span("añadir"):
+    st.subheader("➕ Añadir (hoy)")
+    st.caption("Añade SOLO el día de hoy. Para días pasados usa la edición del histórico.")
+    def _init_add_form_defaults_wrapper():
+        _flash_success_if_any()
+        _init_add_form_defaults()
+    _init_add_form_defaults_wrapper()
+
+    if existe_registro(hoy):
+        st.info("Hoy ya tiene un registro. Edita abajo, en **Histórico**.")
+    else:
+        st.text_input("Fecha", value=hoy.strftime("%d/%m/%Y"), disabled=True)
+        selectbox_state("Inicio", "inicio_nuevo_str", "08:00", TIME_OPTIONS)
+        selectbox_state("Fin",    "fin_nuevo_str",    "14:30", TIME_OPTIONS)
+        st.number_input("Descanso (min)", min_value=0, step=5, key="descanso_nuevo", value=DESCANSO_DEFECTO_MIN)
+        st.text_input("Notas (opcional)", placeholder="", key="notas_nuevas")
+
+        if st.button("Guardar hoy", width="stretch"):
+            inicio_nuevo = parse_hhmm(st.session_state.get("inicio_nuevo_str", "08:00"))
+            fin_nuevo    = parse_hhmm(st.session_state.get("fin_nuevo_str", "14:30"))
+            descanso_nv  = int(st.session_state.get("descanso_nuevo", DESCANSO_DEFECTO_MIN))
+            notas_nv     = st.session_state.get("notas_nuevas", "")
+
+            if not inicio_nuevo or not fin_nuevo:
+                st.warning("Selecciona horas válidas.")
+            elif existe_registro(hoy):
+                st.warning("Ese día ya está registrado.")
+            else:
+                hw = calc.calculate_hours_worked(inicio_nuevo, fin_nuevo, descanso_nv)
+                delta = delta_diario_horas(hw)
+                repo.add(WorkShift(
+                    work_date=hoy,
+                    start_time=inicio_nuevo, end_time=fin_nuevo, break_minutes=descanso_nv,
+                    hours_worked=hw, overtime_hours=delta, notes=(notas_nv.strip() or None)
+                ))
+                st.session_state["_reset_add_form"] = True
+                st.session_state["_flash_success"] = (
+                    f"Guardado: {formatea_horas_float(hw)} · Extra: {formatea_minutos_signed(int(round(delta*60)))}"
+                )
+                st.rerun()
 
 # =========================
 # 🗓️ Histórico — mes actual o mes anterior (hasta día 4)
 # =========================
-st.subheader("🗓️ Histórico")
-puede_editar_anterior = (1 <= hoy.day <= GRACIA_DIAS)
-opciones_hist = ["Mes actual"]
-# Mostrar siempre el mes anterior durante los días de gracia, aunque la BD actual no tenga datos
-if puede_editar_anterior:
-    opciones_hist.append("Mes anterior (hasta día 4)")
-seleccion = st.radio("Mes a editar", opciones_hist, horizontal=True, label_visibility="collapsed")
-yyyy_mm_objetivo = mes_actual if seleccion == "Mes actual" else mes_anterior
-permite_editar = (yyyy_mm_objetivo == mes_actual) or (yyyy_mm_objetivo == mes_anterior and puede_editar_anterior)
-
-st.caption(f"{mes_en_letras_esp(yyyy_mm_objetivo)} · Edita Inicio/Fin (HH:MM). Guardado automático.")
-
-df_hist = cargar_hist_df_de_mes(yyyy_mm_objetivo)
-if df_hist.empty:
-    st.info("Sin registros en este mes.")
-else:
-    # Asegurar que Inicio/Fin están dentro del rango permitido
-    def _clamp(hhmm: str) -> str:
-        if hhmm in TIME_OPTIONS:
-            return hhmm
-        try:
-            h, m = map(int, hhmm.split(":"))
-            if h < 6: return "06:00"
-            if h > 23 or (h == 23 and m > 55): return "00:00"
-            m = (m // 5) * 5
-            c = f"{h:02d}:{m:02d}"
-            return c if c in TIME_OPTIONS else "06:00"
-        except:
-            return "06:00"
-    df_hist["Inicio"] = df_hist["Inicio"].apply(_clamp)
-    df_hist["Fin"]    = df_hist["Fin"].apply(_clamp)
-
-    cols_show = ["Fecha","Día","Inicio","Fin","Descanso (min)","Horas","Extras"]
-    col_cfg = {
-        "Fecha": st.column_config.TextColumn(disabled=True),
-        "Día": st.column_config.TextColumn(disabled=True),
-        "Inicio": st.column_config.SelectboxColumn(options=TIME_OPTIONS, help="Hora de inicio (HH:MM)", disabled=not permite_editar),
-        "Fin": st.column_config.SelectboxColumn(options=TIME_OPTIONS, help="Hora de fin (HH:MM)", disabled=not permite_editar),
-        "Descanso (min)": st.column_config.NumberColumn(disabled=True),
-        "Horas": st.column_config.NumberColumn(disabled=True, format="%.2f"),
-        "Extras": st.column_config.TextColumn(disabled=True),
-        "Notas": st.column_config.TextColumn(disabled=True),
-    }
-
-    df_display = df_hist[cols_show].copy()
-    df_editado = st.data_editor(
-        df_display,
-        column_config=col_cfg,
-        use_container_width=True,
-        num_rows="fixed",
-        key=f"editor_hist_{yyyy_mm_objetivo}"
-    )
-
-    # Guardado automático solo si está permitido
-    if permite_editar:
-        base_json = df_display[["Inicio","Fin"]].to_json()
-        key_sig = f"last_saved_editor_signature_{yyyy_mm_objetivo}"
-        if key_sig not in st.session_state:
-            st.session_state[key_sig] = base_json
-        current_json = df_editado[["Inicio","Fin"]].to_json()
-
-        if current_json != st.session_state[key_sig]:
-            cambios = 0
-            with Session(repo.engine) as s:
-                for idx, row in df_editado.iterrows():
-                    orig = df_display.loc[idx]
-                    if (row["Inicio"] != orig["Inicio"]) or (row["Fin"] != orig["Fin"]):
-                        t_ini = parse_hhmm(row["Inicio"]); t_fin = parse_hhmm(row["Fin"])
-                        if not t_ini or not t_fin:
-                            st.warning(f"Fila {idx+1}: hora inválida.")
-                            continue
-                        fila_id = int(df_hist.loc[idx, "ID"])
-                        fila = s.get(WorkShiftDB, fila_id)
-                        if not fila:
-                            continue
-                        # Recalcula usando la fecha real de ese día
-                        hw = calcular_horas_trabajadas(t_ini, t_fin, fila.break_minutes, base_date=datetime.fromisoformat(fila.work_date.isoformat()).date())
-                        delta = delta_diario_horas(hw)
-                        fila.start_time = t_ini
-                        fila.end_time = t_fin
-                        fila.hours_worked = hw
-                        fila.overtime_hours = delta
-                        s.add(fila); cambios += 1
+with perf.span("histórico"):
+    st.subheader("🗓️ Histórico")
+    puede_editar_anterior = (1 <= hoy.day <= GRACIA_DIAS)
+    opciones_hist = ["Mes actual"]
+    # Mostrar siempre el mes anterior durante los días de gracia, aunque la BD actual no tenga datos
+    if puede_editar_anterior:
+        opciones_hist.append("Mes anterior (hasta día 4)")
+    seleccion = st.radio("Mes a editar", opciones_hist, horizontal=True, label_visibility="collapsed")
+    yyyy_mm_objetivo = mes_actual if seleccion == "Mes actual" else mes_anterior
+    permite_editar = (yyyy_mm_objetivo == mes_actual) or (yyyy_mm_objetivo == mes_anterior and puede_editar_anterior)
+
+    st.caption(f"{mes_en_letras_esp(yyyy_mm_objetivo)} · Edita Inicio/Fin (HH:MM). Guardado automático.")
+
+    df_hist = cargar_hist_df_de_mes(yyyy_mm_objetivo)
+    if df_hist.empty:
+        st.info("Sin registros en este mes.")
+    else:
+        # Asegurar que Inicio/Fin están dentro del rango permitido (rejilla de 5 min, por tabla)
+        df_hist["Inicio"] = ajusta_columna_a_opciones(df_hist["Inicio"])
+        df_hist["Fin"]    = ajusta_columna_a_opciones(df_hist["Fin"])
+
+        cols_show = ["Fecha","Día","Inicio","Fin","Descanso (min)","Horas","Extras"]
+        col_cfg = {
+            "Fecha": st.column_config.TextColumn(disabled=True),
+            "Día": st.column_config.TextColumn(disabled=True),
+            "Inicio": st.column_config.SelectboxColumn(options=TIME_OPTIONS, help="Hora de inicio (HH:MM)", disabled=not permite_editar),
+            "Fin": st.column_config.SelectboxColumn(options=TIME_OPTIONS, help="Hora de fin (HH:MM)", disabled=not permite_editar),
+            "Descanso (min)": st.column_config.NumberColumn(disabled=True),
+            "Horas": st.column_config.NumberColumn(disabled=True, format="%.2f"),
+            "Extras": st.column_config.TextColumn(disabled=True),
+            "Notas": st.column_config.TextColumn(disabled=True),
+        }
+
+        df_display = df_hist[cols_show].copy()
+        df_editado = st.data_editor(
+            df_display,
+            column_config=col_cfg,
+            width="stretch",
+            num_rows="fixed",
+            key=f"editor_hist_{empleado}_{yyyy_mm_objetivo}"
+        )
+
+        # Guardado automático solo si está permitido
+        if permite_editar:
+            # Diff vectorizado contra lo cargado: solo filas con Inicio/Fin cambiados
+            cambiado = (df_editado["Inicio"] != df_display["Inicio"]) | (df_editado["Fin"] != df_display["Fin"])
+            editadas = df_editado.loc[cambiado, ["Inicio","Fin"]]
+            key_sig = f"last_saved_editor_signature_{empleado}_{yyyy_mm_objetivo}"
+            firma = editadas.to_json()
+
+            if not editadas.empty and firma != st.session_state.get(key_sig):
+                ini_min = minutos_del_dia(editadas["Inicio"])
+                fin_min = minutos_del_dia(editadas["Fin"])
+                validas = ini_min.notna() & fin_min.notna()
+                for idx in editadas.index[~validas]:
+                    st.warning(f"Fila {idx+1}: hora inválida.")
+                ini_min, fin_min = ini_min[validas].astype(int), fin_min[validas].astype(int)
+                # Recalcula horas y delta diario de todas las filas cambiadas a la vez
+                horas = calc.calculate_hours_batch(ini_min, fin_min, df_hist.loc[ini_min.index, "Descanso (min)"])
+                deltas = calc.calculate_daily_delta_batch(horas)
+                cambios = repo.update_times([
+                    {
+                        "id": int(fila_id),
+                        "start_time": time(*divmod(int(i), 60)),
+                        "end_time": time(*divmod(int(f), 60)),
+                        "hours_worked": float(hw),
+                        "overtime_hours": float(dl),
+                    }
+                    for fila_id, i, f, hw, dl in zip(
+                        df_hist.loc[ini_min.index, "ID"], ini_min, fin_min, horas, deltas
+                    )
+                ])
+                st.session_state[key_sig] = firma
                 if cambios:
-                    s.commit()
-            st.session_state[key_sig] = current_json
-            if cambios:
-                st.toast("Guardado automático aplicado.", icon="✅")
-                st.rerun()
+                    st.toast("Guardado automático aplicado.", icon="✅")
+                    st.rerun()
 
 # =========================
 # 📅 Resumen semanal (del mes mostrado)
 # =========================
-st.subheader("📅 Resumen semanal")
-if not df_hist.empty:
-    d1, d2 = rango_mes(yyyy_mm_objetivo)
-    with Session(repo.engine) as s:
-        filas = s.exec(select(WorkShiftDB).where(WorkShiftDB.work_date >= d1, WorkShiftDB.work_date <= d2)).all()
-    from collections import defaultdict
-    tot_sem_h = defaultdict(float)
-    extras_semana_min = defaultdict(int)
-    extras_sobre30_min = defaultdict(int)
-    for f in filas:
-        if f.hours_worked is None:
-            hw = calcular_horas_trabajadas(f.start_time, f.end_time, f.break_minutes, base_date=f.work_date)
-        else:
-            hw = float(f.hours_worked)
-        yy, ww, _ = f.work_date.isocalendar()
-        key = (yy, ww)
-        tot_sem_h[key] += float(hw)
-        delta_dia_min = int(round((float(hw) - UMBRAL_DIARIO_H) * 60))
-        extras_semana_min[key] += delta_dia_min
-    for (yy, ww), total_h in tot_sem_h.items():
-        excedente30 = int(round(max(0.0, total_h - UMBRAL_SEMANAL_H) * 60))
-        if excedente30 > 0:
-            extras_sobre30_min[(yy, ww)] = excedente30
-    for (yy, ww) in sorted(tot_sem_h.keys(), reverse=True):
-        lunes = datetime.fromisocalendar(yy, ww, 1).date()
-        domingo = lunes + timedelta(days=6)
-        total_h = round(tot_sem_h[(yy, ww)], 2)
-        total_h_str = formatea_horas_float(total_h)
-        extra_sem_str = formatea_minutos_signed(extras_semana_min.get((yy, ww), 0))
-        extra30 = extras_sobre30_min.get((yy, ww), 0)
-        with st.expander(f"{lunes.strftime('%d/%m/%Y')} – {domingo.strftime('%d/%m/%Y')} · {total_h_str}", expanded=False):
-            st.markdown(f"- **Horas totales**: {total_h_str}")
-            st.markdown(f"- **Extras acumuladas de la semana**: {extra_sem_str}")
-            if extra30 > 0:
-                st.markdown(f"- **Extras sobre 30 h**: {formatea_minutos_signed(extra30)}")
+with perf.span("resumen_semanal"):
+    st.subheader("📅 Resumen semanal")
+    if not df_hist.empty:
+        # Acumulados mantenidos al escribir: semanas ISO completas aunque crucen de mes
+        semanas = snapshots.get(yyyy_mm_objetivo).weeks
+        extras_sem, extras30 = calc.rollup_minutes_batch(
+            [w.hours for w in semanas], [w.worked_minutes for w in semanas], [w.days for w in semanas]
+        )
+        for w, extra_sem_min, extra30 in reversed(list(zip(semanas, extras_sem.tolist(), extras30.tolist()))):
+            lunes = w.week_start
+            domingo = lunes + timedelta(days=6)
+            total_h_str = formatea_horas_float(round(w.hours, 2))
+            extra_sem_str = formatea_minutos_signed(extra_sem_min)
+            with st.expander(f"{lunes.strftime('%d/%m/%Y')} – {domingo.strftime('%d/%m/%Y')} · {total_h_str}", expanded=False):
+                st.markdown(f"- **Horas totales**: {total_h_str}")
+                st.markdown(f"- **Extras acumuladas de la semana**: {extra_sem_str}")
+                if extra30 > 0:
+                    st.markdown(f"- **Extras sobre 30 h**: {formatea_minutos_signed(extra30)}")
 
 # =========================
 # ⬇️ PDF — mes mostrado (por defecto: actual)
 # =========================
-st.subheader("⬇️ PDF del mes mostrado")
-df_tbl, horas_mes, extras_min = construir_df_para_pdf_mes(yyyy_mm_objetivo)
-titulo_pdf = f"{TITULO_APP} — {mes_en_letras_esp(yyyy_mm_objetivo)}"
-bruto_mes = horas_mes * HOURLY_GROSS_EUR
-neto_mes = bruto_mes * (1 - IRPF_EST_PERCENT)
-l1 = f"Horas extras acumuladas del mes: {formatea_minutos_signed(extras_min)}"
-l2 = f"Total bruto del mes: {eur(bruto_mes)} € · Total neto estimado: {eur(neto_mes)} €"
-pdf_bytes = dataframe_a_pdf(df_tbl, titulo=titulo_pdf, resumen_linea1=l1, resumen_linea2=l2)
-st.download_button(
-    "Descargar PDF del mes mostrado",
-    data=pdf_bytes,
-    file_name=f"reporte_{yyyy_mm_objetivo}.pdf",
-    mime="application/pdf",
-    disabled=(len(pdf_bytes) == 0),
-    use_container_width=True,
-)
+with perf.span("pdf"):
+    st.subheader("⬇️ PDF del mes mostrado")
+    pdf_bytes = pdf_del_mes(yyyy_mm_objetivo, wait_s=0.3)
+    if pdf_bytes is None:
+        pdf_preparandose(yyyy_mm_objetivo)
+    else:
+        boton_pdf_mes(yyyy_mm_objetivo, pdf_bytes)
 
 # =========================
 # 📁 Meses archivados (PDF) — solo meses pasados con datos en BD
 # =========================
-meses_con_datos = listar_meses_con_registros()
-archivos = sorted([p for p in CARPETA_REPORTES.glob("reporte_*.pdf")], reverse=True)
-archivados_filtrados = []
-for p in archivos:
-    yyyymm = p.stem.replace("reporte_", "")
-    if yyyymm_to_tuple(yyyymm) >= yyyymm_to_tuple(mes_actual):
-        continue
-    if yyyymm not in meses_con_datos:
-        continue
-    archivados_filtrados.append((yyyymm, p))
-
-if archivados_filtrados:
-    st.markdown("**📁 Meses archivados (PDF)**")
-    for yyyymm, p in archivados_filtrados:
-        etiqueta = f"Descargar {mes_en_letras_esp(yyyymm)}"
-        with open(p, "rb") as fh:
+with perf.span("archivados"):
+    meses_con_datos = listar_meses_con_registros()
+    # Solo el manifest (en caché): cada PDF se lee del disco al pulsar su botón
+    archivados_filtrados = [
+        (yyyymm, entrada) for yyyymm, entrada in sorted(archiver.listing().items(), reverse=True)
+        if yyyymm_to_tuple(yyyymm) < yyyymm_to_tuple(mes_actual) and yyyymm in meses_con_datos
+    ]
+
+    if archivados_filtrados:
+        st.markdown("**📁 Meses archivados (PDF)**")
+        for yyyymm, entrada in archivados_filtrados:
+            etiqueta = f"Descargar {mes_en_letras_esp(yyyymm)}"
+            if entrada.get("size"):
+                etiqueta += f" · {entrada['size'] / 1024:,.0f} KB"
             st.download_button(
-                label=etiqueta, data=fh.read(), file_name=p.name, mime="application/pdf",
-                key=f"dl_{yyyymm}", use_container_width=True
+                label=etiqueta, data=partial(archiver.read_pdf, yyyymm), file_name=entrada["file"],
+                mime="application/pdf", key=f"dl_{empleado}_{yyyymm}", width="stretch"
             )
-else:
-    st.caption("No hay PDFs archivados todavía.")
+    else:
+        st.caption("No hay PDFs archivados todavía.")
+
+    # Exportación de un año completo (gestoría): render en paralelo y un solo ZIP
+    anios = sorted({int(m[:4]) for m in meses_con_datos}, reverse=True)
+    if anios:
+        with st.expander("📦 Exportar un año (ZIP)"):
+            anio = st.selectbox("Año", anios, key=f"anio_zip_{empleado}")
+            if st.button("Generar ZIP", key=f"btn_zip_{empleado}", width="stretch"):
+                barra = st.progress(0.0)
+                limpia_exportaciones(CARPETA_EXPORTACIONES, EXPORTACION_MAX_EDAD_S)
+                previo = st.session_state.pop(f"_zip_{empleado}", None)
+                if previo:
+                    previo[1].unlink(missing_ok=True)
+                ruta_zip = nuevo_zip_temporal(CARPETA_EXPORTACIONES, f"reportes_{empleado}_{anio}_")
+                try:
+                    # Pool de procesos propio: los renders del ZIP no ocupan los hilos de PdfJobs
+                    # ni el GIL del servidor mientras otras sesiones piden sus PDFs
+                    res = export_zip(
+                        reports, meses_del_anio(anio), ruta_zip, workers=EXPORTACION_WORKERS, processes=True,
+                        progress=lambda hechos, total: barra.progress(hechos / total),
+                    )
+                except BaseException:
+                    ruta_zip.unlink(missing_ok=True)
+                    raise
+                st.session_state[f"_zip_{empleado}"] = (anio, ruta_zip, (
+                    f"{len(res.months)} meses en {res.seconds:.1f} s · {res.months_per_s:.1f} meses/s"
+                ))
+            zip_listo = st.session_state.get(f"_zip_{empleado}")
+            if zip_listo and zip_listo[0] == anio and zip_listo[1].is_file():
+                st.caption(zip_listo[2])
+                # La sesión guarda solo la ruta: los bytes se leen del disco al descargar
+                st.download_button(
+                    f"Descargar reportes_{anio}.zip", data=partial(zip_listo[1].read_bytes),
+                    file_name=f"reportes_{anio}.zip", mime="application/zip", key=f"dl_zip_{empleado}",
+                    width="stretch",
+                )
+
+# =========================
+# 🛠️ Panel de depuración (?debug=1 o DEBUG_PANEL=1)
+# =========================
+if panel_depuracion_activo():
+    with st.sidebar, perf.span("panel"):
+        st.markdown("**🛠️ Depuración**")
+        indicador_conexion_bd()
+        registro = rerun_stats.to_record()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Rerun", f"{registro['total_ms']:.0f} ms")
+        c2.metric("Consultas", registro["sql"]["queries"])
+        c3.metric("Filas", registro["sql"]["rows"])
+        st.caption("Tramos (ms)")
+        st.json(registro["spans_ms"])
+        st.caption("SQL de este rerun")
+        st.json(registro["sql"], expanded=False)
+        st.caption(f"PDF: {pdf_jobs.pending()} render(s) en curso · caché {reports.pdf_cache.stats()}")
+        st.caption("Pool de conexiones (acumulado)")
+        st.json(repo.pool_metrics.snapshot(), expanded=False)
+        st.caption(f"Lock de escritura (perfil SQLite: {repo.engine.sqlite_profile})")
+        st.json(repo.write_lock.snapshot(), expanded=False)
+        st.caption("Arranque del proceso (ms)")
+        st.json(perf.STARTUP.to_record()["phases_ms"], expanded=False)
+
+st.session_state.pop("_perf_rerun", None)
+fin_rerun = perf.end()
+perf.emit(fin_rerun.to_record())
+# Informe de arranque (una vez por proceso): el resto del primer rerun cuenta como "render"
+perf.STARTUP.add("render", fin_rerun.total_s - fin_rerun.spans.get("arranque", 0.0))
+perf.STARTUP.emit_once()
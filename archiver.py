@@ -0,0 +1,312 @@
+# archiver.py
+# -----------------------------------------------
+# Archivado mensual de PDFs como tarea (hilo de fondo o CLI), fuera del render.
+# Manifest JSON por carpeta + lock de fichero: un único worker genera cada mes.
+# La página lista los meses desde el manifest (releído solo si cambia) y lee un PDF
+# del disco únicamente cuando se descarga, con un LRU de los últimos servidos.
+# EmployeeArchivers guarda los archivadores de los empleados abiertos en la página
+# (LRU acotado) y un único hilo de fondo por proceso que recorre todos los empleados
+# con turnos, con archivadores de usar y tirar para los que no están en memoria.
+# -----------------------------------------------
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time as _time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from config import ARCHIVO_LRU_PDFS, EMPLEADOS_EN_MEMORIA, GRACIA_DIAS, TZ, hoy_local
+from pdf_cache import PdfCache
+from reports import MonthReports, clave_mes
+from repository import WorkShiftRepository
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: Path, timeout_s: float = 30.0):
+    """Lock exclusivo entre procesos/hilos sobre `path`. Lanza TimeoutError si no se obtiene."""
+    fh = open(path, "a+")
+    try:
+        deadline = _time.monotonic() + timeout_s
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if _time.monotonic() >= deadline:
+                    raise TimeoutError(f"No se pudo obtener el lock {path}")
+                _time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        fh.close()
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def mes_a_archivar(today: date, grace_days: int = GRACIA_DIAS) -> str | None:
+    """Mes anterior si ya pasó el periodo de gracia (día 5 en adelante), si no None."""
+    if today.day < grace_days + 1:
+        return None
+    return clave_mes(date(today.year, today.month, 1) - timedelta(days=1))
+
+
+class MonthArchiver:
+    """
+    Genera `reporte_YYYY-MM.pdf` y lleva un manifest con
+    {month, file, row_hash, checksum, size, mtime, generated_at} por mes.
+    Idempotente: si el row_hash y el checksum coinciden, no se toca el fichero.
+    """
+    MANIFEST_NAME = "manifest.json"
+    LOCK_NAME = ".archive.lock"
+
+    def __init__(self, reports: MonthReports, folder: Path, grace_days: int = GRACIA_DIAS):
+        self.reports = reports
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.grace_days = grace_days
+        self.manifest_path = self.folder / self.MANIFEST_NAME
+        self.lock_path = self.folder / self.LOCK_NAME
+        self.last_error: str | None = None  # lo actualiza el hilo de EmployeeArchivers
+        # Listado para la página: se relee solo si cambia el manifest (mtime/tamaño)
+        self._listing: tuple[tuple[int, int], dict[str, dict]] | None = None
+        self._listing_lock = threading.Lock()
+        # PDFs servidos recientemente, por checksum (solo memoria)
+        self.served = PdfCache(None, max_memory_items=ARCHIVO_LRU_PDFS)
+
+    # ---- manifest ----
+    def entries(self) -> dict[str, dict]:
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("months", {}) if isinstance(data, dict) else {}
+
+    def listing(self) -> dict[str, dict]:
+        """Entradas del manifest para mostrar: un stat por llamada, sin abrir ningún PDF."""
+        try:
+            st_ = self.manifest_path.stat()
+            firma = (st_.st_mtime_ns, st_.st_size)
+        except OSError:
+            return {}
+        with self._listing_lock:
+            if self._listing is not None and self._listing[0] == firma:
+                return self._listing[1]
+        entries = self.entries()
+        with self._listing_lock:
+            self._listing = (firma, entries)
+        return entries
+
+    def read_pdf(self, yyyy_mm: str) -> bytes:
+        """
+        Bytes del PDF archivado de un mes, leídos del disco solo si no están en el LRU.
+        Lanza FileNotFoundError si el mes no está archivado y ValueError si el fichero
+        no coincide con el checksum del manifest.
+        """
+        entry = self.listing().get(yyyy_mm)
+        if entry is None:
+            raise FileNotFoundError(f"{yyyy_mm} no está archivado")
+        checksum = entry.get("checksum")
+        data = self.served.get(checksum) if checksum else None
+        if data is not None:
+            return data
+        data = (self.folder / entry["file"]).read_bytes()
+        if checksum and hashlib.sha256(data).hexdigest() != checksum:
+            raise ValueError(f"{entry['file']} no coincide con el manifest")
+        if checksum:
+            self.served.put(checksum, data)
+        return data
+
+    def _save_entries(self, entries: dict[str, dict]) -> None:
+        payload = {"version": 1, "months": dict(sorted(entries.items()))}
+        _write_atomic(self.manifest_path, json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8"))
+
+    def adopt_existing(self) -> list[str]:
+        """Registra en el manifest PDFs archivados antes de que existiera (row_hash desconocido)."""
+        adoptados = []
+        with file_lock(self.lock_path):
+            entries = self.entries()
+            for p in self.folder.glob("reporte_*.pdf"):
+                yyyy_mm = p.stem.replace("reporte_", "")
+                if yyyy_mm in entries:
+                    continue
+                st_ = p.stat()
+                entries[yyyy_mm] = {
+                    "month": yyyy_mm, "file": p.name, "row_hash": None,
+                    "checksum": sha256_file(p), "size": st_.st_size, "mtime": st_.st_mtime,
+                    "generated_at": datetime.fromtimestamp(st_.st_mtime, TZ).isoformat(timespec="seconds"),
+                }
+                adoptados.append(yyyy_mm)
+            if adoptados:
+                self._save_entries(entries)
+        return adoptados
+
+    # ---- archivado ----
+    def archive_month(self, yyyy_mm: str, force: bool = False) -> dict | None:
+        """Archiva un mes. Devuelve su entrada del manifest, o None si no tiene datos."""
+        if not len(self.reports.snapshots.get(yyyy_mm).batch):
+            return None
+        row_hash, render = self.reports.pdf_job(yyyy_mm)
+        destino = self.folder / f"reporte_{yyyy_mm}.pdf"
+        with file_lock(self.lock_path):
+            # Releer bajo el lock: otro worker puede haberlo generado ya
+            entries = self.entries()
+            actual = entries.get(yyyy_mm)
+            if (not force and actual and actual.get("row_hash") == row_hash
+                    and destino.exists() and sha256_file(destino) == actual.get("checksum")):
+                return actual
+            pdf_bytes = self.reports.pdf_cache.get_or_render(row_hash, render)
+            if not pdf_bytes:
+                raise RuntimeError("La exportación a PDF requiere 'reportlab'.")
+            _write_atomic(destino, pdf_bytes)
+            entry = {
+                "month": yyyy_mm, "file": destino.name, "row_hash": row_hash,
+                "checksum": hashlib.sha256(pdf_bytes).hexdigest(), "size": len(pdf_bytes),
+                "mtime": destino.stat().st_mtime,
+                "generated_at": datetime.now(TZ).isoformat(timespec="seconds"),
+            }
+            entries[yyyy_mm] = entry
+            self._save_entries(entries)
+            return entry
+
+    def run_due(self, today: date | None = None) -> list[str]:
+        """Archiva el mes anterior si toca. Sin consultas a BD si ya está en el manifest."""
+        yyyy_mm = mes_a_archivar(today or hoy_local(), self.grace_days)
+        if yyyy_mm is None:
+            return []
+        actual = self.entries().get(yyyy_mm)
+        # Pasada la gracia el mes anterior ya no se edita: basta con que exista
+        if actual and (self.folder / actual.get("file", "")).is_file():
+            return []
+        return [yyyy_mm] if self.archive_month(yyyy_mm) else []
+
+
+class EmployeeArchivers:
+    """
+    MonthArchiver (con sus MonthReports y cachés) de los empleados abiertos en la página,
+    compartidos por sus sesiones: como mucho `max_cached`, se expulsa el menos usado.
+    Un único hilo por proceso archiva a todos los empleados con turnos; los que no están
+    en memoria usan un archivador de usar y tirar, así que la memoria crece con los
+    empleados en uso y no con los que alguna vez se guardaron.
+    """
+    def __init__(self, repo: WorkShiftRepository, make_reports: Callable[[WorkShiftRepository], MonthReports],
+                 folder_for: Callable[[str], Path], grace_days: int = GRACIA_DIAS,
+                 max_cached: int = EMPLEADOS_EN_MEMORIA):
+        self.repo = repo
+        self.make_reports = make_reports
+        self.folder_for = folder_for
+        self.grace_days = grace_days
+        self.max_cached = max(1, max_cached)
+        self.last_error: str | None = None
+        self._archivers: "OrderedDict[str, MonthArchiver]" = OrderedDict()
+        self._errors: dict[str, str] = {}   # último error de archivado por empleado (solo los que fallan)
+        self._adopted: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _nuevo(self, employee_id: str) -> MonthArchiver:
+        return MonthArchiver(
+            self.make_reports(self.repo.for_employee(employee_id)),
+            self.folder_for(employee_id), grace_days=self.grace_days,
+        )
+
+    def get(self, employee_id: str) -> MonthArchiver:
+        with self._lock:
+            archiver = self._archivers.get(employee_id)
+            if archiver is not None:
+                self._archivers.move_to_end(employee_id)
+                return archiver
+            archiver = self._nuevo(employee_id)
+            archiver.last_error = self._errors.get(employee_id)
+            self._archivers[employee_id] = archiver
+            while len(self._archivers) > self.max_cached:
+                self._archivers.popitem(last=False)
+            return archiver
+
+    def __len__(self) -> int:
+        return len(self._archivers)
+
+    def run_due(self, today: date | None = None) -> dict[str, list[str]]:
+        """Una vuelta: adopta PDFs previos (la primera vez) y archiva lo que toque de cada empleado."""
+        hechos: dict[str, list[str]] = {}
+        self.last_error = None
+        for emp in self.repo.list_employees():
+            try:
+                with self._lock:
+                    archiver = self._archivers.get(emp)
+                if archiver is None:
+                    archiver = self._nuevo(emp)  # no entra en el LRU: se descarta tras la vuelta
+            except (ValueError, OSError) as e:
+                # Id anterior a la validación actual o carpeta inaccesible: no frena al resto
+                self.last_error = f"{emp}: {type(e).__name__}: {e}"
+                continue
+            try:
+                if emp not in self._adopted:
+                    archiver.adopt_existing()
+                    self._adopted.add(emp)
+                hechos[emp] = archiver.run_due(today)
+                archiver.last_error = None
+                self._errors.pop(emp, None)
+            except Exception as e:
+                # Sin permisos de escritura, sin reportlab, lock ocupado...: se reintenta
+                archiver.last_error = self._errors[emp] = f"{type(e).__name__}: {e}"
+        return hechos
+
+    # ---- hilo de fondo ----
+    def _loop(self, interval_s: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:  # BD caída al listar empleados
+                self.last_error = f"{type(e).__name__}: {e}"
+            self._stop.wait(interval_s)
+
+    def start_background(self, interval_s: float = 3600.0) -> threading.Thread:
+        """Arranca (una sola vez) el hilo que comprueba el archivado cada `interval_s`."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._loop, args=(interval_s,), name="month-archiver", daemon=True
+            )
+            self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+__all__ = ["EmployeeArchivers", "MonthArchiver", "file_lock", "mes_a_archivar", "sha256_file"]
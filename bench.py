@@ -0,0 +1,403 @@
+# bench.py
+# -----------------------------------------------
+# Benchmarks con histórico sintético (ver synthetic.py). Uso: python main.py bench --help
+# Resultados en JSON (commit, parámetros y una fila por medida) para comparar entre commits:
+#   python main.py bench --out antes.json ; ... ; python main.py bench --compare antes.json
+# Con --postgres-url (o BENCH_POSTGRES_URL) se repite contra Postgres: solo se tocan
+# filas de empleados "bench-<run>-NNN", que se borran al terminar.
+# -----------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import threading
+import statistics
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from config import TITULO_APP, UMBRAL_DIARIO_H, UMBRAL_SEMANAL_H, hoy_local
+from domain import ShiftBatch
+from pdf_cache import PdfCache
+from reports import (
+    MonthReports, dataframe_a_pdf, df_para_pdf, hist_df_desde_filas, lineas_resumen, mes_en_letras_esp,
+)
+from repository import DataVersionDB, MonthRollupDB, WeekRollupDB, WorkShiftDB, WorkShiftRepository
+from services import WorkHoursCalculator
+from snapshots import MonthSnapshotCache
+from synthetic import generate_shifts, months_spanned
+from utils import shifts_to_dataframe
+
+APP_PATH = Path(__file__).with_name("app.py")
+RESULTS_VERSION = 1
+
+
+def _medir(fn: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> list[float]:
+    tiempos = []
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        t0 = perf_counter()
+        fn()
+        tiempos.append(perf_counter() - t0)
+    return tiempos
+
+
+def _fila(name: str, backend: str, tiempos: list[float], items: int = 1, peak_kb: float | None = None) -> dict:
+    mediana = statistics.median(tiempos)
+    fila = {
+        "name": name, "backend": backend, "items": items, "repeat": len(tiempos),
+        "min_s": min(tiempos), "median_s": mediana, "mean_s": statistics.fmean(tiempos), "max_s": max(tiempos),
+        "items_per_s": (items / mediana) if mediana > 0 else None,
+    }
+    if peak_kb is not None:
+        fila["peak_kb"] = round(peak_kb, 1)
+    return fila
+
+
+def _pico_memoria_kb(fn: Callable[[], object]) -> float:
+    """Pico de memoria Python asignada durante una llamada (tracemalloc, aparte del cronómetro)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _git_commit() -> tuple[str | None, bool]:
+    cwd = Path(__file__).parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except Exception:
+        return None, False
+
+
+# =========================
+# Medidas sin BD
+# =========================
+def bench_pure(data: dict, repeat: int) -> list[dict]:
+    shifts = next(iter(data.values()))
+    n = len(shifts)
+    calc = WorkHoursCalculator(daily_threshold=UMBRAL_DIARIO_H, weekly_threshold=UMBRAL_SEMANAL_H)
+    batch = ShiftBatch.from_shifts(shifts)
+    filas = [
+        _fila("WorkHoursCalculator.calculate_hours_worked", "-", _medir(
+            lambda: [calc.calculate_hours_worked(s.start_time, s.end_time, s.break_minutes) for s in shifts], repeat
+        ), n),
+        _fila("WorkHoursCalculator.calculate_hours_batch", "-", _medir(
+            lambda: calc.calculate_hours_batch(batch.start_minute, batch.end_minute, batch.break_minutes), repeat
+        ), n),
+        _fila("WorkHoursCalculator.calculate_weekly_overtime", "-", _medir(
+            lambda: calc.calculate_weekly_overtime(shifts), repeat
+        ), n),
+        _fila("WorkHoursCalculator.weekly_summary_batch", "-", _medir(
+            lambda: calc.weekly_summary_batch(batch.dates(), batch.hours_worked), repeat
+        ), n),
+        _fila("utils.shifts_to_dataframe[WorkShift]", "-", _medir(lambda: shifts_to_dataframe(shifts), repeat), n),
+        _fila("utils.shifts_to_dataframe[ShiftBatch]", "-", _medir(lambda: shifts_to_dataframe(batch), repeat), n),
+    ]
+    return filas
+
+
+def bench_pdf(data: dict, repeat: int, large_rows: int = 1000) -> list[dict]:
+    """PdfRenderer: platypus midiendo celdas (como antes), anchos fijos y canvas; mes y tabla grande."""
+    try:
+        from pdf_render import PdfRenderer
+        medida, fijos, canvas = (
+            PdfRenderer(fixed_widths=False, canvas_min_rows=10**9),
+            PdfRenderer(canvas_min_rows=10**9),
+            PdfRenderer(canvas_min_rows=0),
+        )
+    except ImportError:
+        return []
+    shifts = next(iter(data.values()))
+    filas_db = [
+        WorkShiftDB(id=i, work_date=s.work_date, start_time=s.start_time, end_time=s.end_time,
+                    break_minutes=s.break_minutes, hours_worked=s.hours_worked, notes=s.notes)
+        for i, s in enumerate(sorted(shifts, key=lambda s: s.work_date, reverse=True))
+    ]
+    df_grande, horas, extras = df_para_pdf(hist_df_desde_filas(filas_db))
+    df_grande = df_grande.iloc[[i % len(df_grande) for i in range(large_rows)]] if len(df_grande) else df_grande
+    df_mes = df_grande.head(31)
+    l1, l2 = lineas_resumen(horas, extras)
+    filas = []
+    for etiqueta, df in (("mes", df_mes), ("grande", df_grande)):
+        for nombre, renderer in (("auto-medida", medida), ("anchos fijos", fijos), ("canvas", canvas)):
+            render = lambda r=renderer, d=df: r.render(d, TITULO_APP, l1, l2)
+            filas.append(_fila(
+                f"PdfRenderer[{nombre}] {etiqueta}", "-", _medir(render, repeat), len(df),
+                peak_kb=_pico_memoria_kb(render),
+            ))
+    return filas
+
+
+# =========================
+# Medidas por backend
+# =========================
+def _limpiar(repo: WorkShiftRepository, empleados: list[str]) -> None:
+    with repo.engine.begin() as conn:
+        for table in (WorkShiftDB.__table__, WeekRollupDB.__table__, MonthRollupDB.__table__,
+                      DataVersionDB.__table__):
+            conn.execute(table.delete().where(table.c.employee_id.in_(empleados)))
+
+
+def bench_backend(backend: str, url: str, data: dict, repeat: int, add_sample: int, pdf_dir: Path) -> list[dict]:
+    repo = WorkShiftRepository(url, echo=False)
+    empleados = list(data)
+    filas: list[dict] = []
+    try:
+        total = sum(len(v) for v in data.values())
+        t0 = perf_counter()
+        for emp, shifts in data.items():
+            repo.for_employee(emp).upsert_many(shifts)
+        filas.append(_fila("WorkShiftRepository.upsert_many", backend, [perf_counter() - t0], total))
+
+        emp0 = repo.for_employee(empleados[0])
+        muestra = data[empleados[0]][-add_sample:]
+        filas.append(_fila("WorkShiftRepository.add", backend, _medir(
+            lambda: [emp0.add(s) for s in muestra], 1
+        ), len(muestra)))
+
+        n0 = len(emp0.list_all())
+        filas.append(_fila("WorkShiftRepository.list_all", backend, _medir(emp0.list_all, repeat), n0))
+        filas.append(_fila("WorkShiftRepository.list_batch", backend, _medir(emp0.list_batch, repeat), n0))
+
+        reports = MonthReports(MonthSnapshotCache(emp0), PdfCache(pdf_dir / backend))
+        mes = months_spanned(data[empleados[0]])[-1]
+        dias_mes = len(reports.snapshots.get(mes).batch)
+        filas.append(_fila("cargar_hist_df_de_mes (frío)", backend, _medir(
+            lambda: reports.hist_df(mes), repeat, setup=reports.snapshots.invalidate
+        ), dias_mes))
+        filas.append(_fila("cargar_hist_df_de_mes (snapshot en caché)", backend, _medir(
+            lambda: reports.hist_df(mes), repeat
+        ), dias_mes))
+
+        df_tbl, horas_mes, extras_mes_min = reports.df_para_pdf(mes)
+        l1, l2 = lineas_resumen(horas_mes, extras_mes_min)
+        titulo = f"{TITULO_APP} — {mes_en_letras_esp(mes)}"
+        if dataframe_a_pdf(df_tbl.head(1), titulo):
+            filas.append(_fila("dataframe_a_pdf", backend, _medir(
+                lambda: dataframe_a_pdf(df_tbl, titulo, l1, l2), repeat
+            ), dias_mes))
+    finally:
+        _limpiar(repo, empleados)
+        repo.engine.dispose()
+    return filas
+
+
+def _percentil(valores: list[float], q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else 0.0
+
+
+def bench_sqlite_concurrency(folder: Path, data: dict, sessions: int = 8, ops: int = 50,
+                             write_ratio: float = 0.2, seed: int = 0) -> list[dict]:
+    """
+    `sessions` hilos a la vez, cada uno como una sesión de la página: lee un mes
+    (list_range_rows) o guarda un día (add, como el formulario o el autosave).
+    Se repite con SQLITE_PROFILE "off" y "wal", cada uno en su propio fichero
+    (el modo WAL queda grabado en la BD). Latencias por tipo de operación y errores.
+    """
+    filas: list[dict] = []
+    empleados = list(data)
+    for profile in ("off", "wal"):
+        repo = WorkShiftRepository(f"sqlite:///{(folder / f'concurrency-{profile}.db').as_posix()}", sqlite_profile=profile)
+        for emp in empleados:
+            repo.for_employee(emp).upsert_many(data[emp])
+        lecturas: list[float] = []
+        escrituras: list[float] = []
+        errores: list[str] = []
+        lock = threading.Lock()
+        salida = threading.Barrier(sessions)
+
+        def sesion(i: int) -> None:
+            rng = random.Random(seed + i)
+            emp = empleados[i % len(empleados)]
+            scoped = repo.for_employee(emp)
+            turnos = data[emp]
+            salida.wait()
+            for _ in range(ops):
+                s = rng.choice(turnos)
+                escribe = rng.random() < write_ratio
+                t0 = perf_counter()
+                try:
+                    if escribe:
+                        scoped.add(s)
+                    else:
+                        d1 = s.work_date.replace(day=1)
+                        scoped.list_range_rows(d1, d1 + timedelta(days=31))
+                except Exception as e:  # `database is locked` con el perfil "off"
+                    with lock:
+                        errores.append(type(e).__name__)
+                    continue
+                with lock:
+                    (escrituras if escribe else lecturas).append(perf_counter() - t0)
+
+        hilos = [threading.Thread(target=sesion, args=(i,)) for i in range(sessions)]
+        t0 = perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = perf_counter() - t0
+        backend = f"sqlite-{profile}"
+        for nombre, tiempos in (("lectura", lecturas), ("escritura", escrituras)):
+            if not tiempos:
+                continue
+            fila = _fila(f"{sessions} sesiones concurrentes: {nombre}", backend, tiempos, len(tiempos))
+            fila["p95_s"] = _percentil(tiempos, 0.95)
+            fila["items_per_s"] = None  # latencias por operación; el caudal va en la fila "total"
+            filas.append(fila)
+        resumen = _fila(f"{sessions} sesiones concurrentes: total", backend, [total], sessions * ops)
+        resumen["errors"] = len(errores)
+        resumen["write_lock"] = repo.write_lock.snapshot()
+        filas.append(resumen)
+        repo.engine.dispose()
+    return filas
+
+
+# =========================
+# Ejecución completa de app.py (AppTest) en un proceso hijo
+# =========================
+def _apptest_child(reruns: int) -> None:
+    """Se ejecuta en el proceso hijo: imprime en la última línea los tiempos [primer run, reruns...]."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(APP_PATH), default_timeout=300)
+    tiempos = []
+    for _ in range(reruns + 1):
+        t0 = perf_counter()
+        at.run()
+        tiempos.append(perf_counter() - t0)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    print(json.dumps(tiempos))
+
+
+def bench_app(backend: str, url: str, data: dict, repeat: int) -> list[dict]:
+    repo = WorkShiftRepository(url, echo=False)
+    empleado = next(iter(data))
+    try:
+        repo.for_employee(empleado).upsert_many(data[empleado])
+        with tempfile.TemporaryDirectory(prefix="bench-app-") as data_dir:
+            env = {**os.environ, "DATA_DIR": data_dir, "DATABASE_URL": url, "EMPLOYEE_ID": empleado}
+            proc = subprocess.run(
+                [sys.executable, "-c", f"import bench; bench._apptest_child({int(repeat)})"],
+                cwd=str(APP_PATH.parent), env=env, capture_output=True, text=True,
+            )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "AppTest falló")
+        tiempos = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        _limpiar(repo, [empleado])
+        repo.engine.dispose()
+    filas = [_fila("app.py AppTest (primer run)", backend, tiempos[:1])]
+    if len(tiempos) > 1:
+        filas.append(_fila("app.py AppTest (rerun)", backend, tiempos[1:]))
+    return filas
+
+
+# =========================
+# Suite
+# =========================
+def run_suite(
+    employees: int = 3,
+    years: float = 1.0,
+    repeat: int = 5,
+    seed: int = 0,
+    add_sample: int = 200,
+    postgres_url: str | None = None,
+    with_app: bool = True,
+    pdf_only: bool = False,
+    sessions: int = 8,
+) -> dict:
+    """Ejecuta todas las medidas y devuelve el documento JSON de resultados."""
+    fin = hoy_local()
+    inicio = fin - timedelta(days=int(round(365 * years)) - 1)
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    data = generate_shifts(employees, years, start=inicio, seed=seed, prefix=f"bench-{run_id}")
+
+    commit, dirty = _git_commit()
+    doc = {
+        "version": RESULTS_VERSION,
+        "commit": commit, "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "params": {
+            "employees": employees, "years": years, "repeat": repeat, "seed": seed,
+            "add_sample": add_sample, "sessions": sessions, "shifts": sum(len(v) for v in data.values()),
+            "start": inicio.isoformat(), "end": fin.isoformat(),
+        },
+        "results": bench_pdf(data, repeat),
+        "skipped": [],
+    }
+    if pdf_only:
+        return doc
+    doc["results"] += bench_pure(data, repeat)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        tmp = Path(tmp)
+        backends = [("sqlite", f"sqlite:///{(tmp / 'bench.db').as_posix()}")]
+        postgres_url = postgres_url or os.getenv("BENCH_POSTGRES_URL")
+        if postgres_url:
+            backends.append(("postgres", postgres_url))
+        else:
+            doc["skipped"].append({"backend": "postgres", "reason": "sin --postgres-url ni BENCH_POSTGRES_URL"})
+        for backend, url in backends:
+            try:
+                doc["results"] += bench_backend(backend, url, data, repeat, add_sample, tmp / "pdf_cache")
+                if with_app:
+                    doc["results"] += bench_app(backend, url, data, repeat)
+            except Exception as e:
+                doc["skipped"].append({"backend": backend, "reason": f"{type(e).__name__}: {e}"})
+        if sessions > 1:
+            doc["results"] += bench_sqlite_concurrency(tmp, data, sessions=sessions, seed=seed)
+    return doc
+
+
+def write_results(doc: dict, path: Path) -> None:
+    path = Path(path)
+    path.write_text(json.dumps(doc, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def format_results(doc: dict) -> str:
+    lineas = [f"commit {doc.get('commit')}{' (con cambios)' if doc.get('dirty') else ''} · {doc['params']}"]
+    for r in doc["results"]:
+        ips = f"{r['items_per_s']:>12,.0f}/s" if r.get("items_per_s") else " " * 14
+        extra = f"  pico {r['peak_kb']:,.0f} KB" if "peak_kb" in r else ""
+        if "p95_s" in r:
+            extra += f"  p95 {r['p95_s'] * 1000:.2f} ms  máx {r['max_s'] * 1000:.2f} ms"
+        if "errors" in r:
+            extra += f"  errores {r['errors']}"
+        lineas.append(f"{r['name']:<48} {r['backend']:<9} {r['median_s'] * 1000:>10.2f} ms {ips}  (n={r['items']}){extra}")
+    for s in doc.get("skipped", []):
+        lineas.append(f"omitido {s['backend']}: {s['reason']}")
+    return "\n".join(lineas)
+
+
+def compare(base: dict, head: dict) -> str:
+    """Mediana de `head` frente a `base` por (name, backend); >1.0 = más lento."""
+    previas = {(r["name"], r["backend"]): r for r in base["results"]}
+    lineas = [f"{base.get('commit')} -> {head.get('commit')}"]
+    for r in head["results"]:
+        b = previas.get((r["name"], r["backend"]))
+        if b is None or not b["median_s"]:
+            continue
+        ratio = r["median_s"] / b["median_s"]
+        marca = "  <-- más lento" if ratio > 1.10 else ""
+        lineas.append(f"{r['name']:<48} {r['backend']:<9} x{ratio:5.2f}{marca}")
+    return "\n".join(lineas)
+
+
+__all__ = ["bench_app", "bench_backend", "bench_pdf", "bench_pure", "bench_sqlite_concurrency", "compare", "format_results", "run_suite", "write_results"]
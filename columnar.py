@@ -0,0 +1,230 @@
+# columnar.py
+# -----------------------------------------------
+# Histórico de turnos en formato columnar (Parquet o Arrow IPC) para análisis sin tocar la BD:
+#   <carpeta>/month=YYYY-MM/part-0.parquet   (todas las columnas de workshiftdb menos id)
+#   <carpeta>/_manifest.json                 (data_version por empleado; hash, filas y empleados por mes)
+# La exportación compara los data_version con los del manifest: solo lee los meses en los
+# que tiene (o tenía) turnos algún empleado que cambió, con consultas por empleado y rango
+# de fechas que usan el índice (employee_id, work_date), y reescribe los que cambian de
+# hash. Sin escrituras desde la última exportación no lee ningún turno.
+# `read_history` filtra por fechas sobre las particiones: un año lee doce ficheros.
+# -----------------------------------------------
+from __future__ import annotations
+
+import json
+import operator
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import reduce
+from pathlib import Path
+from time import perf_counter
+from typing import Iterable
+
+from sqlalchemy import select
+
+from config import TZ
+from pdf_cache import content_key
+from reports import clave_mes
+from repository import WorkShiftDB, WorkShiftRepository
+from snapshots import rango_mes
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_ds
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:  # viene con streamlit; la CLI sin él avisa al usarse
+    HAVE_PYARROW = False
+
+MANIFEST_NAME = "_manifest.json"
+FORMATS = {"parquet": "parquet", "arrow": "arrow"}  # formato -> extensión del fichero
+LAYOUT_VERSION = 1  # súbelo si cambian las columnas: se reescriben todos los meses
+MANIFEST_VERSION = 2  # 2: data_version por empleado y empleados de cada mes
+
+_COLS = ("employee_id", "work_date", "start_time", "end_time", "break_minutes",
+         "hours_worked", "overtime_hours", "notes")
+
+
+def _schema() -> "pa.Schema":
+    return pa.schema([
+        ("employee_id", pa.string()),
+        ("work_date", pa.date32()),
+        ("start_time", pa.time32("s")),
+        ("end_time", pa.time32("s")),
+        ("break_minutes", pa.int32()),
+        ("hours_worked", pa.float64()),
+        ("overtime_hours", pa.float64()),
+        ("notes", pa.string()),
+    ])
+
+
+def _require_pyarrow() -> None:
+    if not HAVE_PYARROW:
+        raise RuntimeError("La exportación columnar requiere 'pyarrow'. Instala: pip install pyarrow")
+
+
+@dataclass
+class ColumnarExportResult:
+    written: list[str] = field(default_factory=list)    # meses (re)escritos
+    unchanged: int = 0                                   # meses que no se tocan (sin leer o mismo hash)
+    deleted: list[str] = field(default_factory=list)    # meses que ya no tienen filas
+    rows: int = 0                                        # filas leídas de la BD (solo meses candidatos)
+    seconds: float = 0.0
+
+
+def _load_manifest(folder: Path) -> dict:
+    try:
+        data = json.loads((folder / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_table(table: "pa.Table", path: Path, fmt: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if fmt == "parquet":
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _months_by_employee(repo: WorkShiftRepository, employees: set[str]) -> dict[str, set[str]]:
+    """YYYY-MM -> empleados de `employees` con turnos ese mes (solo lee el índice)."""
+    table = WorkShiftDB.__table__
+    meses: dict[str, set[str]] = {}
+    with repo.engine.connect() as conn:
+        for emp in sorted(employees):
+            fechas = conn.execute(select(table.c.work_date).where(table.c.employee_id == emp)).scalars()
+            for mes in {clave_mes(d) for d in fechas}:
+                meses.setdefault(mes, set()).add(emp)
+    return meses
+
+
+def _month_rows(repo: WorkShiftRepository, mes: str, employees: Iterable[str], batch_size: int) -> list[tuple]:
+    """Filas de `mes` de esos empleados, por empleado y fecha (el orden del índice)."""
+    table = WorkShiftDB.__table__
+    d1, d2 = rango_mes(mes)
+    stmt = (select(*(table.c[c] for c in _COLS))
+            .where(table.c.employee_id.in_(sorted(employees)), table.c.work_date >= d1, table.c.work_date <= d2)
+            .order_by(table.c.employee_id, table.c.work_date))
+    return [tuple(r) for rows in repo._stream(stmt, batch_size) for r in rows]
+
+
+def export_history(repo: WorkShiftRepository, folder: str | os.PathLike, fmt: str = "parquet",
+                   batch_size: int = 5000) -> ColumnarExportResult:
+    """Exporta (o pone al día) el histórico columnar en `folder`, un fichero por mes."""
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt!r} (usa {', '.join(FORMATS)})")
+    t0 = perf_counter()
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    res = ColumnarExportResult()
+    previo = _load_manifest(folder)
+    vigente = (previo.get("version") == MANIFEST_VERSION and previo.get("format") == fmt
+               and previo.get("layout") == LAYOUT_VERSION)
+    meses_previos: dict[str, dict] = previo.get("months", {}) if vigente else {}
+    versiones_previas: dict[str, int] = previo.get("versions", {}) if vigente else {}
+    # Antes que los turnos: si alguien escribe mientras tanto, la próxima vuelta lo vuelve a leer
+    versiones = repo.data_versions()
+    cambiados = {e for e in versiones.keys() | versiones_previas.keys()
+                 if versiones.get(e) != versiones_previas.get(e)}
+
+    # Meses candidatos: donde hay o había turnos de un empleado cambiado, o falta el fichero
+    ahora = _months_by_employee(repo, cambiados)
+    candidatos = set(ahora)
+    for mes, entrada in meses_previos.items():
+        if cambiados.intersection(entrada.get("employees", ())) or not (folder / entrada.get("file", "")).is_file():
+            candidatos.add(mes)
+    meses: dict[str, dict] = {m: e for m, e in meses_previos.items() if m not in candidatos}
+    res.unchanged = len(meses)
+
+    schema = _schema()
+    for mes in sorted(candidatos):
+        anterior = meses_previos.get(mes, {})
+        empleados = (set(anterior.get("employees", ())) - cambiados) | ahora.get(mes, set())
+        filas = _month_rows(repo, mes, empleados, batch_size) if empleados else []
+        if not filas:
+            continue  # se borra su partición más abajo
+        res.rows += len(filas)
+        h = content_key(filas, LAYOUT_VERSION, fmt)
+        nombre = f"month={mes}"
+        fichero = folder / nombre / f"part-0.{FORMATS[fmt]}"
+        empleados = sorted({f[0] for f in filas})
+        if anterior.get("hash") == h and fichero.is_file():
+            meses[mes] = {**anterior, "employees": empleados}
+            res.unchanged += 1
+            continue
+        columnas = list(zip(*filas))
+        tabla = pa.Table.from_arrays(
+            [pa.array(col, type=schema.field(i).type) for i, col in enumerate(columnas)], schema=schema
+        )
+        # Si cambió el formato queda un fichero con otra extensión: se limpia la partición
+        shutil.rmtree(folder / nombre, ignore_errors=True)
+        (folder / nombre).mkdir(parents=True)
+        _write_table(tabla, fichero, fmt)
+        meses[mes] = {
+            "hash": h, "rows": len(filas), "file": f"{nombre}/{fichero.name}", "employees": empleados,
+            "written_at": datetime.now(TZ).isoformat(timespec="seconds"),
+        }
+        res.written.append(mes)
+
+    # Particiones de meses que ya no tienen turnos (o de otro formato)
+    for p in folder.glob("month=*"):
+        mes = p.name.removeprefix("month=")
+        if mes not in meses:
+            shutil.rmtree(p, ignore_errors=True)
+            res.deleted.append(mes)
+
+    payload = {"version": MANIFEST_VERSION, "format": fmt, "layout": LAYOUT_VERSION, "versions": versiones,
+               "months": dict(sorted(meses.items()))}
+    tmp = folder / f".{MANIFEST_NAME}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, folder / MANIFEST_NAME)
+    res.seconds = perf_counter() - t0
+    return res
+
+
+def read_history(folder: str | os.PathLike, start: date | None = None, end: date | None = None,
+                 employees: Iterable[str] | None = None, columns: list[str] | None = None) -> "pa.Table":
+    """
+    Turnos entre `start` y `end` (incluidos) del histórico columnar, sin consultar la BD.
+    El rango se convierte en un filtro sobre `month` (solo se abren esas particiones)
+    y en otro sobre `work_date` (las estadísticas de Parquet descartan el resto).
+    `.to_pandas()` sobre el resultado para trabajar con DataFrames.
+    """
+    _require_pyarrow()
+    folder = Path(folder)
+    fmt = _load_manifest(folder).get("format", "parquet")
+    # Esquema explícito: no se infiere abriendo ficheros y vale también sin ningún mes exportado
+    dataset = pa_ds.dataset(
+        folder, format="parquet" if fmt == "parquet" else "ipc",
+        schema=_schema().append(pa.field("month", pa.string())),
+        partitioning=pa_ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive"),
+        ignore_prefixes=[".", "_"],
+    )
+    condiciones = []
+    if start is not None:
+        condiciones += [pa_ds.field("month") >= clave_mes(start), pa_ds.field("work_date") >= start]
+    if end is not None:
+        condiciones += [pa_ds.field("month") <= clave_mes(end), pa_ds.field("work_date") <= end]
+    if employees is not None:
+        condiciones.append(pa_ds.field("employee_id").isin(list(employees)))
+    filtro = reduce(operator.and_, condiciones) if condiciones else None
+    return dataset.to_table(columns=columns, filter=filtro)
+
+
+def monthly_totals(folder: str | os.PathLike, start: date | None = None, end: date | None = None) -> "pa.Table":
+    """Horas y días por empleado y mes a partir del histórico columnar."""
+    tabla = read_history(folder, start, end, columns=["employee_id", "month", "hours_worked"])
+    return (tabla.group_by(["employee_id", "month"])
+            .aggregate([("hours_worked", "sum"), ("hours_worked", "count")])
+            .rename_columns(["employee_id", "month", "hours", "days"])
+            .sort_by([("employee_id", "ascending"), ("month", "ascending")]))
+
+
+__all__ = ["ColumnarExportResult", "FORMATS", "export_history", "monthly_totals", "read_history"]
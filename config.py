@@ -0,0 +1,118 @@
+# config.py
+# -----------------------------------------------
+# Parámetros y rutas compartidas por la app Streamlit, el archivador y la CLI.
+# -----------------------------------------------
+import os
+from pathlib import Path
+from datetime import date, datetime
+from time import perf_counter
+from zoneinfo import ZoneInfo
+
+# =========================
+# Zona horaria (Madrid)
+# =========================
+TZ = ZoneInfo("Europe/Madrid")
+
+def hoy_local() -> date:
+    return datetime.now(TZ).date()
+
+# =========================
+# Persistencia por entorno (con fallback seguro)
+# =========================
+DATA_DIR_MARKER = ".data_dir_ok"   # deja constancia de que la carpeta ya se probó escribible
+
+def _pick_data_dir() -> Path:
+    """
+    Elige carpeta escribible para DB/PDFs:
+    1) Si DATA_DIR está definido y es escribible, se usa.
+    2) Si /data es escribible (disco montado), se usa.
+    3) Si no, ./data en el working dir.
+    Una carpeta ya elegida en un arranque anterior (con la marca) se reconoce sin
+    escribir: solo se prueba con un fichero la primera vez.
+    """
+    candidates = []
+    env = os.getenv("DATA_DIR")
+    if env:
+        candidates.append(Path(env))
+    candidates += [Path("/data"), Path.cwd() / "data"]
+
+    for p in candidates:
+        if (p / DATA_DIR_MARKER).is_file() and os.access(p, os.W_OK):
+            return p
+        try:
+            p.mkdir(parents=True, exist_ok=True)
+            t = p / ".rwtest"
+            t.write_text("ok")
+            t.unlink(missing_ok=True)
+            (p / DATA_DIR_MARKER).touch()
+            return p
+        except Exception:
+            continue
+    return Path.cwd()  # último recurso
+
+_t0 = perf_counter()
+DATA_DIR = _pick_data_dir()
+DATA_DIR_PICK_S = perf_counter() - _t0  # fase "data_dir" del informe de arranque
+DEFAULT_SQLITE = f"sqlite:///{(DATA_DIR / 'workhours.db').as_posix()}"
+
+DB_URL = os.getenv("DATABASE_URL", DEFAULT_SQLITE)
+
+# Réplica local delante de la BD remota (LOCAL_REPLICA=1): la página lee y escribe en
+# este SQLite y un hilo sincroniza con DATABASE_URL (ver replica.py)
+REPLICA_LOCAL = os.getenv("LOCAL_REPLICA", "0") == "1"
+RUTA_REPLICA = Path(os.getenv("LOCAL_REPLICA_PATH", str(DATA_DIR / "replica.db")))
+
+# Carpeta de PDFs (si falla, cae a ./reportes_mensuales)
+CARPETA_REPORTES = DATA_DIR / "reportes_mensuales"
+try:
+    CARPETA_REPORTES.mkdir(parents=True, exist_ok=True)
+except Exception:
+    CARPETA_REPORTES = Path.cwd() / "reportes_mensuales"
+    CARPETA_REPORTES.mkdir(parents=True, exist_ok=True)
+
+# Caché de PDFs renderizados: una subcarpeta por empleado, cada una con su límite
+CARPETA_CACHE_PDF = DATA_DIR / "pdf_cache"
+
+# ZIPs anuales generados desde la página: la sesión guarda solo la ruta y la descarga
+# lee el fichero; los que tengan más de EXPORT_MAX_AGE_S se borran en la siguiente exportación
+CARPETA_EXPORTACIONES = DATA_DIR / "exportaciones"
+EXPORTACION_MAX_EDAD_S = float(os.getenv("EXPORT_MAX_AGE_S", str(24 * 3600)))
+EXPORTACION_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))  # procesos de render por ZIP, aparte de PDF_WORKERS
+
+# Empleado por defecto de la página (otros: ?empleado=<id> en la URL o --employee en la CLI)
+EMPLEADO_DEFECTO = os.getenv("EMPLOYEE_ID", "default")
+# La página solo abre empleados con turnos en la BD, el de por defecto o los de esta
+# lista (EMPLOYEE_ALLOWLIST="ana,luis"), para dar de alta a alguien antes de su primer turno
+EMPLEADOS_PERMITIDOS = frozenset(e.strip() for e in os.getenv("EMPLOYEE_ALLOWLIST", "").split(",") if e.strip())
+
+def carpeta_reportes_empleado(employee_id: str) -> Path:
+    """
+    PDFs archivados por empleado; el empleado "default" conserva la carpeta de siempre.
+    El resto, siempre en una subcarpeta propia de CARPETA_REPORTES (ValueError si no).
+    """
+    if employee_id == "default":
+        return CARPETA_REPORTES
+    base = CARPETA_REPORTES.resolve()
+    carpeta = (base / employee_id).resolve()
+    if carpeta.parent != base:
+        raise ValueError(f"Carpeta de reportes fuera de {base}: {employee_id!r}")
+    return carpeta
+
+# =========================
+# Parámetros globales
+# =========================
+TITULO_APP = "Registro horas Rorfeny "
+UMBRAL_DIARIO_H = 6.0              # objetivo diario (descanso ya descontado)
+DESCANSO_DEFECTO_MIN = 30          # minutos descanso por defecto
+UMBRAL_SEMANAL_H = 30.0            # contrato: 30 h/semana
+GRACIA_DIAS = 4                    # puedes editar el mes anterior hasta el día 4
+AVISO_ULTIMOS_DIAS = 2             # aviso cuando queden <= 2 días de mes
+
+# Salario (solo para PDF)
+HOURLY_GROSS_EUR = 13.30           # €/h brutos
+IRPF_EST_PERCENT = 0.15            # IRPF aproximado
+PDF_LAYOUT_VERSION = 1             # súbelo si cambia el diseño del PDF (invalida la caché)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))  # renders de PDF simultáneos por proceso
+ARCHIVO_LRU_PDFS = 8               # PDFs archivados servidos que se guardan en memoria
+# Empleados con archivador, informes y cachés en memoria a la vez (LRU entre las sesiones)
+EMPLEADOS_EN_MEMORIA = int(os.getenv("EMPLOYEES_IN_MEMORY", "16"))
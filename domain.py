@@ -2,8 +2,14 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date, time
+from typing import Iterable, Iterator
 
-@dataclass
+import numpy as np
+
+# date.toordinal() of 1970-01-01: converts ordinals to datetime64[D] and back
+EPOCH_ORDINAL = 719163
+
+@dataclass(slots=True)
 class WorkShift:
     """Represents a single work day entry."""
     work_date: date
@@ -19,3 +25,88 @@ class WorkShift:
         """Returns (ISO year, ISO week number). Useful for weekly overtime aggregation."""
         iso = self.work_date.isocalendar()
         return (iso[0], iso[1])
+
+
+@dataclass(frozen=True, slots=True)
+class ShiftBatch:
+    """
+    Columnar, array-backed collection of shifts (one entry per index).
+    Dates are proleptic ordinals, times are minutes since midnight.
+    Roughly 20 bytes per shift plus notes, versus several hundred for WorkShift objects.
+    """
+    work_date: np.ndarray       # int32 ordinals (date.toordinal())
+    start_minute: np.ndarray    # int16
+    end_minute: np.ndarray      # int16
+    break_minutes: np.ndarray   # int16
+    hours_worked: np.ndarray    # float64
+    overtime_hours: np.ndarray  # float64
+    notes: np.ndarray           # object (str | None)
+    ids: np.ndarray | None = None  # int64 row ids, when loaded from the database
+
+    @classmethod
+    def from_columns(cls, work_date, start_minute, end_minute, break_minutes,
+                     hours_worked, overtime_hours, notes, ids=None) -> "ShiftBatch":
+        return cls(
+            work_date=np.asarray(work_date, dtype=np.int32),
+            start_minute=np.asarray(start_minute, dtype=np.int16),
+            end_minute=np.asarray(end_minute, dtype=np.int16),
+            break_minutes=np.asarray(break_minutes, dtype=np.int16),
+            hours_worked=np.asarray(hours_worked, dtype=np.float64),
+            overtime_hours=np.asarray(overtime_hours, dtype=np.float64),
+            notes=np.asarray(notes, dtype=object),
+            ids=None if ids is None else np.asarray(ids, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "ShiftBatch":
+        """Rows of (work_date, start_time, end_time, break_minutes, hours_worked, overtime_hours, notes)."""
+        rows = list(rows)
+        return cls.from_columns(
+            [r[0].toordinal() for r in rows],
+            [r[1].hour * 60 + r[1].minute for r in rows],
+            [r[2].hour * 60 + r[2].minute for r in rows],
+            [r[3] or 0 for r in rows],
+            [r[4] or 0.0 for r in rows],
+            [r[5] or 0.0 for r in rows],
+            [r[6] for r in rows],
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple]) -> "ShiftBatch":
+        """
+        Rows of (id, work_date, start_minute, end_minute, break_minutes, hours_worked, overtime_hours, notes)
+        with times already as minutes since midnight. Transposed once and converted a column
+        at a time, so no per-row Python work beyond the zip.
+        """
+        columns = list(zip(*records)) or [()] * 8
+        ids, work_date, start_minute, end_minute, break_minutes, hours_worked, overtime_hours, notes = columns
+        dates = np.asarray(work_date, dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+        return cls.from_columns(
+            dates, start_minute, end_minute, break_minutes, hours_worked, overtime_hours, notes, ids=ids,
+        )
+
+    @classmethod
+    def from_shifts(cls, shifts: Iterable[WorkShift]) -> "ShiftBatch":
+        return cls.from_rows(
+            (s.work_date, s.start_time, s.end_time, s.break_minutes, s.hours_worked, s.overtime_hours, s.notes)
+            for s in shifts
+        )
+
+    def __len__(self) -> int:
+        return len(self.work_date)
+
+    def dates(self) -> np.ndarray:
+        """work_date as datetime64[D]."""
+        return (self.work_date.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+    def __iter__(self) -> Iterator[WorkShift]:
+        for i in range(len(self)):
+            yield WorkShift(
+                work_date=date.fromordinal(int(self.work_date[i])),
+                start_time=time(*divmod(int(self.start_minute[i]), 60)),
+                end_time=time(*divmod(int(self.end_minute[i]), 60)),
+                break_minutes=int(self.break_minutes[i]),
+                hours_worked=float(self.hours_worked[i]),
+                overtime_hours=float(self.overtime_hours[i]),
+                notes=self.notes[i],
+            )
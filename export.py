@@ -0,0 +1,161 @@
+# export.py
+# -----------------------------------------------
+# Exportación de un rango de meses (p. ej. un año para la gestoría) a un ZIP.
+# Las tablas salen de MonthReports.pdf_inputs (lo mismo que construir_df_para_pdf_mes);
+# los PDFs que no están en la caché se renderizan en un pool (procesos si hay varias CPUs)
+# y cada uno se escribe en el ZIP en cuanto termina: como mucho 2×workers PDFs en memoria.
+# La página usa siempre procesos (spawn, EXPORT_WORKERS) para que un año de renders no
+# compita por el GIL ni por el pool de PdfJobs con los PDFs de la página, y escribe el ZIP
+# en un fichero temporal de CARPETA_EXPORTACIONES en vez de guardarlo en memoria.
+# -----------------------------------------------
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter, time
+from typing import IO, Callable
+
+from reports import MonthReports, pdf_mes, yyyymm_to_tuple
+
+
+def meses_en_rango(desde: str, hasta: str) -> list[str]:
+    """'YYYY-MM' de `desde` a `hasta`, ambos incluidos."""
+    y, m = yyyymm_to_tuple(desde)
+    fin = yyyymm_to_tuple(hasta)
+    meses = []
+    while (y, m) <= fin:
+        meses.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return meses
+
+
+def meses_del_anio(anio: int) -> list[str]:
+    return meses_en_rango(f"{anio:04d}-01", f"{anio:04d}-12")
+
+
+@dataclass
+class ExportResult:
+    months: list[str] = field(default_factory=list)    # meses incluidos en el ZIP
+    skipped: list[str] = field(default_factory=list)   # meses sin registros
+    rendered: int = 0                                   # PDFs renderizados en el pool
+    cached: int = 0                                     # PDFs servidos desde la caché
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def months_per_s(self) -> float:
+        return len(self.months) / self.seconds if self.seconds > 0 else 0.0
+
+
+def _executor(workers: int, processes: bool) -> Executor:
+    if not processes:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-export")
+    # spawn: el servidor de Streamlit tiene hilos vivos y hacer fork con ellos no es seguro
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def export_zip(
+    reports: MonthReports,
+    months: list[str],
+    dest: str | os.PathLike | IO[bytes],
+    workers: int | None = None,
+    processes: bool | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> ExportResult:
+    """
+    Escribe en `dest` (ruta o fichero binario) un ZIP con reporte_YYYY-MM.pdf por mes con datos.
+    `progress(hechos, total)` se llama tras cada mes escrito.
+    `processes=None`: procesos si hay más de una CPU (con una, arrancarlos solo suma coste).
+    """
+    t0 = perf_counter()
+    res = ExportResult()
+    con_datos = reports.snapshots.months_with_data()
+    pendientes = []
+    for m in months:
+        (pendientes if m in con_datos else res.skipped).append(m)
+    total = len(pendientes)
+    workers = max(1, min(workers or os.cpu_count() or 1, total or 1))
+    if processes is None:
+        processes = (os.cpu_count() or 1) > 1
+
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        def escribir(m: str, data: bytes) -> None:
+            if not data:
+                raise RuntimeError("La exportación a PDF requiere 'reportlab'.")
+            zf.writestr(f"reporte_{m}.pdf", data)
+            res.months.append(m)
+            res.bytes_written += len(data)
+            if progress is not None:
+                progress(len(res.months), total)
+
+        en_curso: dict = {}
+        pool: Executor | None = None
+        try:
+            for m in pendientes:
+                clave, df_tbl, horas_mes, extras_mes_min = reports.pdf_inputs(m)
+                data = reports.pdf_cache.get(clave)
+                if data is not None:
+                    res.cached += 1
+                    escribir(m, data)
+                    continue
+                if pool is None:
+                    pool = _executor(workers, processes)
+                # Acota lo que hay en vuelo: como mucho 2×workers PDFs esperando a escribirse
+                while len(en_curso) >= 2 * workers:
+                    hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                    for fut in hechos:
+                        _volcar(fut, en_curso, reports, res, escribir)
+                fut = pool.submit(pdf_mes, m, df_tbl, horas_mes, extras_mes_min)
+                en_curso[fut] = (m, clave)
+            while en_curso:
+                hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for fut in hechos:
+                    _volcar(fut, en_curso, reports, res, escribir)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    res.months.sort()
+    res.seconds = perf_counter() - t0
+    return res
+
+
+def _volcar(fut, en_curso: dict, reports: MonthReports, res: ExportResult, escribir) -> None:
+    m, clave = en_curso.pop(fut)
+    data = fut.result()
+    res.rendered += 1
+    reports.pdf_cache.put(clave, data)
+    escribir(m, data)
+
+
+def nuevo_zip_temporal(carpeta: Path, prefijo: str) -> Path:
+    """Ruta de un .zip vacío y único en `carpeta` para que export_zip lo escriba."""
+    carpeta.mkdir(parents=True, exist_ok=True)
+    fd, ruta = tempfile.mkstemp(prefix=prefijo, suffix=".zip", dir=carpeta)
+    os.close(fd)
+    return Path(ruta)
+
+
+def limpia_exportaciones(carpeta: Path, max_edad_s: float) -> int:
+    """Borra los .zip de `carpeta` más viejos que `max_edad_s` (sesiones que ya no los descargarán)."""
+    limite = time() - max_edad_s
+    borrados = 0
+    for ruta in carpeta.glob("*.zip"):
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+                borrados += 1
+        except OSError:
+            pass  # otra sesión lo borró a la vez
+    return borrados
+
+
+__all__ = [
+    "ExportResult", "export_zip", "limpia_exportaciones", "meses_del_anio", "meses_en_rango",
+    "nuevo_zip_temporal",
+]
@@ -0,0 +1,152 @@
+# formatting.py
+# -----------------------------------------------
+# Formato de presentación con tablas precalculadas al importar: el Histórico y el PDF
+# formatean columnas enteras con un indexado de numpy, no con una llamada por celda.
+#   - minutos -> "H h M min" (con y sin signo) para todo el rango de un día
+#   - minuto del día -> "HH:MM"; ordinal de fecha -> nombre del día
+#   - TIME_OPTIONS de los selectores, con índice, conjunto y ajuste a la rejilla de 5 min
+# Las funciones escalares son la referencia: las tablas se generan con ellas y los
+# valores fuera de rango se formatean con ellas, así que la salida es la misma.
+# -----------------------------------------------
+from __future__ import annotations
+
+import numpy as np
+
+from lazy import lazy_module
+
+pd = lazy_module("pandas")
+
+DIAS_SEMANA = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
+MINUTOS_DIA = 24 * 60
+
+# =========================
+# Funciones escalares
+# =========================
+def formatea_minutos_signed(minutos: int) -> str:
+    if minutos == 0:
+        return "0 min"
+    sign = "-" if minutos < 0 else ""
+    minutos = abs(int(minutos))
+    h, m = divmod(minutos, 60)
+    if h == 0:
+        return f"{sign}{m} min"
+    if m == 0:
+        return f"{sign}{h} h"
+    return f"{sign}{h} h {m} min"
+
+def formatea_minutos(minutos: int) -> str:
+    minutos = max(0, int(minutos))
+    h, m = divmod(minutos, 60)
+    if h == 0:
+        return f"{m} min"
+    if m == 0:
+        return f"{h} h"
+    return f"{h} h {m} min"
+
+def horas_float_a_minutos(horas: float) -> int:
+    return int(round(float(horas) * 60))
+
+def formatea_horas_float(horas: float) -> str:
+    return formatea_minutos(horas_float_a_minutos(horas))
+
+def opciones_horas(step_min: int = 5, start: str = "06:00", end: str = "00:00") -> list[str]:
+    """Opciones HH:MM cada step_min, de start a 23:55 + 00:00 final."""
+    sh, sm = map(int, start.split(":"))
+    opts = []
+    for h in range(sh, 24):
+        for m in range(0, 60, step_min):
+            if h == sh and m < sm:
+                continue
+            opts.append(f"{h:02d}:{m:02d}")
+    if end == "00:00" and (not opts or opts[-1] != "00:00"):
+        opts.append("00:00")
+    return opts
+
+TIME_OPTIONS = opciones_horas(5, "06:00", "00:00")
+TIME_OPTIONS_INDEX = {o: i for i, o in enumerate(TIME_OPTIONS)}
+TIME_OPTIONS_SET = frozenset(TIME_OPTIONS)
+
+def ajusta_a_opcion(hhmm: str) -> str:
+    """'HH:MM' dentro de TIME_OPTIONS: antes de las 06:00 -> 06:00, después de 23:55 -> 00:00,
+    minutos al múltiplo de 5 inferior; lo que no se entiende -> 06:00."""
+    if hhmm in TIME_OPTIONS_SET:
+        return hhmm
+    try:
+        h, m = map(int, hhmm.split(":"))
+        if h < 6: return "06:00"
+        if h > 23 or (h == 23 and m > 55): return "00:00"
+        m = (m // 5) * 5
+        c = f"{h:02d}:{m:02d}"
+        return c if c in TIME_OPTIONS_SET else "06:00"
+    except Exception:
+        return "06:00"
+
+# =========================
+# Tablas
+# =========================
+HHMM = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+_DIAS = np.array(DIAS_SEMANA, dtype=object)  # el ordinal 1 (0001-01-01) es lunes
+# ±24 h cubre las horas y los extras de cualquier día; los totales que se salgan usan la función escalar
+_TXT_SIGNED = np.array([formatea_minutos_signed(m) for m in range(-MINUTOS_DIA, MINUTOS_DIA + 1)], dtype=object)
+_TXT = np.array([formatea_minutos(m) for m in range(MINUTOS_DIA + 1)], dtype=object)
+_OPCIONES = np.array(TIME_OPTIONS, dtype=object)
+# minuto del día -> posición en TIME_OPTIONS de su valor ajustado
+_AJUSTE = np.array([TIME_OPTIONS_INDEX[ajusta_a_opcion(s)] for s in HHMM], dtype=np.int16)
+_indice_hhmm: "pd.Index | None" = None  # HHMM como Index de pandas (tabla hash), al primer uso
+
+
+def _por_tabla(minutos, tabla: np.ndarray, desde: int, escalar) -> np.ndarray:
+    m = np.asarray(minutos, dtype=np.int64)
+    pos = m - desde
+    dentro = (pos >= 0) & (pos < len(tabla))
+    out = tabla[np.where(dentro, pos, 0)]
+    if not dentro.all():
+        out[~dentro] = [escalar(v) for v in m[~dentro].tolist()]
+    return out
+
+# =========================
+# Funciones por columna
+# =========================
+def minutos_signed_texto(minutos) -> np.ndarray:
+    """formatea_minutos_signed de un array de minutos enteros."""
+    return _por_tabla(minutos, _TXT_SIGNED, -MINUTOS_DIA, formatea_minutos_signed)
+
+def minutos_texto(minutos) -> np.ndarray:
+    """formatea_minutos de un array de minutos enteros (negativos -> "0 min")."""
+    return _por_tabla(np.maximum(np.asarray(minutos, dtype=np.int64), 0), _TXT, 0, formatea_minutos)
+
+def horas_texto(horas) -> np.ndarray:
+    """formatea_horas_float de un array de horas (np.rint redondea al par, como round())."""
+    return minutos_texto(np.rint(np.asarray(horas, dtype=np.float64) * 60))
+
+def dias_semana(ordinales) -> np.ndarray:
+    """Nombre del día para un array de ordinales (date.toordinal())."""
+    return _DIAS[(np.asarray(ordinales, dtype=np.int64) - 1) % 7]
+
+def hhmm(minutos) -> np.ndarray:
+    """'HH:MM' de un array de minutos del día (0..1439)."""
+    return HHMM[np.asarray(minutos)]
+
+def ajusta_minutos_a_opciones(minutos) -> np.ndarray:
+    """ajusta_a_opcion de un array de minutos del día (0..1439)."""
+    return _OPCIONES[_AJUSTE[np.asarray(minutos)]]
+
+def ajusta_columna_a_opciones(col: pd.Series) -> pd.Series:
+    """ajusta_a_opcion de una columna 'HH:MM': las horas válidas por tabla, el resto una a una."""
+    global _indice_hhmm
+    if _indice_hhmm is None:
+        _indice_hhmm = pd.Index(HHMM.tolist())
+    pos = _indice_hhmm.get_indexer(col)
+    validas = pos >= 0
+    out = _OPCIONES[_AJUSTE[np.where(validas, pos, 0)]]
+    if not validas.all():
+        out[~validas] = [ajusta_a_opcion(v) for v in col.to_numpy()[~validas]]
+    return pd.Series(out, index=col.index, name=col.name)
+
+
+__all__ = [
+    "DIAS_SEMANA", "HHMM", "MINUTOS_DIA", "TIME_OPTIONS", "TIME_OPTIONS_INDEX", "TIME_OPTIONS_SET",
+    "ajusta_a_opcion", "ajusta_columna_a_opciones", "ajusta_minutos_a_opciones", "dias_semana",
+    "formatea_horas_float", "formatea_minutos", "formatea_minutos_signed", "hhmm", "horas_float_a_minutos",
+    "horas_texto", "minutos_signed_texto", "minutos_texto", "opciones_horas",
+]
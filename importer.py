@@ -0,0 +1,112 @@
+# importer.py
+# -----------------------------------------------
+# Importación masiva de turnos desde CSV/JSON (p. ej. un año de fichajes).
+# Columnas aceptadas (inglés o las del Histórico):
+#   work_date|Fecha, start_time|Inicio, end_time|Fin, break_minutes|Descanso (min), notes|Notas
+# Fechas YYYY-MM-DD o DD/MM/YYYY; horas HH:MM. Horas y extras se recalculan.
+# -----------------------------------------------
+from __future__ import annotations
+
+import csv
+import json
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from config import UMBRAL_DIARIO_H, DESCANSO_DEFECTO_MIN
+from domain import WorkShift
+from repository import WorkShiftRepository
+from services import WorkHoursCalculator
+
+_ALIASES = {
+    "work_date": ("work_date", "Fecha", "fecha", "date"),
+    "start_time": ("start_time", "Inicio", "inicio", "start"),
+    "end_time": ("end_time", "Fin", "fin", "end"),
+    "break_minutes": ("break_minutes", "Descanso (min)", "descanso", "break"),
+    "notes": ("notes", "Notas", "notas"),
+}
+
+
+def _campo(record: dict, name: str):
+    for alias in _ALIASES[name]:
+        if alias in record and record[alias] not in (None, ""):
+            return record[alias]
+    return None
+
+
+def _parse_fecha(v) -> date:
+    if isinstance(v, date):
+        return v
+    v = str(v).strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"fecha no válida: {v!r}")
+
+
+def _parse_hora(v) -> time:
+    if isinstance(v, time):
+        return v
+    hh, mm = str(v).strip().split(":")[:2]
+    return time(int(hh), int(mm))
+
+
+def shift_from_record(record: dict, calc: WorkHoursCalculator) -> WorkShift:
+    """Convierte un registro (dict) en WorkShift con horas y delta diario recalculados."""
+    work_date = _parse_fecha(_campo(record, "work_date"))
+    start = _parse_hora(_campo(record, "start_time"))
+    end = _parse_hora(_campo(record, "end_time"))
+    descanso = _campo(record, "break_minutes")
+    descanso = DESCANSO_DEFECTO_MIN if descanso is None else int(descanso)
+    notas = _campo(record, "notes")
+    hw = calc.calculate_hours_worked(start, end, descanso)
+    return WorkShift(
+        work_date=work_date, start_time=start, end_time=end, break_minutes=descanso,
+        hours_worked=hw, overtime_hours=round(hw - UMBRAL_DIARIO_H, 2),
+        notes=(str(notas).strip() or None) if notas is not None else None,
+    )
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Registros de un .csv (cabecera) o .json (lista de objetos o JSON Lines)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            yield from csv.DictReader(fh)
+        return
+    if path.suffix.lower() in (".json", ".jsonl"):
+        with open(path, encoding="utf-8") as fh:
+            if path.suffix.lower() == ".jsonl":
+                for line in fh:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from json.load(fh)
+        return
+    raise ValueError(f"Formato no soportado: {path.suffix} (usa .csv, .json o .jsonl)")
+
+
+def iter_shifts(records: Iterable[dict], calc: WorkHoursCalculator | None = None) -> Iterator[WorkShift]:
+    calc = calc or WorkHoursCalculator(daily_threshold=UMBRAL_DIARIO_H)
+    for n, record in enumerate(records, start=1):
+        try:
+            yield shift_from_record(record, calc)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"Registro {n}: {e}") from e
+
+
+def import_file(repo: WorkShiftRepository, path: Path, upsert: bool = True, batch_size: int = 500) -> tuple[int, int]:
+    """
+    Importa un fichero en lotes. Devuelve (insertadas, actualizadas).
+    Todo el fichero se valida antes del primer lote: un registro erróneo no deja la
+    importación a medias (y repetirla después no cuenta dos veces lo ya escrito).
+    """
+    shifts = list(iter_shifts(read_records(path)))
+    if upsert:
+        return repo.upsert_many(shifts, batch_size=batch_size)
+    return repo.add_many(shifts, batch_size=batch_size), 0
+
+
+__all__ = ["import_file", "iter_shifts", "read_records", "shift_from_record"]
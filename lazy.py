@@ -0,0 +1,63 @@
+# lazy.py
+# -----------------------------------------------
+# Imports diferidos para el arranque en frío: `pd = lazy_module("pandas")` no importa
+# nada hasta el primer `pd.algo`. `preload(...)` importa en un hilo de fondo mientras
+# el proceso espera a la BD, para que el primer uso ya no pague el import.
+# -----------------------------------------------
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+
+_lock = threading.Lock()
+
+
+class LazyModule(ModuleType):
+    """Módulo que se importa de verdad en el primer acceso a un atributo."""
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        mod = self.__dict__["_lazy_module"]
+        if mod is None:
+            with _lock:  # el import de Python ya es seguro entre hilos; esto evita trabajo repetido
+                mod = self.__dict__["_lazy_module"] or importlib.import_module(self.__name__)
+                self.__dict__["_lazy_module"] = mod
+        return mod
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        estado = "cargado" if self.__dict__["_lazy_module"] is not None else "diferido"
+        return f"<módulo {self.__name__!r} ({estado})>"
+
+
+def lazy_module(name: str) -> ModuleType:
+    """El módulo si ya está importado; si no, un LazyModule que lo importará al usarse."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def preload(*names: str) -> threading.Thread | None:
+    """Importa en un hilo daemon los `names` aún no cargados; los errores se dejan para el primer uso real."""
+    pendientes = [n for n in names if n not in sys.modules]
+    if not pendientes:
+        return None
+    def _run() -> None:
+        for name in pendientes:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+    t = threading.Thread(target=_run, name="preload-imports", daemon=True)
+    t.start()
+    return t
+
+
+__all__ = ["LazyModule", "lazy_module", "preload"]
@@ -1,16 +1,224 @@
-# This is a sample Python script.
+# main.py
+# -----------------------------------------------
+# CLI para tareas fuera de la página Streamlit.
+#   python main.py archive                 -> archiva el mes anterior si toca (día 5+)
+#   python main.py archive --month 2025-09 -> archiva un mes concreto
+#   python main.py import fichajes.csv     -> importa turnos (CSV/JSON) en lotes
+#   python main.py export --year 2025      -> ZIP con los PDFs del año (render en paralelo)
+#   python main.py bench --out r.json      -> benchmarks con datos sintéticos (JSON)
+#   python main.py startup                 -> tiempos de arranque en frío por fase (JSON)
+#   python main.py sync                    -> sincroniza la réplica local (LOCAL_REPLICA) con --db-url
+#   python main.py history-export --out h/ -> histórico Parquet por mes (solo reescribe meses cambiados)
+#   python main.py history-totals --dir h/ -> horas por empleado y mes leyendo solo el Parquet
+#   --employee <id> en archive/import/export para otro empleado (archive --all-employees: todos)
+# -----------------------------------------------
+from __future__ import annotations
 
-# Press Shift+F10 to execute it or replace it with your code.
-# Press Double Shift to search everywhere for classes, files, tool windows, actions, and settings.
+from time import perf_counter
+_t_imports = perf_counter()
 
+import argparse
+import json
+import sys
+from pathlib import Path
 
-def print_hi(name):
-    # Use a breakpoint in the code line below to debug your script.
-    print(f'Hi, {name}')  # Press Ctrl+F8 to toggle the breakpoint.
+from config import DB_URL, DATA_DIR_PICK_S, RUTA_REPLICA, CARPETA_CACHE_PDF, EMPLEADO_DEFECTO, GRACIA_DIAS, carpeta_reportes_empleado
+from repository import SCHEMA_MODES, WorkShiftRepository
+from snapshots import MonthSnapshotCache
+from pdf_cache import PdfCache
+from reports import MonthReports
+from archiver import MonthArchiver
+from importer import import_file
+import perf
 
+perf.STARTUP.add("imports", perf_counter() - _t_imports)
+perf.STARTUP.add("data_dir", DATA_DIR_PICK_S)
+
+
+def build_reports(db_url: str = DB_URL, employee_id: str = EMPLEADO_DEFECTO,
+                  repo: WorkShiftRepository | None = None) -> MonthReports:
+    repo = (repo or WorkShiftRepository(db_url, echo=False)).for_employee(employee_id)
+    return MonthReports(MonthSnapshotCache(repo), PdfCache(CARPETA_CACHE_PDF / repo.employee_id))
+
+
+def _archive_employee(reports: MonthReports, employee_id: str, args: argparse.Namespace) -> None:
+    archiver = MonthArchiver(reports, carpeta_reportes_empleado(employee_id), grace_days=GRACIA_DIAS)
+    archiver.adopt_existing()
+    prefijo = "" if employee_id == EMPLEADO_DEFECTO else f"[{employee_id}] "
+    if args.month:
+        entry = archiver.archive_month(args.month, force=args.force)
+        if entry is None:
+            print(f"{prefijo}{args.month}: sin registros, nada que archivar")
+        else:
+            print(f"{prefijo}{args.month}: {entry['file']} ({entry['size']} bytes, sha256 {entry['checksum'][:12]})")
+        return
+    hechos = archiver.run_due()
+    print(prefijo + "Archivados: " + (", ".join(hechos) if hechos else "ninguno (al día)"))
+
+
+def cmd_archive(args: argparse.Namespace) -> int:
+    repo = WorkShiftRepository(args.db_url, echo=False)
+    empleados = repo.list_employees() if args.all_employees else [args.employee]
+    for employee_id in empleados:
+        _archive_employee(build_reports(employee_id=employee_id, repo=repo), employee_id, args)
+    return 0
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    repo = WorkShiftRepository(args.db_url, echo=False, employee_id=args.employee)
+    insertadas, actualizadas = import_file(repo, args.path, upsert=not args.append, batch_size=args.batch_size)
+    print(f"{args.path}: {insertadas} insertadas, {actualizadas} actualizadas")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from export import export_zip, meses_del_anio, meses_en_rango
+    if args.year:
+        meses = meses_del_anio(args.year)
+    elif args.desde and args.hasta:
+        meses = meses_en_rango(args.desde, args.hasta)
+    else:
+        print("Indica --year o --from/--to", file=sys.stderr)
+        return 2
+    out = args.out or f"reportes_{meses[0]}_{meses[-1]}.zip"
+    res = export_zip(
+        build_reports(args.db_url, args.employee), meses, out,
+        workers=args.workers, processes=False if args.threads else None,
+        progress=lambda hechos, total: print(f"  {hechos}/{total}", end="\r", flush=True),
+    )
+    print(f"{out}: {len(res.months)} meses ({res.rendered} renderizados, {res.cached} de caché), "
+          f"{res.bytes_written} bytes en {res.seconds:.2f} s · {res.months_per_s:.2f} meses/s")
+    if res.skipped:
+        print("Sin registros: " + ", ".join(res.skipped))
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    import bench
+    doc = bench.run_suite(
+        employees=args.employees, years=args.years, repeat=args.repeat, seed=args.seed,
+        add_sample=args.add_sample, postgres_url=args.postgres_url, with_app=not args.no_app,
+        pdf_only=args.pdf_only, sessions=args.sessions,
+    )
+    print(bench.format_results(doc))
+    if args.out:
+        bench.write_results(doc, args.out)
+        print(f"Resultados en {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            print(bench.compare(json.load(fh), doc))
+    return 0
+
+
+def cmd_startup(args: argparse.Namespace) -> int:
+    """Mismo informe que emite la app al arrancar: imports, data_dir, engine, esquema y primer mes."""
+    from config import hoy_local
+    from reports import clave_mes
+    repo = WorkShiftRepository(args.db_url, echo=False, employee_id=args.employee, schema_mode=args.schema_mode)
+    for fase, segundos in repo.startup_s.items():
+        perf.STARTUP.add(fase, segundos)
+    with perf.STARTUP.phase("first_month"):
+        build_reports(repo=repo, employee_id=args.employee).hist_df(clave_mes(hoy_local()))
+    print(json.dumps(perf.STARTUP.to_record(), ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_sync(args: argparse.Namespace) -> int:
+    from replica import ReplicatedWorkShiftRepository
+    repo = ReplicatedWorkShiftRepository(args.db_url, args.replica)
+    subidos, bajados = repo.sync_now()
+    estado = repo.sync_status()
+    print(f"{args.replica} <-> {estado['remote']}: {subidos} días subidos, {bajados} bajados, "
+          f"{estado['pending']} pendientes, {estado['conflicts']} conflictos")
+    return 0
 
-# Press the green button in the gutter to run the script.
-if __name__ == '__main__':
-    print_hi('PyCharm')
 
-# See PyCharm help at https://www.jetbrains.com/help/pycharm/
+def cmd_history_export(args: argparse.Namespace) -> int:
+    from columnar import export_history
+    res = export_history(WorkShiftRepository(args.db_url, echo=False), args.out, fmt=args.format)
+    print(f"{args.out}: {len(res.written)} meses escritos, {res.unchanged} sin cambios, "
+          f"{len(res.deleted)} borrados · {res.rows} filas leídas en {res.seconds:.2f} s")
+    if res.written:
+        print("Escritos: " + ", ".join(res.written))
+    return 0
+
+
+def cmd_history_totals(args: argparse.Namespace) -> int:
+    from datetime import date
+    from columnar import monthly_totals
+    desde = date.fromisoformat(args.desde) if args.desde else None
+    hasta = date.fromisoformat(args.hasta) if args.hasta else None
+    for fila in monthly_totals(args.dir, desde, hasta).to_pylist():
+        print(f"{fila['employee_id']:<20} {fila['month']}  {fila['hours']:>8.2f} h  {fila['days']:>3} días")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Registro de horas — tareas de mantenimiento")
+    parser.add_argument("--db-url", default=DB_URL, help="URL de la BD (por defecto DATABASE_URL)")
+    parser.add_argument("--employee", default=EMPLEADO_DEFECTO, help="Empleado (por defecto EMPLOYEE_ID o 'default')")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_archive = sub.add_parser("archive", help="Genera los PDFs mensuales y actualiza el manifest")
+    p_archive.add_argument("--month", help="Mes YYYY-MM (por defecto: el mes anterior si ya pasó la gracia)")
+    p_archive.add_argument("--force", action="store_true", help="Regenera aunque el contenido no haya cambiado")
+    p_archive.add_argument("--all-employees", action="store_true", help="Archiva todos los empleados con turnos")
+    p_archive.set_defaults(func=cmd_archive)
+
+    p_import = sub.add_parser("import", help="Importa turnos desde .csv/.json/.jsonl")
+    p_import.add_argument("path", help="Fichero a importar")
+    p_import.add_argument("--batch-size", type=int, default=500, help="Filas por transacción")
+    p_import.add_argument("--append", action="store_true", help="Inserta sin actualizar días existentes")
+    p_import.set_defaults(func=cmd_import)
+
+    p_export = sub.add_parser("export", help="ZIP con los PDFs de un rango de meses")
+    p_export.add_argument("--year", type=int, help="Año completo (enero a diciembre)")
+    p_export.add_argument("--from", dest="desde", help="Primer mes YYYY-MM")
+    p_export.add_argument("--to", dest="hasta", help="Último mes YYYY-MM")
+    p_export.add_argument("--out", help="Fichero ZIP (por defecto reportes_<desde>_<hasta>.zip)")
+    p_export.add_argument("--workers", type=int, help="Workers de render (por defecto nº de CPUs)")
+    p_export.add_argument("--threads", action="store_true", help="Hilos en vez de procesos (por defecto procesos si hay más de una CPU)")
+    p_export.set_defaults(func=cmd_export)
+
+    p_bench = sub.add_parser("bench", help="Benchmarks con histórico sintético")
+    p_bench.add_argument("--employees", type=int, default=3, help="Empleados sintéticos")
+    p_bench.add_argument("--years", type=float, default=1.0, help="Años de histórico por empleado")
+    p_bench.add_argument("--repeat", type=int, default=5, help="Repeticiones por medida")
+    p_bench.add_argument("--seed", type=int, default=0)
+    p_bench.add_argument("--add-sample", type=int, default=200, help="Turnos guardados uno a uno con add()")
+    p_bench.add_argument("--postgres-url", help="Postgres de pruebas (por defecto BENCH_POSTGRES_URL)")
+    p_bench.add_argument("--no-app", action="store_true", help="Sin la ejecución completa de app.py")
+    p_bench.add_argument("--sessions", type=int, default=8, help="Sesiones concurrentes contra SQLite (0: sin esta medida)")
+    p_bench.add_argument("--pdf-only", action="store_true", help="Solo el render de PDFs (tiempo y pico de memoria)")
+    p_bench.add_argument("--out", help="Fichero JSON de resultados")
+    p_bench.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    p_bench.set_defaults(func=cmd_bench)
+
+    p_startup = sub.add_parser("startup", help="Tiempos de arranque en frío por fase")
+    p_startup.add_argument("--schema-mode", choices=SCHEMA_MODES, help="Por defecto DB_SCHEMA_MODE o 'version'")
+    p_startup.set_defaults(func=cmd_startup)
+
+    p_sync = sub.add_parser("sync", help="Sube la bandeja de la réplica local y baja los cambios remotos")
+    p_sync.add_argument("--replica", type=Path, default=RUTA_REPLICA, help="Fichero SQLite de la réplica")
+    p_sync.set_defaults(func=cmd_sync)
+
+    p_hist = sub.add_parser("history-export", help="Histórico columnar (Parquet/Arrow) particionado por mes")
+    p_hist.add_argument("--out", type=Path, required=True, help="Carpeta del histórico")
+    p_hist.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    p_hist.set_defaults(func=cmd_history_export)
+
+    p_tot = sub.add_parser("history-totals", help="Horas por empleado y mes desde el histórico columnar")
+    p_tot.add_argument("--dir", type=Path, required=True, help="Carpeta del histórico")
+    p_tot.add_argument("--from", dest="desde", help="Primer día YYYY-MM-DD")
+    p_tot.add_argument("--to", dest="hasta", help="Último día YYYY-MM-DD")
+    p_tot.set_defaults(func=cmd_history_totals)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
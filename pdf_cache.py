@@ -0,0 +1,138 @@
+# pdf_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable
+
+
+def content_key(rows: Iterable[tuple], *params) -> str:
+    """Hash estable (sha256) de las filas de un mes + parámetros que afectan al PDF."""
+    h = hashlib.sha256()
+    for p in params:
+        h.update(repr(p).encode("utf-8"))
+        h.update(b"\x1f")
+    h.update(b"\x1e")
+    for r in rows:
+        h.update(repr(tuple(r)).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class PdfCache:
+    """
+    Caché de PDFs direccionada por contenido: memoria (LRU) + disco (<clave>.pdf).
+    Solo se renderiza cuando cambia la clave; `hits`/`misses` permiten comprobar
+    que reportlab ya no está en el camino caliente.
+    En disco también es LRU: un acierto actualiza el mtime del fichero y la poda borra
+    los menos usados. `max_disk_items` vale para toda la carpeta, así que cada caché
+    necesita la suya (app.py y main.py usan una subcarpeta por empleado).
+    """
+    def __init__(self, directory: Path | None = None, max_memory_items: int = 8, max_disk_items: int = 64):
+        self.directory = directory
+        self.max_memory_items = max(1, max_memory_items)
+        self.max_disk_items = max(1, max_disk_items)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+            except Exception:
+                self.directory = None  # sin disco: solo memoria
+
+    def _path(self, key: str) -> Path | None:
+        return (self.directory / f"{key}.pdf") if self.directory is not None else None
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._mem[key] = data
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory_items:
+                self._mem.popitem(last=False)
+
+    def peek(self, key: str) -> bool:
+        """¿Está la clave en caché? No cuenta como acierto ni fallo."""
+        with self._lock:
+            if key in self._mem:
+                return True
+        p = self._path(key)
+        return p is not None and p.exists()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return data
+        p = self._path(key)
+        if p is not None:
+            try:
+                data = p.read_bytes()
+            except OSError:
+                data = None
+            if data:
+                try:
+                    os.utime(p)  # recién usado: la poda lo deja para el final
+                except OSError:
+                    pass
+                self._remember(key, data)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return data
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        if not data:
+            return  # no cachear fallos de render (p. ej. sin reportlab)
+        self._remember(key, data)
+        p = self._path(key)
+        if p is None:
+            return
+        try:
+            tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+            self._prune_disk()
+        except OSError:
+            pass  # el disco es opcional
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        data = self.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            self.misses += 1
+        data = render()
+        self.put(key, data)
+        return data
+
+    def _prune_disk(self) -> None:
+        files = []
+        for f in self.directory.glob("*.pdf"):
+            try:
+                files.append((f.stat().st_mtime, f))
+            except OSError:
+                pass  # otro proceso la podó a la vez
+        files.sort(reverse=True)
+        for _, old in files[self.max_disk_items:]:
+            old.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._mem),
+            }
+
+
+__all__ = ["PdfCache", "content_key"]
@@ -0,0 +1,84 @@
+# pdf_jobs.py
+# -----------------------------------------------
+# Render de PDFs en segundo plano: un pool de hilos compartido por todas las sesiones
+# (app.py lo crea una vez con st.cache_resource) y un único future por clave de contenido
+# (empleado + mes + hash de filas, ver MonthReports.pdf_job). El hilo del script nunca
+# espera a reportlab: pide el PDF y, si aún no está, muestra "preparando".
+# -----------------------------------------------
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Callable
+
+from pdf_cache import PdfCache
+
+
+class PdfJobs:
+    """
+    Cola acotada de renders. Como mucho `max_workers` PDFs a la vez en todo el proceso;
+    peticiones repetidas de la misma clave comparten future en vez de encolar otro render.
+    """
+    MAX_FAILED = 256  # claves fallidas recordadas (las más antiguas se olvidan)
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-render")
+        self._jobs: dict[str, Future] = {}
+        self._failed: "OrderedDict[str, BaseException]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+
+    def _run(self, key: str, cache: PdfCache, render: Callable[[], bytes]) -> bytes:
+        data = cache.get_or_render(key, render)
+        # Ya está en la caché: la siguiente petición no necesita el future.
+        # Si el render falla el future se queda para que alguien vea el error.
+        with self._lock:
+            self._jobs.pop(key, None)
+        return data
+
+    def request(self, key: str, cache: PdfCache, render: Callable[[], bytes],
+                wait_s: float = 0.0) -> bytes | None:
+        """
+        Bytes del PDF si ya están (caché o render terminado), None si se está preparando.
+        `wait_s`: espera máxima al render, para que los meses pequeños salgan sin "preparando".
+        Un render fallido relanza su excepción en cada petición de esa clave sin volver a
+        encolarse: la clave incluye el hash del contenido, así que cambiar los datos lo reintenta.
+        """
+        data = cache.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            error = self._failed.get(key)
+            if error is not None:
+                raise error
+            fut = self._jobs.get(key)
+            if fut is None:
+                if cache.peek(key):  # terminó entre la consulta y el lock
+                    return cache.get(key)
+                fut = self._executor.submit(self._run, key, cache, render)
+                self._jobs[key] = fut
+                self.submitted += 1
+        try:
+            return fut.result(timeout=wait_s) if wait_s > 0 else (fut.result() if fut.done() else None)
+        except FuturesTimeout:
+            return None
+        except Exception as e:
+            with self._lock:
+                if self._jobs.get(key) is fut:
+                    del self._jobs[key]
+                self._failed[key] = e
+                while len(self._failed) > self.MAX_FAILED:
+                    self._failed.popitem(last=False)
+            raise
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["PdfJobs"]
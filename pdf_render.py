@@ -0,0 +1,278 @@
+# pdf_render.py
+# -----------------------------------------------
+# Render de los PDFs mensuales con estilos construidos una sola vez.
+#   - platypus con anchos de columna y altos de fila precalculados: mismo resultado que
+#     dejar que Table mida cada celda, pero midiendo cada texto distinto una sola vez
+#   - dibujo directo en canvas para tablas grandes (sin flowables por celda)
+# reports.dataframe_a_pdf usa el renderer compartido (`default_renderer()`).
+# -----------------------------------------------
+from __future__ import annotations
+
+import io
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # solo anotaciones: pandas ya lo ha cargado quien construye la tabla
+    import pandas as pd
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas as rl_canvas
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    HAVE_REPORTLAB = True
+except ImportError:  # la app avisa y sigue sin PDFs
+    HAVE_REPORTLAB = False
+
+PAGE_MARGIN = 24
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+FONT_SIZE = 10
+CELL_PAD_X = 6      # LEFTPADDING/RIGHTPADDING por defecto de Table
+CELL_PAD_Y = 3      # TOPPADDING/BOTTOMPADDING por defecto de Table
+LEADING = 12        # 1.2 × FONT_SIZE, el de las celdas de Table
+CANVAS_MIN_ROWS = 200
+
+
+@lru_cache(maxsize=8192)
+def _ancho(texto: str, fuente: str) -> float:
+    return stringWidth(texto, fuente, FONT_SIZE)
+
+
+def _texto(v) -> str:
+    # Igual que Table: None -> "", resto str()
+    return "" if v is None else str(v)
+
+
+class PdfRenderer:
+    """
+    Estilos (título, resumen, tabla, caja) creados en __init__ y reutilizados en cada render.
+    Sin estado por documento: una instancia se comparte entre hilos.
+    `fixed_widths=False` deja que platypus mida cada celda (el comportamiento anterior).
+    """
+    def __init__(self, fixed_widths: bool = True, canvas_min_rows: int = CANVAS_MIN_ROWS):
+        if not HAVE_REPORTLAB:
+            raise ImportError("reportlab no está instalado")
+        self.fixed_widths = fixed_widths
+        self.canvas_min_rows = canvas_min_rows
+        self.pagesize = landscape(A4)
+        styles = getSampleStyleSheet()
+        self.normal_style = styles["Normal"]
+        self.title_style = ParagraphStyle(name="TitleCentered", parent=styles["Title"], alignment=TA_CENTER)
+        self.resumen_main_style = ParagraphStyle(
+            name="ResumenMain", parent=styles["Normal"], alignment=TA_CENTER,
+            textColor=colors.black, fontSize=11, leading=13, spaceBefore=4, spaceAfter=2
+        )
+        self.resumen_salary_style = ParagraphStyle(
+            name="ResumenSalary", parent=styles["Normal"], alignment=TA_CENTER,
+            textColor=colors.black, fontSize=10, leading=12, spaceBefore=0, spaceAfter=0
+        )
+        self.header_bg = colors.HexColor("#F5F5F7")
+        self.grid_color = colors.HexColor("#E0E0E0")
+        self.border_color = colors.HexColor("#C7CCD6")
+        self.row_bgs = [colors.whitesmoke, colors.white]
+        self.table_style = TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), self.header_bg),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), FONT_BOLD),
+            ("FONTSIZE", (0, 0), (-1, -1), FONT_SIZE),
+            ("GRID", (0, 0), (-1, -1), 0.25, self.grid_color),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), self.row_bgs),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ])
+        self.resumen_box_style = TableStyle([
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("BACKGROUND", (0, 0), (-1, -1), colors.white),
+            ("BOX", (0, 0), (-1, -1), 0.6, self.border_color),
+            ("INNERPADDING", (0, 0), (-1, -1), 8),
+        ])
+
+    # ---- geometría de la tabla ----
+    def column_widths(self, header: list[str], body: list[list[str]]) -> list[float]:
+        """Ancho de cada columna = texto más ancho + padding, lo mismo que calcularía Table."""
+        anchos = []
+        for j, h in enumerate(header):
+            w = max((_ancho(linea, FONT_BOLD) for linea in h.split("\n")), default=0.0)
+            for texto in {fila[j] for fila in body}:
+                for linea in texto.split("\n"):
+                    w = max(w, _ancho(linea, FONT))
+            anchos.append(w + 2 * CELL_PAD_X)
+        return anchos
+
+    @staticmethod
+    def row_heights(filas: list[list[str]]) -> list[float]:
+        return [LEADING * max(t.count("\n") + 1 for t in fila) + 2 * CELL_PAD_Y for fila in filas]
+
+    @staticmethod
+    def _celdas(df: pd.DataFrame) -> tuple[list[str], list[list[str]]]:
+        header = [_texto(c) for c in df.columns]
+        body = [[_texto(v) for v in fila] for fila in df.itertuples(index=False, name=None)]
+        return header, body
+
+    # ---- render ----
+    def render(self, df: pd.DataFrame, titulo: str, resumen_linea1: str | None = None,
+               resumen_linea2: str | None = None) -> bytes:
+        if len(df) >= self.canvas_min_rows:
+            return self.render_canvas(df, titulo, resumen_linea1, resumen_linea2)
+        return self.render_platypus(df, titulo, resumen_linea1, resumen_linea2)
+
+    def _doc(self, buf) -> "SimpleDocTemplate":
+        return SimpleDocTemplate(buf, pagesize=self.pagesize, topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN,
+                                 leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN)
+
+    def _draw_page_border(self, canvas, doc_obj) -> None:
+        canvas.saveState()
+        w, h = self.pagesize
+        canvas.setStrokeColor(self.border_color)
+        canvas.setLineWidth(0.8)
+        margin = 12
+        canvas.rect(margin, margin, w - 2*margin, h - 2*margin)
+        canvas.restoreState()
+
+    def _resumen_flowables(self, doc_width: float, l1: str | None, l2: str | None) -> list:
+        if not (l1 or l2):
+            return []
+        celulas = []
+        if l1:
+            celulas.append([Paragraph(l1, self.resumen_main_style)])
+        if l2:
+            celulas.append([Paragraph(l2, self.resumen_salary_style)])
+        summary_width = min(520, 0.65 * doc_width)
+        resumen_box = Table(celulas, colWidths=[summary_width], hAlign="CENTER")
+        resumen_box.setStyle(self.resumen_box_style)
+        return [Spacer(1, 12), resumen_box]
+
+    def render_platypus(self, df: pd.DataFrame, titulo: str, resumen_linea1: str | None = None,
+                        resumen_linea2: str | None = None) -> bytes:
+        buf = io.BytesIO()
+        doc = self._doc(buf)
+        story = [Paragraph(titulo, self.title_style), Spacer(1, 8)]
+        if df.empty:
+            story.append(Paragraph("Sin datos para mostrar.", self.normal_style))
+        else:
+            header, body = self._celdas(df)
+            data = [header] + body
+            if self.fixed_widths:
+                table = Table(data, colWidths=self.column_widths(header, body),
+                              rowHeights=self.row_heights(data), repeatRows=1, hAlign="CENTER")
+            else:
+                table = Table(data, repeatRows=1, hAlign="CENTER")
+            table.setStyle(self.table_style)
+            story.append(table)
+        story += self._resumen_flowables(doc.width, resumen_linea1, resumen_linea2)
+        doc.build(story, onFirstPage=self._draw_page_border, onLaterPages=self._draw_page_border)
+        return buf.getvalue()
+
+    def render_canvas(self, df: pd.DataFrame, titulo: str, resumen_linea1: str | None = None,
+                      resumen_linea2: str | None = None) -> bytes:
+        """
+        Misma maquetación dibujando la tabla directamente: cabecera repetida en cada página,
+        filas alternas, rejilla y caja de resumen al final. Para tablas de cientos de filas.
+        """
+        if df.empty:
+            return self.render_platypus(df, titulo, resumen_linea1, resumen_linea2)
+        header, body = self._celdas(df)
+        anchos = self.column_widths(header, body)
+        altos = self.row_heights([header] + body)
+        page_w, page_h = self.pagesize
+        frame_x, frame_w = PAGE_MARGIN + 6, page_w - 2 * PAGE_MARGIN - 12   # padding del Frame de platypus
+        top, bottom = page_h - PAGE_MARGIN - 6, PAGE_MARGIN + 6
+        table_w = sum(anchos)
+        x0 = frame_x + max(0.0, (frame_w - table_w) / 2)
+        xs = [x0]
+        for w in anchos:
+            xs.append(xs[-1] + w)
+
+        buf = io.BytesIO()
+        c = rl_canvas.Canvas(buf, pagesize=self.pagesize)
+        c.setTitle(titulo)
+
+        def nueva_pagina(primera: bool) -> float:
+            if not primera:
+                c.showPage()
+            self._draw_page_border(c, None)
+            y = top
+            if primera:
+                # Título con el estilo "Title" (Helvetica-Bold 18, centrado) + Spacer(1, 8)
+                st = self.title_style
+                y -= st.leading
+                c.setFont(st.fontName, st.fontSize)
+                c.setFillColor(st.textColor)
+                c.drawCentredString(frame_x + frame_w / 2, y + (st.leading - st.fontSize) / 2 + 1, titulo)
+                y -= st.spaceAfter + 8
+            return y
+
+        def fila(y: float, celdas: list[str], h: float, fondo, fuente: str) -> None:
+            if fondo is not None:
+                c.setFillColor(fondo)
+                c.rect(x0, y - h, table_w, h, stroke=0, fill=1)
+            c.setFillColor(colors.black)
+            c.setFont(fuente, FONT_SIZE)
+            for j, texto in enumerate(celdas):
+                lineas = texto.split("\n")
+                cx = (xs[j] + xs[j + 1]) / 2
+                # VALIGN MIDDLE como en Table
+                base = y - h / 2 + (len(lineas) * LEADING) / 2 - FONT_SIZE
+                for k, linea in enumerate(lineas):
+                    c.drawCentredString(cx, base - k * LEADING, linea)
+
+        def rejilla(y_top: float, ys: list[float]) -> None:
+            c.setStrokeColor(self.grid_color)
+            c.setLineWidth(0.25)
+            y_bot = ys[-1]
+            for x in xs:
+                c.line(x, y_top, x, y_bot)
+            for y in [y_top] + ys:
+                c.line(x0, y, x0 + table_w, y)
+
+        y = nueva_pagina(primera=True)
+        i = 0
+        while i < len(body):
+            y_top = y
+            fila(y, header, altos[0], self.header_bg, FONT_BOLD)
+            y -= altos[0]
+            ys = [y]
+            while i < len(body) and y - altos[i + 1] >= bottom:
+                fila(y, body[i], altos[i + 1], self.row_bgs[i % 2], FONT)
+                y -= altos[i + 1]
+                ys.append(y)
+                i += 1
+            rejilla(y_top, ys)
+            if i < len(body):
+                y = nueva_pagina(primera=False)
+
+        flowables = self._resumen_flowables(page_w - 2 * PAGE_MARGIN, resumen_linea1, resumen_linea2)
+        if flowables:
+            caja = flowables[-1]
+            cw, ch = caja.wrap(frame_w, top - bottom)
+            if y - 12 - ch < bottom:
+                y = nueva_pagina(primera=False)
+            else:
+                y -= 12
+            caja.drawOn(c, frame_x + (frame_w - cw) / 2, y - ch)
+        c.showPage()
+        c.save()
+        return buf.getvalue()
+
+
+_default: PdfRenderer | None = None
+_default_lock = threading.Lock()
+
+
+def default_renderer() -> PdfRenderer | None:
+    """Renderer compartido del proceso (None si no hay reportlab)."""
+    global _default
+    if _default is None and HAVE_REPORTLAB:
+        with _default_lock:
+            if _default is None:
+                _default = PdfRenderer()
+    return _default
+
+
+__all__ = ["CANVAS_MIN_ROWS", "HAVE_REPORTLAB", "PdfRenderer", "default_renderer"]
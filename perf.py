@@ -0,0 +1,251 @@
+# perf.py
+# -----------------------------------------------
+# Instrumentación por rerun de la página:
+#   - tramos de tiempo por sección de app.py (`with perf.span("histórico"):`)
+#   - contadores SQL por rerun vía eventos públicos del engine: consultas, tiempo en BD,
+#     conexiones nuevas y espera al pool; las filas leídas las anota el repositorio
+#   - una línea JSON por rerun en el logger "perf" solo con PERF_LOG=1 (logs de Render),
+#     y panel opcional en la barra lateral
+#   - informe de arranque por fases, una vez por proceso (`STARTUP`)
+# Cada rerun de Streamlit corre en su propio hilo: los contadores son por hilo, así que
+# sesiones concurrentes y el hilo del archivador no se mezclan.
+# -----------------------------------------------
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time as _time
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import event
+
+_local = threading.local()
+SQL_PREVIEW_CHARS = 160
+log = logging.getLogger("perf")
+
+
+class RerunStats:
+    """Medidas de un rerun (o de cualquier bloque de trabajo en un hilo)."""
+    def __init__(self, label: str = "rerun", **fields):
+        self.label = label
+        self.fields = dict(fields)
+        self.started_at = _time.time()
+        self._t0 = perf_counter()
+        self._last_activity = self._t0
+        self.total_s: float | None = None
+        self.spans: dict[str, float] = {}
+        self.queries = 0
+        self.query_s = 0.0
+        self.rows = 0
+        self.new_connections = 0
+        self.pool_waits = 0
+        self.pool_wait_s = 0.0
+        self.slowest: list[tuple[float, str]] = []  # (segundos, sql) de las 3 consultas más lentas
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self._last_activity = perf_counter()
+            self.spans[name] = self.spans.get(name, 0.0) + (self._last_activity - t0)
+
+    def record_query(self, seconds: float, statement: str) -> None:
+        self._last_activity = perf_counter()
+        self.queries += 1
+        self.query_s += seconds
+        if len(self.slowest) < 3 or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, " ".join(statement.split())[:SQL_PREVIEW_CHARS]))
+            self.slowest.sort(key=lambda x: -x[0])
+            del self.slowest[3:]
+
+    def finish(self, interrupted: bool = False) -> dict:
+        """Cierra la medida. `interrupted`: el script se cortó (st.rerun/st.stop) y el
+        total se toma hasta la última actividad registrada, no hasta ahora."""
+        if self.total_s is None:
+            fin = self._last_activity if interrupted else perf_counter()
+            self.total_s = fin - self._t0
+            if interrupted:
+                self.fields["interrupted"] = True
+        return self.to_record()
+
+    def to_record(self) -> dict:
+        total = self.total_s if self.total_s is not None else perf_counter() - self._t0
+        return {
+            "event": self.label,
+            "ts": round(self.started_at, 3),
+            **self.fields,
+            "total_ms": round(total * 1000, 2),
+            "spans_ms": {k: round(v * 1000, 2) for k, v in self.spans.items()},
+            "sql": {
+                "queries": self.queries,
+                "rows": self.rows,
+                "db_ms": round(self.query_s * 1000, 2),
+                "new_connections": self.new_connections,
+                "pool_waits": self.pool_waits,
+                "pool_wait_ms": round(self.pool_wait_s * 1000, 2),
+                "slowest": [{"ms": round(s * 1000, 2), "sql": q} for s, q in self.slowest],
+            },
+        }
+
+
+class StartupReport:
+    """
+    Fases del arranque en frío de un proceso (imports, data_dir, engine, schema_check...).
+    Cada fase se registra una sola vez: en los reruns siguientes `add` no hace nada.
+    """
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.emitted = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases.setdefault(name, seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - t0)
+
+    def to_record(self) -> dict:
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "event": "startup",
+            "ts": round(_time.time(), 3),
+            "pid": os.getpid(),
+            "total_ms": round(sum(phases.values()) * 1000, 2),
+            "phases_ms": {k: round(v * 1000, 2) for k, v in phases.items()},
+        }
+
+    def emit_once(self) -> dict:
+        """Emite el informe la primera vez que se llama en el proceso."""
+        record = self.to_record()
+        with self._lock:
+            if self.emitted:
+                return record
+            self.emitted = True
+        emit(record)
+        return record
+
+
+STARTUP = StartupReport()
+
+
+def current() -> RerunStats | None:
+    return getattr(_local, "stats", None)
+
+
+def begin(label: str = "rerun", **fields) -> RerunStats:
+    """Empieza a medir en este hilo (sustituye cualquier medida anterior del hilo)."""
+    stats = RerunStats(label, **fields)
+    _local.stats = stats
+    return stats
+
+
+def end() -> RerunStats | None:
+    stats = current()
+    _local.stats = None
+    if stats is not None:
+        stats.finish()
+    return stats
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Tramo en la medida activa del hilo; sin medida activa no hace nada."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    with stats.span(name):
+        yield
+
+
+def record_rows(n: int) -> None:
+    """Filas leídas en la medida activa del hilo (las anota quien consume el resultado)."""
+    stats = current()
+    if stats is not None:
+        stats.rows += n
+
+
+def emit(record: dict) -> None:
+    """Una línea JSON en el logger "perf", solo si se pide con PERF_LOG=1."""
+    if os.getenv("PERF_LOG", "0") != "1":
+        return
+    if not log.handlers:
+        # Sin configuración de logging en la app: a stdout, una línea por registro
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    log.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+# =========================
+# Eventos del engine
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perf_t0", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info["perf_t0"].pop()
+    stats = current()
+    if stats is not None:
+        stats.record_query(perf_counter() - t0, statement)
+
+
+def _on_error(ctx):
+    # Una sentencia que falla no llega a after_cursor_execute: se saca su marca aquí
+    # para que la pila de la conexión no crezca con cada error
+    if ctx.connection is not None and ctx.execution_context is not None:
+        marcas = ctx.connection.info.get("perf_t0")
+        if marcas:
+            t0 = marcas.pop()
+            stats = current()
+            if stats is not None:
+                stats.record_query(perf_counter() - t0, ctx.statement or "")
+
+
+def _on_connect(dbapi_conn, conn_record):
+    stats = current()
+    if stats is not None:
+        stats.new_connections += 1
+
+
+def _on_pool_acquire(seconds: float) -> None:
+    stats = current()
+    if stats is not None:
+        stats.pool_waits += 1
+        stats.pool_wait_s += seconds
+
+
+def instrument_engine(engine) -> None:
+    """Registra los contadores en `engine` (idempotente)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _on_error)
+    event.listen(engine, "connect", _on_connect)
+    metrics = getattr(engine.pool, "metrics", None)
+    if metrics is not None:
+        metrics.add_listener(_on_pool_acquire)
+
+
+__all__ = [
+    "RerunStats", "STARTUP", "StartupReport", "begin", "current", "emit", "end", "instrument_engine",
+    "record_rows", "span",
+]
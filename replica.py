@@ -0,0 +1,387 @@
+# replica.py
+# -----------------------------------------------
+# Réplica local (SQLite en DATA_DIR) delante de un Postgres remoto (Neon/Supabase):
+#   - las lecturas de la página van a la réplica: sin viaje de red por rerun
+#   - cada escritura se guarda en la réplica y, en la misma transacción, deja el día
+#     en una bandeja de salida (replica_outbox), así que sobrevive a reinicios
+#   - un hilo de fondo sube la bandeja al remoto (upsert por empleado + día) y baja
+#     los cambios hechos allí por otros (CLI, otra instancia)
+#   - la bajada es incremental: solo se leen los empleados cuya data_version remota
+#     cambió desde el último pull (guardada en replica_pulled, también en la réplica)
+# Conflictos: no gana el último que escribe. La réplica guarda en replica_base el último
+# estado del remoto que conoce de cada día (lo que bajó o subió). El pull no pisa un día
+# con cambios locales pendientes, y el push solo lo sube si el remoto sigue igual que esa
+# base; si otro lo cambió entre medias gana el remoto: la réplica adopta su valor y la
+# edición local queda en replica_conflicts (sync_status()["conflicts"]).
+# Los id no viajan: cada BD numera sus filas y los días se emparejan por
+# (employee_id, work_date), la clave única de workshiftdb.
+# El "remoto" puede ser cualquier URL (un segundo fichero SQLite para pruebas).
+# -----------------------------------------------
+from __future__ import annotations
+
+import threading
+import time as _time
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+from sqlalchemy import (
+    Column, Date, Float, Integer, MetaData, String, Table, Time, func, inspect, make_url, select, tuple_,
+)
+
+from repository import (
+    DEFAULT_EMPLOYEE, WorkShiftDB, WorkShiftRepository, _insert_stmt, _row_to_shift, _shift_columns,
+    _upsert_stmt,
+)
+
+# Fuera de SQLModel.metadata: la bandeja solo existe en la réplica, nunca en el remoto
+_metadata = MetaData()
+outbox = Table(
+    "replica_outbox", _metadata,
+    Column("seq", Integer, primary_key=True),
+    Column("employee_id", String(64), nullable=False),
+    Column("work_date", Date, nullable=False),
+    Column("queued_at", Float, nullable=False),
+)
+
+# data_version remota de cada empleado en el último pull: el mismo valor = nada que bajar
+pulled = Table(
+    "replica_pulled", _metadata,
+    Column("employee_id", String(64), primary_key=True),
+    Column("remote_version", Integer, nullable=False),
+)
+
+_SYNC_COLS = ("start_time", "end_time", "break_minutes", "hours_worked", "overtime_hours", "notes")
+
+
+def _day_columns() -> list[Column]:
+    return [
+        Column("start_time", Time, nullable=False),
+        Column("end_time", Time, nullable=False),
+        Column("break_minutes", Integer, nullable=False),
+        Column("hours_worked", Float, nullable=False),
+        Column("overtime_hours", Float, nullable=False),
+        Column("notes", String),
+    ]
+
+
+# Último estado del remoto que conoce la réplica por día: el push solo sobrescribe si sigue igual
+base = Table(
+    "replica_base", _metadata,
+    Column("employee_id", String(64), primary_key=True),
+    Column("work_date", Date, primary_key=True),
+    *_day_columns(),
+)
+
+# Ediciones locales descartadas porque el remoto cambió el mismo día antes de subirlas
+conflicts = Table(
+    "replica_conflicts", _metadata,
+    Column("seq", Integer, primary_key=True),
+    Column("employee_id", String(64), nullable=False),
+    Column("work_date", Date, nullable=False),
+    *_day_columns(),
+    Column("detected_at", Float, nullable=False),
+)
+
+
+class _ReplicaState:
+    """Estado compartido por todas las vistas for_employee() de la réplica."""
+    def __init__(self):
+        self.lock = threading.Lock()        # un push/pull a la vez
+        self.remote: WorkShiftRepository | None = None
+        self.thread: threading.Thread | None = None
+        self.stop = threading.Event()
+        self.wake = threading.Event()
+        self.pushed = 0
+        self.pulled = 0
+        self.last_push_at: float | None = None
+        self.last_pull_at: float | None = None
+        self.last_error: str | None = None
+        self.unchecked_upto = 0             # seq de la bandeja encolada antes de existir replica_base
+
+
+class ReplicatedWorkShiftRepository(WorkShiftRepository):
+    """
+    WorkShiftRepository que lee y escribe en una réplica SQLite y sincroniza con
+    `remote_url` en segundo plano (`start_sync`) o a demanda (`sync_now`).
+    """
+    def __init__(self, remote_url: str, replica_path: Path, echo: bool = False,
+                 employee_id: str = DEFAULT_EMPLOYEE, pull_interval_s: float = 60.0):
+        replica_path = Path(replica_path)
+        replica_path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(f"sqlite:///{replica_path.as_posix()}", echo=echo, employee_id=employee_id,
+                         sqlite_profile="wal")
+        self.remote_url = remote_url
+        self.pull_interval_s = pull_interval_s
+        self._state = _ReplicaState()
+        sin_base = not inspect(self.engine).has_table(base.name)
+        _metadata.create_all(self.engine)
+        if sin_base:
+            # Réplica anterior a replica_base: el próximo pull vuelve a bajar a todos y la llena.
+            # Lo que ya estaba en la bandeja no tiene base: se sube como antes, sin comprobar
+            with self._write_tx() as conn:
+                conn.execute(pulled.delete())
+                self._state.unchecked_upto = conn.execute(select(func.max(outbox.c.seq))).scalar() or 0
+        # Réplica nueva: se llena antes de servir la primera página (si el remoto responde)
+        if self._is_empty():
+            t0 = perf_counter()
+            try:
+                self.pull()
+            except Exception as e:
+                self._state.last_error = f"{type(e).__name__}: {e}"
+            self.startup_s["replica_bootstrap"] = perf_counter() - t0
+
+    def _is_empty(self) -> bool:
+        with self.engine.connect() as conn:
+            return (conn.execute(select(WorkShiftDB.__table__.c.id).limit(1)).first() is None
+                    and conn.execute(select(outbox.c.seq).limit(1)).first() is None)
+
+    def _remote(self) -> WorkShiftRepository:
+        if self._state.remote is None:
+            self._state.remote = WorkShiftRepository(self.remote_url)
+        return self._state.remote
+
+    # ---- escrituras locales ----
+    def _after_write(self, conn, dias) -> None:
+        super()._after_write(conn, dias)
+        ahora = _time.time()
+        conn.execute(outbox.insert(), [
+            {"employee_id": self.employee_id, "work_date": d, "queued_at": ahora} for d in set(dias)
+        ])
+        self._state.wake.set()
+
+    def pending(self) -> int:
+        """Días con cambios locales aún sin subir al remoto."""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(outbox)).scalar_one()
+
+    # ---- sincronización ----
+    def push(self, limit: int = 500) -> int:
+        """
+        Sube al remoto hasta `limit` entradas de la bandeja. Devuelve los días subidos.
+        Cada día se sube solo si el remoto sigue como lo dejó el último sync (replica_base);
+        si no, gana el remoto y la edición local pasa a replica_conflicts.
+        """
+        with self._state.lock:
+            with self.engine.connect() as conn:
+                entradas = conn.execute(select(outbox).order_by(outbox.c.seq).limit(limit)).all()
+            if not entradas:
+                return 0
+            por_empleado: dict[str, set[date]] = {}
+            for e in entradas:
+                por_empleado.setdefault(e.employee_id, set()).add(e.work_date)
+            table = WorkShiftDB.__table__
+            remote = self._remote()
+            subidos: dict[str, list] = {}
+            choques: dict[str, dict[date, tuple | None]] = {}
+            for emp, dias in por_empleado.items():
+                # Estado actual del día en la réplica (varias ediciones del mismo día = un upsert)
+                with self.engine.connect() as conn:
+                    filas = conn.execute(
+                        select(*_shift_columns())
+                        .where(table.c.employee_id == emp, table.c.work_date.in_(dias))
+                    ).all()
+                    bases = {
+                        r[0]: tuple(r[1:])
+                        for r in conn.execute(select(base.c.work_date, *(base.c[c] for c in _SYNC_COLS))
+                                              .where(base.c.employee_id == emp, base.c.work_date.in_(dias)))
+                    }
+                vista = remote.for_employee(emp)
+                # Comprobación y escritura en la misma transacción del remoto
+                with vista._write_tx() as rconn:
+                    actuales = {
+                        r[0]: tuple(r[1:])
+                        for r in rconn.execute(
+                            select(table.c.work_date, *(table.c[c] for c in _SYNC_COLS))
+                            .where(table.c.employee_id == emp, table.c.work_date.in_(dias))
+                            .with_for_update()
+                        )
+                    }
+                    sin_comprobar = {e.work_date for e in entradas
+                                     if e.employee_id == emp and e.seq <= self._state.unchecked_upto}
+                    ok = [f for f in filas
+                          if f.work_date in sin_comprobar or actuales.get(f.work_date) == bases.get(f.work_date)]
+                    if ok:
+                        rconn.execute(_insert_stmt(remote.engine.dialect.name, "update"),
+                                      [vista._values(_row_to_shift(f)) for f in ok])
+                        vista._after_write(rconn, [f.work_date for f in ok])
+                subidos[emp] = ok
+                listos = {f.work_date for f in ok}
+                choques[emp] = {d: actuales.get(d) for d in dias if d not in listos}
+            ahora = _time.time()
+            with self._write_tx() as conn:
+                # Solo lo leído: lo encolado mientras tanto tiene seq mayor y se sube en la siguiente
+                conn.execute(outbox.delete().where(outbox.c.seq <= entradas[-1].seq))
+                for emp, ok in subidos.items():
+                    if ok:
+                        conn.execute(
+                            _upsert_stmt(self.engine.dialect.name, base, ["employee_id", "work_date"], _SYNC_COLS),
+                            [{"employee_id": emp, "work_date": f.work_date, **dict(zip(_SYNC_COLS, f[1:]))}
+                             for f in ok],
+                        )
+                for emp, dias in choques.items():
+                    if dias:
+                        self._adopt_remote(conn, emp, dias, ahora)
+            n = sum(len(ok) for ok in subidos.values())
+            self._state.pushed += n
+            self._state.last_push_at = ahora
+            return n
+
+    def _adopt_remote(self, conn, emp: str, remotos: dict[date, tuple | None], ahora: float) -> None:
+        """Días en conflicto: la edición local va a replica_conflicts y el día toma el valor remoto."""
+        table = WorkShiftDB.__table__
+        dias = list(remotos)
+        locales = conn.execute(
+            select(table.c.work_date, *(table.c[c] for c in _SYNC_COLS))
+            .where(table.c.employee_id == emp, table.c.work_date.in_(dias))
+        ).all()
+        if locales:
+            conn.execute(conflicts.insert(), [
+                {"employee_id": emp, "work_date": r[0], **dict(zip(_SYNC_COLS, r[1:])), "detected_at": ahora}
+                for r in locales
+            ])
+        # Incluidas las ediciones encoladas después: el día entero pasa al valor remoto
+        conn.execute(outbox.delete().where(outbox.c.employee_id == emp, outbox.c.work_date.in_(dias)))
+        conn.execute(base.delete().where(base.c.employee_id == emp, base.c.work_date.in_(dias)))
+        conn.execute(table.delete().where(table.c.employee_id == emp, table.c.work_date.in_(dias)))
+        filas = [{"employee_id": emp, "work_date": d, **dict(zip(_SYNC_COLS, v))}
+                 for d, v in remotos.items() if v is not None]
+        if filas:
+            conn.execute(table.insert(), filas)
+            conn.execute(base.insert(), filas)
+        vista = self.for_employee(emp)
+        vista._refresh_rollups(conn, dias)
+        vista._bump_version(conn)
+
+    def pull(self) -> int:
+        """
+        Trae a la réplica el estado del remoto de los empleados cuya data_version remota
+        cambió desde el último pull, salvo los días con cambios locales pendientes.
+        Sin cambios en el remoto cuesta una consulta (la tabla data_version).
+        Devuelve los días añadidos, cambiados o borrados.
+        """
+        with self._state.lock:
+            table = WorkShiftDB.__table__
+            cols = (table.c.employee_id, table.c.work_date, *(table.c[c] for c in _SYNC_COLS))
+            remote = self._remote()
+            # Versiones antes que filas: si el remoto cambia entre medias, la marca guardada
+            # queda por detrás y el siguiente pull vuelve a bajar a ese empleado
+            versiones = remote.data_versions()
+            with self.engine.connect() as conn:
+                marcas = dict(conn.execute(select(pulled.c.employee_id, pulled.c.remote_version)).all())
+            empleados = sorted(e for e, v in versiones.items() if marcas.get(e) != v)
+            self._state.last_pull_at = _time.time()
+            if not empleados:
+                return 0
+            with remote.engine.connect() as conn:
+                remoto = {
+                    (r[0], r[1]): tuple(r[2:])
+                    for r in conn.execute(select(*cols).where(table.c.employee_id.in_(empleados)))
+                }
+            cambios: dict[str, set[date]] = {}
+            with self._write_tx() as conn:
+                pendientes = set(conn.execute(select(outbox.c.employee_id, outbox.c.work_date)).all())
+                local = {
+                    (r[0], r[1]): tuple(r[2:])
+                    for r in conn.execute(select(*cols).where(table.c.employee_id.in_(empleados)))
+                }
+                nuevos = [
+                    {"employee_id": k[0], "work_date": k[1], **dict(zip(_SYNC_COLS, v))}
+                    for k, v in remoto.items() if k not in pendientes and local.get(k) != v
+                ]
+                borrados = [k for k in local if k not in remoto and k not in pendientes]
+                # La base de estos empleados pasa a ser el remoto, salvo la de los días pendientes
+                # (sigue siendo el valor sobre el que se hizo la edición local)
+                viejas = base.delete().where(base.c.employee_id.in_(empleados))
+                if pendientes:
+                    viejas = viejas.where(tuple_(base.c.employee_id, base.c.work_date).not_in(list(pendientes)))
+                conn.execute(viejas)
+                vistos = [
+                    {"employee_id": k[0], "work_date": k[1], **dict(zip(_SYNC_COLS, v))}
+                    for k, v in remoto.items() if k not in pendientes
+                ]
+                if vistos:
+                    conn.execute(base.insert(), vistos)
+                if nuevos:
+                    conn.execute(_insert_stmt(self.engine.dialect.name, "update"), nuevos)
+                for emp, d in borrados:
+                    conn.execute(table.delete().where(table.c.employee_id == emp, table.c.work_date == d))
+                for v in nuevos:
+                    cambios.setdefault(v["employee_id"], set()).add(v["work_date"])
+                for emp, d in borrados:
+                    cambios.setdefault(emp, set()).add(d)
+                for emp, dias in cambios.items():
+                    vista = self.for_employee(emp)
+                    vista._refresh_rollups(conn, dias)
+                    vista._bump_version(conn)
+                conn.execute(
+                    _upsert_stmt(self.engine.dialect.name, pulled, ["employee_id"], ["remote_version"]),
+                    [{"employee_id": e, "remote_version": versiones[e]} for e in empleados],
+                )
+            n = sum(len(d) for d in cambios.values())
+            self._state.pulled += n
+            return n
+
+    def sync_now(self) -> tuple[int, int]:
+        """Sube toda la bandeja y después baja el remoto. Devuelve (subidos, bajados)."""
+        subidos = 0
+        while True:
+            n = self.push()
+            subidos += n
+            if n == 0 or self.pending() == 0:
+                break
+        return subidos, self.pull()
+
+    # ---- hilo de fondo ----
+    def _loop(self, interval_s: float) -> None:
+        st_ = self._state
+        proximo_pull = _time.monotonic()
+        while not st_.stop.is_set():
+            try:
+                while self.push():
+                    pass
+                if _time.monotonic() >= proximo_pull:
+                    self.pull()
+                    proximo_pull = _time.monotonic() + self.pull_interval_s
+                st_.last_error = None
+            except Exception as e:
+                # Remoto caído o sin red: la bandeja espera y se reintenta
+                st_.last_error = f"{type(e).__name__}: {e}"
+            st_.wake.wait(interval_s)
+            st_.wake.clear()
+
+    def start_sync(self, interval_s: float = 5.0) -> threading.Thread:
+        """Arranca (una sola vez) el hilo de sincronización; una escritura lo despierta al momento."""
+        st_ = self._state
+        if st_.thread is None or not st_.thread.is_alive():
+            st_.stop.clear()
+            st_.thread = threading.Thread(
+                target=self._loop, args=(interval_s,), name="replica-sync", daemon=True
+            )
+            st_.thread.start()
+        return st_.thread
+
+    def stop_sync(self) -> None:
+        self._state.stop.set()
+        self._state.wake.set()
+
+    def sync_status(self) -> dict:
+        st_ = self._state
+        return {
+            "remote": make_url(self.remote_url).render_as_string(hide_password=True),
+            "pending": self.pending(),
+            "pushed": st_.pushed,
+            "pulled": st_.pulled,
+            "last_push_at": st_.last_push_at,
+            "last_pull_at": st_.last_pull_at,
+            "last_error": st_.last_error,
+            "conflicts": self.conflict_count(),
+        }
+
+    def conflict_count(self) -> int:
+        """Ediciones locales descartadas porque el remoto cambió antes el mismo día."""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(conflicts)).scalar_one()
+
+
+__all__ = ["ReplicatedWorkShiftRepository", "base", "conflicts", "outbox", "pulled"]
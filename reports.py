@@ -0,0 +1,163 @@
+# reports.py
+# -----------------------------------------------
+# Tablas mensuales y PDF: compartido por app.py, el archivador y la CLI.
+# -----------------------------------------------
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable, Iterable
+
+import numpy as np
+
+from config import (
+    TITULO_APP, UMBRAL_DIARIO_H, HOURLY_GROSS_EUR, IRPF_EST_PERCENT, PDF_LAYOUT_VERSION,
+)
+from domain import ShiftBatch
+from pdf_cache import PdfCache, content_key
+from repository import WorkShiftDB
+from snapshots import MonthSnapshot, MonthSnapshotCache
+from formatting import (
+    DIAS_SEMANA, dias_semana, formatea_horas_float, formatea_minutos, formatea_minutos_signed, hhmm,
+    horas_float_a_minutos, horas_texto, minutos_signed_texto,
+)
+from lazy import lazy_module
+
+pd = lazy_module("pandas")  # se importa al construir la primera tabla, no al arrancar
+
+# =========================
+# Utilidades de formato (escalares y por columna en formatting.py)
+# =========================
+def eur(x: float) -> str:
+    return f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def mes_en_letras_esp(yyyy_mm: str) -> str:
+    meses = ["Enero","Febrero","Marzo","Abril","Mayo","Junio","Julio",
+             "Agosto","Septiembre","Octubre","Noviembre","Diciembre"]
+    y, m = yyyy_mm.split("-")
+    return f"Mes de {meses[int(m)-1]} {y}"
+
+def clave_mes(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+def yyyymm_to_tuple(yyyy_mm: str) -> tuple[int, int]:
+    y, m = yyyy_mm.split("-")
+    return int(y), int(m)
+
+# =========================
+# Tablas del mes
+# =========================
+def hist_df_desde_batch(batch: ShiftBatch, umbral_diario_h: float = UMBRAL_DIARIO_H) -> pd.DataFrame:
+    """Tabla del Histórico a partir del lote columnar de un mes: columna a columna, con las tablas de formatting."""
+    if not len(batch):
+        return pd.DataFrame()
+    horas = batch.hours_worked
+    # np.rint redondea al par, como round(): mismos minutos que la versión por fila
+    delta_min = np.rint((horas - umbral_diario_h) * 60).astype(np.int64)
+    notas = batch.notes
+    return pd.DataFrame({
+        "ID": batch.ids,
+        "Fecha": np.datetime_as_string(batch.dates(), unit="D").astype(object),
+        "Día": dias_semana(batch.work_date),
+        "Inicio": hhmm(batch.start_minute),
+        "Fin": hhmm(batch.end_minute),
+        "Descanso (min)": batch.break_minutes.astype(np.int64),
+        "Horas": np.round(horas, 2),
+        "Extras (min)": delta_min,
+        "Extras": minutos_signed_texto(delta_min),
+        "Notas": np.where(pd.isna(notas), "", notas).astype(object),
+    }, copy=False)
+
+def hist_df_desde_filas(filas: Iterable[WorkShiftDB], umbral_diario_h: float = UMBRAL_DIARIO_H) -> pd.DataFrame:
+    """Tabla del Histórico a partir de filas ORM de un mes (una por día)."""
+    return hist_df_desde_batch(ShiftBatch.from_records(
+        (f.id, f.work_date, f.start_time.hour * 60 + f.start_time.minute, f.end_time.hour * 60 + f.end_time.minute,
+         f.break_minutes or 0, f.hours_worked or 0.0, f.overtime_hours or 0.0, f.notes)
+        for f in filas
+    ), umbral_diario_h)
+
+def df_para_pdf(df_num: pd.DataFrame) -> tuple[pd.DataFrame, float, int]:
+    """(tabla formateada para el PDF, horas del mes, extras del mes en minutos)."""
+    if df_num.empty:
+        return df_num, 0.0, 0
+    df_tbl = df_num[["Fecha","Día","Inicio","Fin","Descanso (min)","Horas","Extras","Notas"]].copy()
+    df_tbl["Horas (h:min)"] = horas_texto(df_tbl["Horas"].to_numpy())
+    df_tbl = df_tbl.drop(columns=["Horas"]).rename(columns={"Horas (h:min)": "Horas"})
+    horas_mes = float(df_num["Horas"].sum())
+    extras_mes_min = int(df_num["Extras (min)"].sum())
+    return df_tbl, horas_mes, extras_mes_min
+
+# =========================
+# PDF (bordes + caja resumen estrecha centrada)
+# =========================
+def dataframe_a_pdf(df: pd.DataFrame, titulo: str, resumen_linea1: str | None = None, resumen_linea2: str | None = None) -> bytes:
+    """Devuelve b"" si reportlab no está instalado (quien llama decide cómo avisar)."""
+    from pdf_render import default_renderer  # reportlab solo se importa al generar el primer PDF
+    renderer = default_renderer()
+    if renderer is None:
+        return b""
+    return renderer.render(df, titulo, resumen_linea1, resumen_linea2)
+
+def lineas_resumen(horas_mes: float, extras_mes_min: int) -> tuple[str, str]:
+    bruto_mes = horas_mes * HOURLY_GROSS_EUR
+    neto_mes = bruto_mes * (1 - IRPF_EST_PERCENT)
+    l1 = f"Horas extras acumuladas del mes: {formatea_minutos_signed(extras_mes_min)}"
+    l2 = f"Total bruto del mes: {eur(bruto_mes)} € · Total neto estimado: {eur(neto_mes)} €"
+    return l1, l2
+
+def pdf_mes(yyyy_mm: str, df_tbl: pd.DataFrame, horas_mes: float, extras_mes_min: int) -> bytes:
+    """PDF de un mes a partir de su tabla ya formateada. Función de módulo: sirve en otro proceso."""
+    titulo_pdf = f"{TITULO_APP} — {mes_en_letras_esp(yyyy_mm)}"
+    l1, l2 = lineas_resumen(horas_mes, extras_mes_min)
+    return dataframe_a_pdf(df_tbl, titulo=titulo_pdf, resumen_linea1=l1, resumen_linea2=l2)
+
+# =========================
+# Informes por mes (snapshot + caché de PDF)
+# =========================
+class MonthReports:
+    """Tablas y PDFs de un mes leyendo siempre del snapshot compartido."""
+    def __init__(self, snapshots: MonthSnapshotCache, pdf_cache: PdfCache):
+        self.snapshots = snapshots
+        self.pdf_cache = pdf_cache
+
+    def hist_df(self, yyyy_mm: str) -> pd.DataFrame:
+        return hist_df_desde_batch(self.snapshots.get(yyyy_mm).batch)
+
+    def df_para_pdf(self, yyyy_mm: str) -> tuple[pd.DataFrame, float, int]:
+        return df_para_pdf(self.hist_df(yyyy_mm))
+
+    def render_pdf(self, yyyy_mm: str) -> bytes:
+        return self._render_snapshot(self.snapshots.get(yyyy_mm))
+
+    def _render_snapshot(self, snap: MonthSnapshot) -> bytes:
+        return pdf_mes(snap.yyyy_mm, *df_para_pdf(hist_df_desde_batch(snap.batch)))
+
+    def pdf_job(self, yyyy_mm: str) -> tuple[str, Callable[[], bytes]]:
+        """(clave de contenido, render) sobre el MISMO snapshot: el render puede ir a otro
+        hilo sin riesgo de guardar bajo esa clave datos escritos después."""
+        snap = self.snapshots.get(yyyy_mm)
+        return self._content_hash(snap), lambda: self._render_snapshot(snap)
+
+    def pdf_inputs(self, yyyy_mm: str) -> tuple[str, pd.DataFrame, float, int]:
+        """(clave de contenido, tabla, horas, extras) del mismo snapshot, para renderizar fuera."""
+        snap = self.snapshots.get(yyyy_mm)
+        return (self._content_hash(snap), *df_para_pdf(hist_df_desde_batch(snap.batch)))
+
+    def content_hash(self, yyyy_mm: str) -> str:
+        return self._content_hash(self.snapshots.get(yyyy_mm))
+
+    def _content_hash(self, snap: MonthSnapshot) -> str:
+        return content_key(
+            snap.content_rows(),
+            self.snapshots.repo.employee_id, snap.yyyy_mm, TITULO_APP, HOURLY_GROSS_EUR, IRPF_EST_PERCENT, UMBRAL_DIARIO_H, PDF_LAYOUT_VERSION,
+        )
+
+    def pdf(self, yyyy_mm: str) -> bytes:
+        """PDF del mes desde la caché; solo se renderiza si cambió su contenido."""
+        return self.pdf_cache.get_or_render(*self.pdf_job(yyyy_mm))
+
+
+__all__ = [
+    "DIAS_SEMANA", "MonthReports", "clave_mes", "dataframe_a_pdf", "df_para_pdf", "eur",
+    "formatea_horas_float", "formatea_minutos", "formatea_minutos_signed", "hist_df_desde_batch",
+    "hist_df_desde_filas", "horas_float_a_minutos", "lineas_resumen", "mes_en_letras_esp", "pdf_mes", "yyyymm_to_tuple",
+]
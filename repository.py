@@ -1,19 +1,52 @@
 # repository.py
 from __future__ import annotations
 
-from typing import List
-from datetime import date, time
+import copy
+import os
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from time import monotonic, perf_counter
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List
+from datetime import date, time, timedelta
 
-from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy.pool import NullPool, QueuePool, SingletonThreadPool
+from sqlalchemy import Index, Integer, bindparam, cast, event, extract, func, inspect, literal, make_url, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import SQLModel, Field, Session, create_engine, select
 
-from domain import WorkShift
+import perf
+from domain import ShiftBatch, WorkShift
+
+
+DEFAULT_EMPLOYEE = "default"
+# Súbelo con cada cambio de tablas/índices o migración nueva: al arrancar, una BD con
+# otra versión pasa por create_all + migraciones; con la misma, no se ejecuta DDL.
+SCHEMA_VERSION = 4
+# Sin puntos: el id es también el nombre de su carpeta de PDFs, y ".", ".." o
+# "manifest.json" apuntarían a la carpeta del empleado por defecto o a sus ficheros
+_EMPLOYEE_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_employee_id(employee_id: str) -> str:
+    """Identificador de empleado seguro para BD y nombres de carpeta."""
+    if not _EMPLOYEE_RE.match(employee_id or ""):
+        raise ValueError(f"employee_id no válido: {employee_id!r} (letras, números, _ y -; máx. 64)")
+    return employee_id
 
 
 class WorkShiftDB(SQLModel, table=True):
+    # Un registro por empleado y día: las escrituras hacen upsert sobre este índice,
+    # que además sirve todas las lecturas (igualdad en employee_id + rango de fechas)
+    __table_args__ = (Index("ux_workshiftdb_employee_work_date", "employee_id", "work_date", unique=True),)
+
     id: int | None = Field(default=None, primary_key=True)
-    work_date: date = Field(index=True)
+    employee_id: str = Field(default=DEFAULT_EMPLOYEE, max_length=64)
+    work_date: date
     start_time: time
     end_time: time
     break_minutes: int
@@ -22,75 +55,837 @@ class WorkShiftDB(SQLModel, table=True):
     notes: str | None = None
 
 
-def build_engine(db_url: str, echo: bool = False):
+class WeekRollupDB(SQLModel, table=True):
+    """Totales por empleado y semana ISO (lunes a domingo), aunque la semana cruce de mes."""
+    employee_id: str = Field(default=DEFAULT_EMPLOYEE, primary_key=True, max_length=64)
+    week_start: date = Field(primary_key=True)  # lunes
+    hours: float = 0.0
+    worked_minutes: int = 0   # suma de round(hours_worked * 60) de cada día
+    days: int = 0
+
+
+class MonthRollupDB(SQLModel, table=True):
+    """Totales por empleado y mes natural."""
+    employee_id: str = Field(default=DEFAULT_EMPLOYEE, primary_key=True, max_length=64)
+    month: str = Field(primary_key=True)  # 'YYYY-MM'
+    hours: float = 0.0
+    worked_minutes: int = 0
+    days: int = 0
+
+
+class SchemaVersionDB(SQLModel, table=True):
+    """Una sola fila (id=1) con la versión de esquema aplicada."""
+    __tablename__ = "schema_version"
+    id: int = Field(default=1, primary_key=True)
+    version: int
+
+
+class DataVersionDB(SQLModel, table=True):
+    """
+    Contador de cambios por empleado. Cada escritura lo sube dentro de su misma
+    transacción, venga de la página, de la CLI, de otro worker o de la réplica:
+    las cachés de todos los procesos lo usan como parte de su clave.
+    """
+    __tablename__ = "data_version"
+    employee_id: str = Field(primary_key=True, max_length=64)
+    version: int = 0
+
+
+class _VersionMemo:
+    """
+    Última versión leída de la BD por empleado, compartida por las vistas for_employee().
+    `generation` cambia con cada escritura de este proceso: una lectura que empezó antes
+    no guarda su valor (ya viejo) en la memoria.
+    """
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.values: dict[str, tuple[int, float]] = {}  # empleado -> (versión, leída en monotonic)
+        self.generation = 0
+
+    def forget(self) -> None:
+        with self.lock:
+            self.values.clear()
+            self.generation += 1
+
+
+class PoolMetrics:
+    """Latencia de obtener conexión del pool (espera + pre-ping + conexión nueva)."""
+    def __init__(self, max_samples: int = 512):
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=max_samples)
+        self.acquires = 0
+        self.acquire_total_s = 0.0
+        self.acquire_max_s = 0.0
+        self.new_connections = 0
+        self._listeners: list[Callable[[float], None]] = []
+
+    def add_listener(self, fn: Callable[[float], None]) -> None:
+        """`fn(segundos)` tras cada checkout, en el hilo que pidió la conexión."""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def record_acquire(self, seconds: float) -> None:
+        with self._lock:
+            self.acquires += 1
+            self.acquire_total_s += seconds
+            self.acquire_max_s = max(self.acquire_max_s, seconds)
+            self._samples.append(seconds)
+        for fn in self._listeners:
+            fn(seconds)
+
+    def record_new_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            acquires, total, mx, nuevas = self.acquires, self.acquire_total_s, self.acquire_max_s, self.new_connections
+        def pct(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else 0.0
+        return {
+            "acquires": acquires,
+            "new_connections": nuevas,
+            "acquire_avg_ms": (total / acquires * 1000) if acquires else 0.0,
+            "acquire_p50_ms": pct(0.50),
+            "acquire_p95_ms": pct(0.95),
+            "acquire_max_ms": mx * 1000,
+        }
+
+
+class WriteLock:
+    """
+    Lock de escritura del proceso (SQLite solo admite un escritor): los hilos de este
+    proceso que escriben lo toman de uno en uno en vez de chocar con `database is locked`,
+    y las lecturas siguen en paralelo (WAL). No es una cola ni ordena a nadie: solo cubre
+    este proceso; frente a otros (p. ej. la CLI) está BEGIN IMMEDIATE con busy_timeout.
+    La escritura corre en el hilo que la pide, así sus consultas cuentan en su rerun
+    (perf.py) y los errores le llegan a él. Sin `enabled` (Postgres, perfil "off") no
+    bloquea nada.
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._turn = threading.Lock()
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        t0 = perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        self._turn.acquire()
+        espera = perf_counter() - t0
+        with self._lock:
+            self.waiting -= 1
+            self.writes += 1
+            self.wait_total_s += espera
+            self.wait_max_s = max(self.wait_max_s, espera)
+        try:
+            yield
+        finally:
+            self._turn.release()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "writes": self.writes,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "wait_avg_ms": (self.wait_total_s / self.writes * 1000) if self.writes else 0.0,
+                "wait_max_ms": self.wait_max_s * 1000,
+            }
+
+
+def _timed_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """Subclase del pool que mide `connect()`. `recreate()` usa la misma clase y conserva las métricas."""
+    def connect(self):
+        t0 = perf_counter()
+        try:
+            return base.connect(self)
+        finally:
+            metrics.record_acquire(perf_counter() - t0)
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect, "metrics": metrics})
+
+
+# Modos de pool para Postgres (variable de entorno DB_POOL_MODE):
+#   queue     -> QueuePool pequeño con pre-ping y reciclado antes del idle-timeout serverless (defecto)
+#   pgbouncer -> QueuePool sin pre-ping: el pooler (Supabase :6543, PgBouncer) ya gestiona el servidor
+#   null      -> NullPool (conexión nueva por sesión; solo si se pide explícitamente)
+POOL_MODES = ("queue", "pgbouncer", "null")
+
+# Perfil de SQLite en fichero (variable de entorno SQLITE_PROFILE):
+#   wal -> journal WAL + pragmas de abajo en cada conexión nueva; escrituras de una en una
+#          (WriteLock) y con BEGIN IMMEDIATE (defecto)
+#   off -> tal cual lo deja sqlite3 (rollback journal), sin lock de escritura
+# WAL necesita un disco local (no NFS); los pragmas se ajustan por entorno.
+SQLITE_PROFILES = ("wal", "off")
+
+
+def _sqlite_pragmas() -> list[str]:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",  # en WAL solo se arriesga la última transacción ante un corte de luz
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_MB', '64')) * 1024 * 1024}",
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_MB', '16')) * 1024}",  # negativo = KiB
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def resolve_sqlite_profile(db_url: str, profile: str | None = None) -> str:
+    """Perfil efectivo de una URL: "off" para Postgres y SQLite en memoria."""
+    if not db_url.startswith("sqlite") or db_url in ("sqlite://", "sqlite:///") or ":memory:" in db_url:
+        return "off"
+    profile = (profile or os.getenv("SQLITE_PROFILE", "wal")).strip().lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE desconocido: {profile!r} (usa {', '.join(SQLITE_PROFILES)})")
+    return profile
+
+# Comprobación de esquema al arrancar (variable de entorno DB_SCHEMA_MODE):
+#   version -> una consulta a schema_version; DDL y migraciones solo si no coincide (defecto)
+#   full    -> create_all + migraciones siempre (p. ej. tras tocar la BD a mano)
+SCHEMA_MODES = ("version", "full")
+# Dialectos con INSERT ... ON CONFLICT: build_engine rechaza cualquier otro
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+# Como mucho cada cuántos segundos se relee data_version de la BD (DATA_VERSION_TTL_S).
+# Las escrituras de este proceso se ven al momento; las de otros, en <= este tiempo.
+DATA_VERSION_TTL_S = float(os.getenv("DATA_VERSION_TTL_S", "1.0"))
+
+
+def build_engine(db_url: str, echo: bool = False, pool_mode: str | None = None,
+                 sqlite_profile: str | None = None):
+    backend = make_url(db_url).get_backend_name()
+    if backend not in SUPPORTED_DIALECTS:
+        # Los upserts (ON CONFLICT) y las migraciones solo existen para estos dos
+        raise ValueError(f"Base de datos no soportada: {backend!r} (usa {', '.join(SUPPORTED_DIALECTS)})")
     is_sqlite = db_url.startswith("sqlite")
+    profile = resolve_sqlite_profile(db_url, sqlite_profile)
     kwargs = {
         "echo": echo,
         "pool_pre_ping": True,
         "future": True,
         "connect_args": {},
     }
+    metrics = PoolMetrics()
     if is_sqlite:
         kwargs["connect_args"] = {"check_same_thread": False}
+        en_memoria = db_url in ("sqlite://", "sqlite:///") or ":memory:" in db_url
+        kwargs["poolclass"] = _timed_pool_class(SingletonThreadPool if en_memoria else QueuePool, metrics)
     else:
-        # Serverless PG (Neon/Supabase): sin pool local y con timeout
-        kwargs["poolclass"] = NullPool
+        mode = (pool_mode or os.getenv("DB_POOL_MODE", "queue")).strip().lower()
+        if mode not in POOL_MODES:
+            raise ValueError(f"DB_POOL_MODE desconocido: {mode!r} (usa {', '.join(POOL_MODES)})")
+        if mode == "null":
+            kwargs["poolclass"] = _timed_pool_class(NullPool, metrics)
+        else:
+            kwargs["poolclass"] = _timed_pool_class(QueuePool, metrics)
+            kwargs["pool_size"] = int(os.getenv("DB_POOL_SIZE", "2"))
+            kwargs["max_overflow"] = int(os.getenv("DB_POOL_MAX_OVERFLOW", "3"))
+            kwargs["pool_timeout"] = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
+            kwargs["pool_use_lifo"] = True  # reutiliza la conexión más caliente; las demás caducan
+            if mode == "queue":
+                # Neon suspende a los ~5 min de inactividad: reciclar antes
+                kwargs["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE_S", "240"))
+            else:
+                kwargs["pool_pre_ping"] = False
+                kwargs["pool_reset_on_return"] = "rollback"
         kwargs["connect_args"] = {"connect_timeout": 10}
         # Asegura SSL si no está en la URL
         if "sslmode=" not in db_url:
             db_url += ("&" if "?" in db_url else "?") + "sslmode=require"
-    return create_engine(db_url, **kwargs)
+    engine = create_engine(db_url, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _count_new_connection(dbapi_conn, conn_record):
+        metrics.record_new_connection()
+
+    if profile == "wal":
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_conn, conn_record):
+            # Receta de SQLAlchemy para pysqlite: sin BEGIN implícito del driver, lo emite
+            # el evento "begin" de abajo
+            dbapi_conn.isolation_level = None
+            cursor = dbapi_conn.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def _sqlite_begin(conn):
+            # Las escrituras (_write_tx) toman el lock de SQLite desde el principio
+            immediate = conn.get_execution_options().get("sqlite_begin_immediate", False)
+            conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+    engine.sqlite_profile = profile
+    return engine
+
+
+def _shift_values(s: WorkShift) -> dict:
+    return {
+        "work_date": s.work_date,
+        "start_time": s.start_time,
+        "end_time": s.end_time,
+        "break_minutes": s.break_minutes,
+        "hours_worked": s.hours_worked,
+        "overtime_hours": s.overtime_hours,
+        "notes": s.notes,
+    }
+
+
+_UPSERT_COLS = ("start_time", "end_time", "break_minutes", "hours_worked", "overtime_hours", "notes")
+
+
+def _dialect_insert(dialect_name: str, table):
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise ValueError(f"Base de datos no soportada: {dialect_name!r} (usa {', '.join(SUPPORTED_DIALECTS)})")
+
+
+def _upsert_stmt(dialect_name: str, table, index_elements: list[str], update_cols, on_conflict: str = "update"):
+    """INSERT ... ON CONFLICT (...) DO UPDATE|NOTHING para SQLite y Postgres."""
+    stmt = _dialect_insert(dialect_name, table)
+    if on_conflict == "nothing":
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={c: stmt.excluded[c] for c in update_cols},
+    )
+
+
+def _bump_version_stmt(dialect_name: str, employee_id: str):
+    """data_version += 1 para el empleado (creando su fila la primera vez)."""
+    table = DataVersionDB.__table__
+    stmt = _dialect_insert(dialect_name, table).values(employee_id=employee_id, version=1)
+    return stmt.on_conflict_do_update(index_elements=["employee_id"], set_={"version": table.c.version + 1})
+
+
+def _insert_stmt(dialect_name: str, on_conflict: str):
+    """Escritura de turnos con conflicto sobre (employee_id, work_date)."""
+    return _upsert_stmt(
+        dialect_name, WorkShiftDB.__table__, ["employee_id", "work_date"], _UPSERT_COLS, on_conflict
+    )
+
+
+def _shift_columns():
+    table = WorkShiftDB.__table__
+    return (
+        table.c.work_date, table.c.start_time, table.c.end_time, table.c.break_minutes,
+        table.c.hours_worked, table.c.overtime_hours, table.c.notes,
+    )
+
+
+def _minute_of_day(col):
+    """Minutos desde medianoche calculados en SQL: el driver entrega enteros, no objetos time."""
+    return cast(extract("hour", col) * 60 + extract("minute", col), Integer)
+
+
+@lru_cache(maxsize=None)
+def _batch_stmt(desde: bool, hasta: bool):
+    """
+    SELECT de las columnas de ShiftBatch.from_records, ya con el tipo final (sin NULL ni
+    objetos time), de más reciente a más antiguo. Se construye una vez por combinación de
+    límites; empleado y fechas van como parámetros.
+    """
+    table = WorkShiftDB.__table__
+    stmt = select(
+        table.c.id, table.c.work_date,
+        _minute_of_day(table.c.start_time), _minute_of_day(table.c.end_time),
+        func.coalesce(table.c.break_minutes, 0), func.coalesce(table.c.hours_worked, 0.0),
+        func.coalesce(table.c.overtime_hours, 0.0), table.c.notes,
+    ).where(table.c.employee_id == bindparam("b_emp")).order_by(table.c.work_date.desc())
+    if desde:
+        stmt = stmt.where(table.c.work_date >= bindparam("b_desde"))
+    if hasta:
+        stmt = stmt.where(table.c.work_date <= bindparam("b_hasta"))
+    return stmt
+
+
+def _row_to_shift(r) -> WorkShift:
+    return WorkShift(
+        work_date=r.work_date,
+        start_time=r.start_time,
+        end_time=r.end_time,
+        break_minutes=r.break_minutes,
+        hours_worked=r.hours_worked,
+        overtime_hours=r.overtime_hours,
+        notes=r.notes,
+    )
+
+
+def _counted(rows: list) -> list:
+    """Anota en la medida del rerun (perf.py) las filas ya leídas de un resultado."""
+    perf.record_rows(len(rows))
+    return rows
+
+
+def _lunes(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def _mes(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, max(1, size))):
+        yield batch
 
 
 class WorkShiftRepository:
-    """CRUD para turnos. En producción NO hacer fallback a SQLite."""
-    def __init__(self, url: str = "sqlite:///workhours.db", echo: bool = False):
+    """
+    CRUD para turnos. En producción NO hacer fallback a SQLite.
+    Cada instancia trabaja sobre un empleado (`employee_id`); `for_employee()`
+    devuelve otra vista que comparte engine y pool.
+    """
+    def __init__(self, url: str = "sqlite:///workhours.db", echo: bool = False,
+                 employee_id: str = DEFAULT_EMPLOYEE, schema_mode: str | None = None,
+                 sqlite_profile: str | None = None, version_ttl_s: float | None = None):
         self.primary_url = url
-        self.engine = build_engine(url, echo=echo)
+        self.employee_id = validate_employee_id(employee_id)
+        # Segundos por fase de arranque (engine, schema_check, schema_ddl)
+        self.startup_s: dict[str, float] = {}
+        t0 = perf_counter()
+        self.engine = build_engine(url, echo=echo, sqlite_profile=sqlite_profile)
+        self.pool_metrics: PoolMetrics = self.engine.pool.metrics
+        # Compartida con las vistas de for_employee(): un escritor a la vez por BD
+        self.write_lock = WriteLock(enabled=self.engine.sqlite_profile == "wal")
+        self.startup_s["engine"] = perf_counter() - t0
+        # Versión de datos por empleado (tabla data_version): cualquier escritura la sube
+        # y las cachés (snapshots de mes, índice de meses) la usan como parte de su clave.
+        self._versions = _VersionMemo(DATA_VERSION_TTL_S if version_ttl_s is None else version_ttl_s)
 
-        # Si es Postgres, valida conexión (fail-fast si falla)
-        if not url.startswith("sqlite"):
+        mode = (schema_mode or os.getenv("DB_SCHEMA_MODE", "version")).strip().lower()
+        if mode not in SCHEMA_MODES:
+            raise ValueError(f"DB_SCHEMA_MODE desconocido: {mode!r} (usa {', '.join(SCHEMA_MODES)})")
+        # Una consulta que además valida la conexión (fail-fast si Postgres no responde)
+        t0 = perf_counter()
+        applied = self._schema_version()
+        self.startup_s["schema_check"] = perf_counter() - t0
+        self.schema_upgraded = mode == "full" or applied != SCHEMA_VERSION
+        if self.schema_upgraded:
+            t0 = perf_counter()
+            self._upgrade_schema()
+            self.startup_s["schema_ddl"] = perf_counter() - t0
+
+    def _schema_version(self) -> int | None:
+        """Versión de esquema guardada en la BD; None si la BD es nueva o anterior a schema_version."""
+        try:
+            conn = self.engine.connect()
+        except Exception as e:
+            if self.primary_url.startswith("sqlite"):
+                raise
+            raise RuntimeError(f"No se pudo conectar a Postgres: {e}")
+        with conn:
             try:
-                with self.engine.connect() as conn:
-                    conn.execute(text("select 1"))
-            except Exception as e:
-                raise RuntimeError(f"No se pudo conectar a Postgres: {e}")
+                return conn.execute(
+                    select(SchemaVersionDB.version).where(SchemaVersionDB.id == 1)
+                ).scalar()
+            except DBAPIError:
+                return None  # sin tabla schema_version
 
-        # Crea tablas si no existen
+    def _upgrade_schema(self) -> None:
+        """create_all + migraciones + acumulados, y deja registrada SCHEMA_VERSION."""
         SQLModel.metadata.create_all(self.engine)
+        if self._migrate_schema():
+            SQLModel.metadata.create_all(self.engine)
+        self._backfill_rollups()
+        self._backfill_data_versions()
+        with self.engine.begin() as conn:
+            stmt = _upsert_stmt(conn.dialect.name, SchemaVersionDB.__table__, ["id"], ["version"])
+            conn.execute(stmt, [{"id": 1, "version": SCHEMA_VERSION}])
+
+    def for_employee(self, employee_id: str) -> "WorkShiftRepository":
+        """Vista del repositorio para otro empleado (mismo engine, versiones compartidas)."""
+        if employee_id == self.employee_id:
+            return self
+        scoped = copy.copy(self)
+        scoped.employee_id = validate_employee_id(employee_id)
+        return scoped
+
+    @property
+    def data_version(self) -> int:
+        """
+        Versión de datos del empleado guardada en la BD. Se relee (una consulta por clave
+        primaria) como mucho cada `DATA_VERSION_TTL_S`; tras una escritura de este proceso,
+        en la siguiente llamada.
+        """
+        memo = self._versions
+        ahora = monotonic()
+        with memo.lock:
+            previa = memo.values.get(self.employee_id)
+            if previa is not None and ahora - previa[1] < memo.ttl_s:
+                return previa[0]
+            generation = memo.generation
+        table = DataVersionDB.__table__
+        with self.engine.connect() as conn:
+            version = conn.execute(
+                select(table.c.version).where(table.c.employee_id == self.employee_id)
+            ).scalar() or 0
+        with memo.lock:
+            if memo.generation == generation:
+                memo.values[self.employee_id] = (version, ahora)
+        return version
+
+    def _migrate_schema(self) -> bool:
+        """
+        Migraciones únicas para BDs anteriores:
+        - añade `employee_id` (los turnos existentes pasan a DEFAULT_EMPLOYEE);
+        - compacta días duplicados por empleado quedándose con el más reciente (mayor id)
+          y sustituye los índices antiguos por el único (employee_id, work_date);
+        - borra las tablas de acumulados sin employee_id (se reconstruyen después).
+        Devuelve True si ha borrado tablas que hay que volver a crear.
+        """
+        recrear = False
+        with self.engine.begin() as conn:
+            insp = inspect(conn)
+            cols = {c["name"] for c in insp.get_columns(WorkShiftDB.__tablename__)}
+            if "employee_id" not in cols:
+                conn.execute(text(
+                    f"ALTER TABLE workshiftdb ADD COLUMN employee_id VARCHAR(64) "
+                    f"NOT NULL DEFAULT '{DEFAULT_EMPLOYEE}'"
+                ))
+            indices = {ix["name"] for ix in insp.get_indexes(WorkShiftDB.__tablename__)}
+            if "ux_workshiftdb_employee_work_date" not in indices:
+                conn.execute(text(
+                    "DELETE FROM workshiftdb WHERE id NOT IN "
+                    "(SELECT MAX(id) FROM workshiftdb GROUP BY employee_id, work_date)"
+                ))
+                conn.execute(text("DROP INDEX IF EXISTS ix_workshiftdb_work_date"))
+                conn.execute(text("DROP INDEX IF EXISTS ux_workshiftdb_work_date"))
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ux_workshiftdb_employee_work_date "
+                    "ON workshiftdb (employee_id, work_date)"
+                ))
+            for table in (WeekRollupDB.__table__, MonthRollupDB.__table__):
+                if "employee_id" not in {c["name"] for c in insp.get_columns(table.name)}:
+                    table.drop(conn)
+                    recrear = True
+        return recrear
+
+    def _backfill_rollups(self) -> None:
+        """Reconstruye los acumulados si la tabla está vacía pero hay turnos (BDs anteriores)."""
+        with self.engine.begin() as conn:
+            if conn.execute(select(WeekRollupDB.week_start).limit(1)).first() is not None:
+                return
+            por_empleado: dict[str, list[date]] = {}
+            for emp, d in conn.execute(select(WorkShiftDB.employee_id, WorkShiftDB.work_date)):
+                por_empleado.setdefault(emp, []).append(d)
+            for emp, dias in por_empleado.items():
+                self.for_employee(emp)._refresh_rollups(conn, dias)
+
+    def _backfill_data_versions(self) -> None:
+        """Da fila en data_version a los empleados con turnos que aún no la tienen (BDs anteriores)."""
+        shifts, versions = WorkShiftDB.__table__, DataVersionDB.__table__
+        with self.engine.begin() as conn:
+            conn.execute(versions.insert().from_select(
+                ["employee_id", "version"],
+                select(shifts.c.employee_id, literal(1)).distinct()
+                .where(shifts.c.employee_id.not_in(select(versions.c.employee_id))),
+            ))
+
+    def _refresh_rollups(self, conn, dias: Iterable[date]) -> None:
+        """
+        Recalcula, dentro de la transacción `conn`, los acumulados semanales y
+        mensuales que contienen alguno de `dias`. Solo se leen esas semanas/meses.
+        """
+        semanas = {_lunes(d) for d in dias}
+        if not semanas:
+            return
+        meses = {_mes(d) for d in dias}
+        primeros = [date(int(m[:4]), int(m[5:]), 1) for m in meses]
+        lo = min(min(semanas), min(primeros))
+        hi = max(max(semanas) + timedelta(days=6), max(primeros) + timedelta(days=31))
+        acum_sem = {w: [0.0, 0, 0] for w in semanas}
+        acum_mes = {m: [0.0, 0, 0] for m in meses}
+        filas = conn.execute(
+            select(WorkShiftDB.work_date, WorkShiftDB.hours_worked)
+            .where(WorkShiftDB.employee_id == self.employee_id,
+                   WorkShiftDB.work_date >= lo, WorkShiftDB.work_date <= hi)
+        ).all()
+        for d, hw in filas:
+            hw = float(hw or 0.0)
+            for acum in (acum_sem.get(_lunes(d)), acum_mes.get(_mes(d))):
+                if acum is not None:
+                    acum[0] += hw
+                    acum[1] += round(hw * 60)
+                    acum[2] += 1
+        dialect = self.engine.dialect.name
+        cols = ("hours", "worked_minutes", "days")
+        for table, key, acum in (
+            (WeekRollupDB.__table__, "week_start", acum_sem),
+            (MonthRollupDB.__table__, "month", acum_mes),
+        ):
+            vacios = [k for k, v in acum.items() if v[2] == 0]
+            if vacios:
+                conn.execute(table.delete().where(
+                    table.c.employee_id == self.employee_id, table.c[key].in_(vacios)
+                ))
+            valores = [
+                {"employee_id": self.employee_id, key: k,
+                 "hours": round(v[0], 6), "worked_minutes": v[1], "days": v[2]}
+                for k, v in acum.items() if v[2]
+            ]
+            if valores:
+                conn.execute(_upsert_stmt(dialect, table, ["employee_id", key], cols), valores)
 
     def add(self, s: WorkShift) -> None:
+        """Guarda el turno de un día; si el día ya existe lo sustituye (upsert atómico)."""
+        with self._write_tx() as conn:
+            conn.execute(_insert_stmt(self.engine.dialect.name, "update"), self._values(s))
+            self._after_write(conn, [s.work_date])
+
+    @contextmanager
+    def _write_tx(self) -> Iterator:
+        """
+        Transacción de escritura: toma el WriteLock del proceso y, en el perfil WAL, abre
+        con BEGIN IMMEDIATE (evento "begin" de build_engine) para tomar el lock de escritura
+        de SQLite desde el principio (frente a otros procesos, p. ej. la CLI, espera
+        busy_timeout en vez de fallar al pasar de lectura a escritura).
+        """
+        with self.write_lock.hold():
+            with self.engine.connect() as conn:
+                conn.execution_options(sqlite_begin_immediate=True)
+                with conn.begin():
+                    yield conn
+            # Ya confirmada: la próxima lectura de data_version ve la versión nueva
+            self._versions.forget()
+
+    def _after_write(self, conn, dias: Iterable[date]) -> None:
+        """Dentro de la transacción de cada escritura: acumulados de los días tocados y data_version."""
+        self._refresh_rollups(conn, dias)
+        self._bump_version(conn)
+
+    def _bump_version(self, conn) -> None:
+        conn.execute(_bump_version_stmt(self.engine.dialect.name, self.employee_id))
+
+    def _values(self, s: WorkShift) -> dict:
+        return {**_shift_values(s), "employee_id": self.employee_id}
+
+    def _where_employee(self, stmt):
+        return stmt.where(WorkShiftDB.__table__.c.employee_id == self.employee_id)
+
+    def _count_existing(self, conn, dias: list[date]) -> int:
+        table = WorkShiftDB.__table__
+        return conn.execute(self._where_employee(
+            select(func.count()).select_from(table).where(table.c.work_date.in_(dias))
+        )).scalar_one()
+
+    def _write_many(self, shifts: Iterable[WorkShift], batch_size: int, on_conflict: str) -> tuple[int, int]:
+        stmt = _insert_stmt(self.engine.dialect.name, on_conflict)
+        nuevas = existentes = 0
+        for batch in _batches((self._values(s) for s in shifts), batch_size):
+            # Dentro del lote gana el último de cada día (ON CONFLICT no admite
+            # dos filas con la misma clave en la misma sentencia en Postgres)
+            por_dia = list({v["work_date"]: v for v in batch}.values())
+            with self._write_tx() as conn:
+                ya = self._count_existing(conn, [v["work_date"] for v in por_dia])
+                conn.execution_options(insertmanyvalues_page_size=batch_size).execute(stmt, por_dia)
+                self._after_write(conn, [v["work_date"] for v in por_dia])
+            nuevas += len(por_dia) - ya
+            existentes += ya
+        return nuevas, existentes
+
+    def add_many(self, shifts: Iterable[WorkShift], batch_size: int = 500) -> int:
+        """
+        Inserta turnos en lotes, una transacción por lote; los días que ya
+        existen se dejan como están (ON CONFLICT DO NOTHING).
+        executemany en SQLite; en Postgres SQLAlchemy agrupa cada lote en
+        INSERT ... VALUES multi-fila (equivalente a psycopg2 execute_values).
+        Devuelve el número de filas insertadas.
+        """
+        return self._write_many(shifts, batch_size, "nothing")[0]
+
+    def upsert_many(self, shifts: Iterable[WorkShift], batch_size: int = 500) -> tuple[int, int]:
+        """
+        Inserta o actualiza por (employee_id, work_date) con INSERT ... ON CONFLICT DO UPDATE.
+        Una transacción por lote. Devuelve (insertadas, actualizadas).
+        """
+        return self._write_many(shifts, batch_size, "update")
+
+    def update_times(self, cambios: list[dict]) -> int:
+        """
+        Actualiza en bloque (un UPDATE executemany, una transacción) filas por id.
+        Cada dict: id, start_time, end_time, hours_worked, overtime_hours.
+        """
+        if not cambios:
+            return 0
+        table = WorkShiftDB.__table__
+        params = [
+            {
+                "b_id": c["id"], "start_time": c["start_time"], "end_time": c["end_time"],
+                "hours_worked": c["hours_worked"], "overtime_hours": c["overtime_hours"],
+            }
+            for c in cambios
+        ]
+        with self._write_tx() as conn:
+            conn.execute(self._where_employee(update(table).where(table.c.id == bindparam("b_id"))), params)
+            dias = conn.execute(self._where_employee(
+                select(table.c.work_date).where(table.c.id.in_([p["b_id"] for p in params]))
+            )).scalars().all()
+            self._after_write(conn, dias)
+        return len(params)
+
+    def bump_data_version(self) -> int:
+        """Marca los datos como modificados. Llamar tras cualquier escritura fuera del repo."""
+        with self._write_tx() as conn:
+            self._bump_version(conn)
+        return self.data_version
+
+    def data_versions(self) -> dict[str, int]:
+        """data_version de todos los empleados, sin memo (una fila por empleado)."""
+        table = DataVersionDB.__table__
+        with self.engine.connect() as conn:
+            return dict(_counted(conn.execute(select(table.c.employee_id, table.c.version)).all()))
+
+    def list_range_rows(self, d1: date, d2: date) -> List[WorkShiftDB]:
+        """Filas ORM (desacopladas) entre d1 y d2 (una por día), de más reciente a más antigua."""
+        with Session(self.engine) as session:
+            return _counted(list(session.exec(
+                select(WorkShiftDB)
+                .where(WorkShiftDB.employee_id == self.employee_id,
+                       WorkShiftDB.work_date >= d1, WorkShiftDB.work_date <= d2)
+                .order_by(WorkShiftDB.work_date.desc())
+            ).all()))
+
+    def list_week_rollups(self, d1: date, d2: date) -> List[WeekRollupDB]:
+        """Semanas ISO completas que tocan [d1, d2], por week_start ascendente."""
         with Session(self.engine) as session:
-            row = WorkShiftDB(
-                work_date=s.work_date,
-                start_time=s.start_time,
-                end_time=s.end_time,
-                break_minutes=s.break_minutes,
-                hours_worked=s.hours_worked,
-                overtime_hours=s.overtime_hours,
-                notes=s.notes,
+            return _counted(list(session.exec(
+                select(WeekRollupDB)
+                .where(WeekRollupDB.employee_id == self.employee_id,
+                       WeekRollupDB.week_start >= _lunes(d1), WeekRollupDB.week_start <= d2)
+                .order_by(WeekRollupDB.week_start)
+            ).all()))
+
+    def month_rollup(self, yyyy_mm: str) -> MonthRollupDB | None:
+        with Session(self.engine) as session:
+            return session.get(MonthRollupDB, (self.employee_id, yyyy_mm))
+
+    def list_months(self) -> set[str]:
+        """Meses 'YYYY-MM' con algún registro, agregados en SQL (una fila por mes)."""
+        year = extract("year", WorkShiftDB.work_date)
+        month = extract("month", WorkShiftDB.work_date)
+        with Session(self.engine) as session:
+            rows = _counted(session.exec(
+                select(year, month).where(WorkShiftDB.employee_id == self.employee_id).group_by(year, month)
+            ).all())
+        return {f"{int(y):04d}-{int(m):02d}" for y, m in rows}
+
+    def list_batch(self, d1: date | None = None, d2: date | None = None) -> ShiftBatch:
+        """
+        Turnos (opcionalmente entre d1 y d2) como ShiftBatch columnar con ids, de más reciente
+        a más antiguo. Consulta Core de columnas sueltas: ni objetos ORM ni identity map, y las
+        horas llegan ya en minutos.
+        """
+        stmt = _batch_stmt(d1 is not None, d2 is not None)
+        with self.engine.connect() as conn:
+            batch = ShiftBatch.from_records(
+                conn.execute(stmt, {"b_emp": self.employee_id, "b_desde": d1, "b_hasta": d2})
             )
-            session.add(row)
-            session.commit()
+        perf.record_rows(len(batch))
+        return batch
+
+    def _stream(self, stmt, batch_size: int):
+        """Ejecuta `stmt` en streaming (cursor de servidor en Postgres) y va entregando lotes de filas."""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=max(1, batch_size)).execute(stmt)
+            for rows in result.partitions():
+                yield _counted(rows)
+
+    def _range_stmt(self, start: date | None, end: date | None):
+        table = WorkShiftDB.__table__
+        stmt = self._where_employee(select(*_shift_columns()).order_by(table.c.work_date, table.c.id))
+        if start is not None:
+            stmt = stmt.where(table.c.work_date >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.work_date <= end)
+        return stmt
+
+    def iter_range(self, start: date | None = None, end: date | None = None, batch_size: int = 1000) -> Iterator[WorkShift]:
+        """
+        Turnos entre start y end (incluidos), por fecha ascendente, en memoria constante:
+        las filas llegan en lotes de `batch_size` y se entregan según llegan.
+        """
+        for rows in self._stream(self._range_stmt(start, end), batch_size):
+            for r in rows:
+                yield _row_to_shift(r)
+
+    def iter_batches(self, start: date | None = None, end: date | None = None, batch_size: int = 5000) -> Iterator[ShiftBatch]:
+        """Como iter_range, pero cada lote llega ya como ShiftBatch columnar."""
+        for rows in self._stream(self._range_stmt(start, end), batch_size):
+            yield ShiftBatch.from_rows(rows)
+
+    def page(self, after: tuple[date, int] | None = None, limit: int = 100) -> tuple[list[WorkShift], tuple[date, int] | None]:
+        """
+        Paginación por clave (work_date, id) ascendente: sin OFFSET, coste constante por página.
+        Devuelve (turnos, cursor); pasa el cursor como `after` para la página siguiente
+        (None cuando no hay más).
+        """
+        table = WorkShiftDB.__table__
+        stmt = self._where_employee(
+            select(table.c.id, *_shift_columns()).order_by(table.c.work_date, table.c.id).limit(limit)
+        )
+        if after is not None:
+            d, last_id = after
+            stmt = stmt.where(
+                (table.c.work_date > d) | ((table.c.work_date == d) & (table.c.id > last_id))
+            )
+        with self.engine.connect() as conn:
+            rows = _counted(conn.execute(stmt).all())
+        cursor = (rows[-1].work_date, rows[-1].id) if len(rows) == limit else None
+        return [_row_to_shift(r) for r in rows], cursor
+
+    def exists(self, d: date) -> bool:
+        """¿Tiene el empleado registro ese día? (búsqueda por el índice único)."""
+        table = WorkShiftDB.__table__
+        with self.engine.connect() as conn:
+            return conn.execute(self._where_employee(
+                select(table.c.id).where(table.c.work_date == d).limit(1)
+            )).first() is not None
+
+    def has_shifts(self) -> bool:
+        """¿Tiene el empleado de esta vista algún turno? (prefijo del índice único)."""
+        table = WorkShiftDB.__table__
+        with self.engine.connect() as conn:
+            return conn.execute(self._where_employee(select(table.c.id).limit(1))).first() is not None
+
+    def list_employees(self) -> list[str]:
+        """Empleados con algún turno (independiente del empleado de esta vista)."""
+        col = WorkShiftDB.__table__.c.employee_id
+        with self.engine.connect() as conn:
+            return _counted(list(conn.execute(select(col).distinct().order_by(col)).scalars()))
 
     def list_all(self) -> List[WorkShift]:
         with Session(self.engine) as session:
-            rows = session.exec(
-                select(WorkShiftDB).order_by(WorkShiftDB.work_date.desc(), WorkShiftDB.id.desc())
-            ).all()
-            return [
-                WorkShift(
-                    work_date=r.work_date,
-                    start_time=r.start_time,
-                    end_time=r.end_time,
-                    break_minutes=r.break_minutes,
-                    hours_worked=r.hours_worked,
-                    overtime_hours=r.overtime_hours,
-                    notes=r.notes,
-                )
-                for r in rows
-            ]
-
+            rows = _counted(session.exec(
+                select(WorkShiftDB)
+                .where(WorkShiftDB.employee_id == self.employee_id)
+                .order_by(WorkShiftDB.work_date.desc(), WorkShiftDB.id.desc())
+            ).all())
+            return [_row_to_shift(r) for r in rows]
 
-__all__ = ["WorkShiftDB", "WorkShiftRepository", "build_engine"]
+__all__ = [
+    "DATA_VERSION_TTL_S", "DEFAULT_EMPLOYEE", "DataVersionDB", "MonthRollupDB", "POOL_MODES", "PoolMetrics", "SCHEMA_MODES", "SCHEMA_VERSION", "SUPPORTED_DIALECTS",
+    "SQLITE_PROFILES", "SchemaVersionDB", "WeekRollupDB", "WorkShiftDB", "WorkShiftRepository", "WriteLock",
+    "build_engine", "resolve_sqlite_profile", "validate_employee_id",
+]
 
@@ -2,8 +2,31 @@
 from __future__ import annotations
 from datetime import datetime, date, time, timedelta
 from typing import Iterable, Dict, Tuple
+
+import numpy as np
+
 from domain import WorkShift
 
+MINUTES_PER_DAY = 24 * 60
+
+
+def times_to_minutes(times: Iterable[time]) -> np.ndarray:
+    """datetime.time values -> minutes since midnight (int32 array)."""
+    return np.fromiter((t.hour * 60 + t.minute for t in times), dtype=np.int32)
+
+
+def iso_year_week(dates) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized ISO calendar: datetime64[D]-compatible dates -> (iso_year, iso_week).
+    The ISO year is the calendar year of the Thursday of the same week.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    weekday = (days.astype(np.int64) + 3) % 7          # 1970-01-01 was a Thursday; Monday = 0
+    thursday = days - weekday + 3
+    year_start = thursday.astype("datetime64[Y]")
+    week = (thursday - year_start.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+    return year_start.astype(np.int64) + 1970, week
+
 class WorkHoursCalculator:
     """Business rules for calculating worked hours and overtime."""
     def __init__(self, daily_threshold: float = 8.0, weekly_threshold: float = 40.0):
@@ -40,6 +63,59 @@ class WorkHoursCalculator:
             weekly_overtime[k] = round(max(0.0, total - self.weekly_threshold), 2)
         return weekly_overtime
 
+    # ---- batch API (NumPy) ----
+    def calculate_hours_batch(self, start_minutes, end_minutes, break_minutes) -> np.ndarray:
+        """
+        Vectorized calculate_hours_worked over minute-of-day arrays.
+        Overnight shifts wrap past midnight; result rounded to 2 decimals.
+        """
+        start = np.asarray(start_minutes, dtype=np.int64)
+        end = np.asarray(end_minutes, dtype=np.int64)
+        breaks = np.maximum(np.asarray(break_minutes, dtype=np.int64), 0)
+        worked = (end - start) % MINUTES_PER_DAY - breaks
+        return np.round(np.maximum(worked, 0) / 60.0, 2)
+
+    def calculate_daily_delta_batch(self, hours_worked) -> np.ndarray:
+        """Signed difference to the daily threshold, in hours (2 decimals)."""
+        return np.round(np.asarray(hours_worked, dtype=np.float64) - self.daily_threshold, 2)
+
+    def calculate_daily_overtime_batch(self, hours_worked) -> np.ndarray:
+        """Vectorized calculate_daily_overtime."""
+        return np.maximum(self.calculate_daily_delta_batch(hours_worked), 0.0)
+
+    def weekly_summary_batch(self, dates, hours_worked) -> Dict[str, np.ndarray]:
+        """
+        One-pass aggregation by ISO week.
+        Returns arrays sorted by (year, week): year, week, hours,
+        delta_minutes (sum of per-day deltas vs daily threshold) and
+        excess_minutes (hours above the weekly threshold).
+        """
+        hours = np.asarray(hours_worked, dtype=np.float64)
+        years, weeks = iso_year_week(dates)
+        keys, inverse = np.unique(years * 100 + weeks, return_inverse=True)
+        daily_delta_min = np.rint((hours - self.daily_threshold) * 60).astype(np.int64)
+        weekly_hours = np.bincount(inverse, weights=hours, minlength=len(keys))
+        weekly_delta = np.bincount(inverse, weights=daily_delta_min, minlength=len(keys)).astype(np.int64)
+        excess = np.rint(np.maximum(weekly_hours - self.weekly_threshold, 0.0) * 60).astype(np.int64)
+        return {
+            "year": keys // 100,
+            "week": keys % 100,
+            "hours": weekly_hours,
+            "delta_minutes": weekly_delta,
+            "excess_minutes": excess,
+        }
+
+    def rollup_minutes_batch(self, hours, worked_minutes, days) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        From pre-aggregated weekly rollups (total hours, sum of per-day rounded
+        minutes, number of days) -> (delta_minutes vs daily threshold, excess_minutes
+        above the weekly threshold). Same results as weekly_summary_batch.
+        """
+        hours = np.asarray(hours, dtype=np.float64)
+        delta = np.asarray(worked_minutes, dtype=np.int64) - np.asarray(days, dtype=np.int64) * round(self.daily_threshold * 60)
+        excess = np.rint(np.maximum(hours - self.weekly_threshold, 0.0) * 60).astype(np.int64)
+        return delta, excess
+
     def complete_shift(self, shift: WorkShift) -> WorkShift:
         """Fills in hours worked and overtime for a given shift."""
         shift.hours_worked = self.calculate_hours_worked(
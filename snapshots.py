@@ -0,0 +1,98 @@
+# snapshots.py
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from typing import Tuple
+
+from domain import ShiftBatch
+from repository import WeekRollupDB, WorkShiftRepository
+
+
+def rango_mes(yyyy_mm: str) -> tuple[date, date]:
+    y, m = map(int, yyyy_mm.split("-"))
+    d1 = date(y, m, 1)
+    d2 = (date(y+1, 1, 1) - timedelta(days=1)) if m == 12 else (date(y, m+1, 1) - timedelta(days=1))
+    return d1, d2
+
+
+@dataclass(frozen=True)
+class MonthSnapshot:
+    """Filas de un mes tal y como estaban en `data_version`. Solo lectura."""
+    yyyy_mm: str
+    data_version: int
+    batch: ShiftBatch  # columnar con ids, una fila por día (índice único), work_date desc
+    weeks: Tuple[WeekRollupDB, ...] = ()  # semanas ISO completas que tocan el mes
+
+    def content_rows(self) -> list[tuple]:
+        """Campos que aparecen en informes, para hashear el contenido del mes.
+        Mismos tipos que las antiguas filas ORM: las claves de la caché de PDF no cambian."""
+        b = self.batch
+        return list(zip(
+            b.ids.tolist(),
+            [date.fromordinal(o) for o in b.work_date.tolist()],
+            [time(*divmod(m, 60)) for m in b.start_minute.tolist()],
+            [time(*divmod(m, 60)) for m in b.end_minute.tolist()],
+            b.break_minutes.tolist(), b.hours_worked.tolist(), b.notes.tolist(),
+        ))
+
+
+class MonthSnapshotCache:
+    """
+    Caché LRU de snapshots por (yyyy_mm, data_version).
+    Un rerun de la página consulta cada mes una sola vez. data_version vive en la BD:
+    cualquier escritura (esta página, la CLI, otro worker, la sincronización de la
+    réplica) hace que la siguiente lectura falle y recargue; las de otros procesos se
+    notan en como mucho DATA_VERSION_TTL_S. Las versiones antiguas se expulsan por tamaño.
+    """
+    def __init__(self, repo: WorkShiftRepository, max_entries: int = 6):
+        self.repo = repo
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple[str, int], MonthSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._months: tuple[int, frozenset[str]] | None = None
+
+    def months_with_data(self) -> frozenset[str]:
+        """Índice de meses con registros, recalculado solo cuando cambia data_version."""
+        version = self.repo.data_version
+        cached = self._months
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        months = frozenset(self.repo.list_months())
+        self._months = (version, months)
+        return months
+
+    def get(self, yyyy_mm: str) -> MonthSnapshot:
+        # La versión se lee ANTES de consultar: si alguien escribe mientras tanto,
+        # el snapshot queda guardado con la versión vieja y no se reutiliza.
+        version = self.repo.data_version
+        key = (yyyy_mm, version)
+        with self._lock:
+            snap = self._entries.get(key)
+            if snap is not None:
+                self._entries.move_to_end(key)
+                return snap
+        d1, d2 = rango_mes(yyyy_mm)
+        snap = MonthSnapshot(
+            yyyy_mm, version,
+            batch=self.repo.list_batch(d1, d2),
+            weeks=tuple(self.repo.list_week_rollups(d1, d2)),
+        )
+        with self._lock:
+            self._entries[key] = snap
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snap
+
+    def invalidate(self, yyyy_mm: str | None = None) -> None:
+        """Descarta los snapshots de un mes (o todos si yyyy_mm es None)."""
+        with self._lock:
+            for key in [k for k in self._entries if yyyy_mm is None or k[0] == yyyy_mm]:
+                del self._entries[key]
+            self._months = None
+
+
+__all__ = ["MonthSnapshot", "MonthSnapshotCache", "rango_mes"]
@@ -0,0 +1,80 @@
+# synthetic.py
+# -----------------------------------------------
+# Histórico sintético para benchmarks: N empleados × Y años de turnos.
+# Incluye turnos nocturnos (cruzan medianoche), días repetidos (correcciones:
+# en un upsert gana el último) y semanas que cruzan de mes. Determinista por semilla.
+# -----------------------------------------------
+from __future__ import annotations
+
+import random
+from datetime import date, time, timedelta
+
+from config import UMBRAL_DIARIO_H
+from domain import WorkShift
+from services import WorkHoursCalculator
+
+NOTAS = (None, None, None, None, "Reunión", "Formación", "Inventario", "Guardia")
+
+
+def _hora(minuto_del_dia: int) -> time:
+    return time(*divmod(minuto_del_dia % (24 * 60), 60))
+
+
+def _turno(rng: random.Random, d: date, calc: WorkHoursCalculator, nocturno: bool) -> WorkShift:
+    if nocturno:
+        inicio = rng.randrange(20 * 60, 23 * 60 + 1, 5)
+    else:
+        inicio = rng.randrange(7 * 60, 10 * 60 + 1, 5)
+    fin = inicio + rng.randrange(5 * 60, 9 * 60 + 1, 5)
+    descanso = rng.choice((0, 15, 30, 30, 30, 45, 60))
+    start, end = _hora(inicio), _hora(fin)
+    hw = calc.calculate_hours_worked(start, end, descanso)
+    return WorkShift(
+        work_date=d, start_time=start, end_time=end, break_minutes=descanso,
+        hours_worked=hw, overtime_hours=round(hw - UMBRAL_DIARIO_H, 2), notes=rng.choice(NOTAS),
+    )
+
+
+def employee_ids(employees: int, prefix: str = "emp") -> list[str]:
+    return [f"{prefix}-{i:03d}" for i in range(employees)]
+
+
+def generate_shifts(
+    employees: int = 3,
+    years: float = 1.0,
+    start: date = date(2024, 1, 1),
+    seed: int = 0,
+    overnight_ratio: float = 0.05,
+    duplicate_ratio: float = 0.02,
+    weekend_ratio: float = 0.10,
+    prefix: str = "emp",
+) -> dict[str, list[WorkShift]]:
+    """
+    {employee_id: turnos en orden cronológico}. L–V se trabaja casi siempre,
+    fines de semana con `weekend_ratio`. Con `duplicate_ratio` un día aparece
+    dos veces (la segunda es la corrección que debe prevalecer).
+    """
+    rng = random.Random(seed)
+    calc = WorkHoursCalculator(daily_threshold=UMBRAL_DIARIO_H)
+    dias = int(round(365 * years))
+    resultado: dict[str, list[WorkShift]] = {}
+    for emp in employee_ids(employees, prefix):
+        turnos: list[WorkShift] = []
+        for i in range(dias):
+            d = start + timedelta(days=i)
+            prob = weekend_ratio if d.weekday() >= 5 else 0.95
+            if rng.random() >= prob:
+                continue
+            turnos.append(_turno(rng, d, calc, nocturno=rng.random() < overnight_ratio))
+            if rng.random() < duplicate_ratio:
+                turnos.append(_turno(rng, d, calc, nocturno=False))
+        resultado[emp] = turnos
+    return resultado
+
+
+def months_spanned(shifts: list[WorkShift]) -> list[str]:
+    """Meses 'YYYY-MM' con turnos, en orden."""
+    return sorted({f"{s.work_date.year:04d}-{s.work_date.month:02d}" for s in shifts})
+
+
+__all__ = ["employee_ids", "generate_shifts", "months_spanned"]
@@ -0,0 +1,44 @@
+# conftest.py
+# -----------------------------------------------
+# Los módulos de la app están en la raíz del repo (sin paquete) y config.py elige
+# DATA_DIR al importarse: se fija una carpeta temporal antes de que ningún test lo importe.
+# -----------------------------------------------
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from datetime import date, time
+from pathlib import Path
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="workhours-tests-"))
+os.environ.setdefault("PERF_LOG", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from domain import WorkShift
+from repository import WorkShiftRepository
+from services import WorkHoursCalculator
+
+
+def turno(d: date, inicio: str = "09:00", fin: str = "17:00", descanso: int = 0,
+          notas: str | None = None) -> WorkShift:
+    """Turno con horas y extras calculadas como al guardarlo desde la página."""
+    h1, m1 = map(int, inicio.split(":"))
+    h2, m2 = map(int, fin.split(":"))
+    s = WorkShift(work_date=d, start_time=time(h1, m1), end_time=time(h2, m2),
+                  break_minutes=descanso, notes=notas)
+    return WorkHoursCalculator().complete_shift(s)
+
+
+@pytest.fixture
+def db_url(tmp_path: Path) -> str:
+    return f"sqlite:///{(tmp_path / 'workhours.db').as_posix()}"
+
+
+@pytest.fixture
+def repo(db_url: str) -> WorkShiftRepository:
+    r = WorkShiftRepository(db_url, version_ttl_s=0)
+    yield r
+    r.engine.dispose()
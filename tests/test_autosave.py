@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import date, time
+
+from conftest import turno
+from repository import WorkShiftRepository
+from services import WorkHoursCalculator
+
+
+def _cambio(repo: WorkShiftRepository, d: date, inicio: time, fin: time, descanso: int) -> dict:
+    calc = WorkHoursCalculator()
+    fila = next(f for f in repo.list_range_rows(d, d))
+    horas = float(calc.calculate_hours_batch(
+        [inicio.hour * 60 + inicio.minute], [fin.hour * 60 + fin.minute], [descanso]
+    )[0])
+    return {"id": fila.id, "start_time": inicio, "end_time": fin, "hours_worked": horas,
+            "overtime_hours": calc.calculate_daily_overtime(horas)}
+
+
+def test_update_times_overnight_shift(repo):
+    d = date(2025, 3, 31)  # último día del mes: el turno sigue contando en marzo
+    repo.add(turno(d, "09:00", "17:00", descanso=30))
+    version = repo.data_version
+    assert repo.update_times([_cambio(repo, d, time(22, 0), time(6, 0), 30)]) == 1
+
+    fila = repo.list_range_rows(d, d)[0]
+    assert (fila.start_time, fila.end_time, fila.hours_worked) == (time(22), time(6), 7.5)
+    assert fila.hours_worked == WorkHoursCalculator().calculate_hours_worked(time(22), time(6), 30)
+    assert repo.month_rollup("2025-03").hours == 7.5
+    assert repo.month_rollup("2025-04") is None
+    assert repo.data_version == version + 1
+
+
+def test_update_times_only_touches_own_employee(repo):
+    d = date(2025, 3, 3)
+    repo.add(turno(d))
+    ana = repo.for_employee("ana")
+    cambio = _cambio(repo, d, time(20), time(2), 0)
+    ana.update_times([cambio])  # filas por id, pero filtradas por empleado
+    assert repo.list_range_rows(d, d)[0].start_time == time(9)
+
+
+def test_update_times_is_one_write(repo):
+    dias = [date(2025, 3, d) for d in (3, 4, 5)]
+    repo.upsert_many([turno(d) for d in dias])
+    version = repo.data_version
+    assert repo.update_times([_cambio(repo, d, time(8), time(12), 0) for d in dias]) == 3
+    assert repo.data_version == version + 1
+    assert repo.month_rollup("2025-03").hours == 12.0
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from conftest import turno
+from importer import import_file
+
+
+def test_upsert_many_counts_and_last_of_batch_wins(repo):
+    assert repo.upsert_many([turno(date(2025, 3, d)) for d in (3, 4)]) == (2, 0)
+    insertadas, actualizadas = repo.upsert_many([
+        turno(date(2025, 3, 4), "08:00", "12:00"),
+        turno(date(2025, 3, 4), "08:00", "13:00"),  # mismo día en el lote: gana el último
+        turno(date(2025, 3, 5)),
+    ])
+    assert (insertadas, actualizadas) == (1, 1)
+    assert [f.hours_worked for f in repo.list_all()] == [8.0, 5.0, 8.0]
+
+
+def test_add_many_keeps_existing_days(repo):
+    repo.add(turno(date(2025, 3, 3), "09:00", "17:00"))
+    assert repo.add_many([turno(date(2025, 3, 3), "09:00", "10:00"), turno(date(2025, 3, 4))]) == 1
+    assert {f.work_date: f.hours_worked for f in repo.list_all()}[date(2025, 3, 3)] == 8.0
+
+
+def test_upsert_many_bumps_version_once_per_batch(repo):
+    repo.upsert_many([turno(date(2025, 3, d)) for d in range(1, 11)], batch_size=4)
+    assert repo.data_version == 3
+
+
+def _csv(tmp_path, filas: list[str]):
+    ruta = tmp_path / "fichajes.csv"
+    ruta.write_text("Fecha,Inicio,Fin,Descanso (min),Notas\n" + "\n".join(filas) + "\n", encoding="utf-8")
+    return ruta
+
+
+def test_import_csv_with_historico_columns(repo, tmp_path):
+    ruta = _csv(tmp_path, ["2025-03-03,09:00,17:00,30,", "04/03/2025,22:00,06:00,0,noche"])
+    assert import_file(repo, ruta) == (2, 0)
+    assert import_file(repo, ruta) == (0, 2)
+    nocturno = repo.list_range_rows(date(2025, 3, 4), date(2025, 3, 4))[0]
+    assert (nocturno.hours_worked, nocturno.notes) == (8.0, "noche")
+
+
+def test_import_bad_record_writes_nothing(repo, tmp_path):
+    filas = [f"2025-03-{d:02d},09:00,17:00,0," for d in range(1, 8)] + ["2025-03-08,nueve,17:00,0,"]
+    with pytest.raises(ValueError, match="Registro 8"):
+        import_file(repo, _csv(tmp_path, filas), batch_size=2)
+    assert repo.list_all() == []
+    assert repo.data_version == 0
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from columnar import MANIFEST_NAME, export_history, monthly_totals, read_history
+from conftest import turno
+
+
+@pytest.fixture
+def historico(repo):
+    repo.upsert_many([turno(date(2025, m, d)) for m in (1, 2, 3) for d in (6, 7)])
+    repo.for_employee("ana").upsert_many([turno(date(2025, 2, 10), "09:00", "13:00")])
+    return repo
+
+
+def test_export_writes_one_file_per_month(historico, tmp_path):
+    res = export_history(historico, tmp_path / "hist")
+    assert res.written == ["2025-01", "2025-02", "2025-03"] and res.rows == 7
+    manifest = json.loads((tmp_path / "hist" / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert sorted(manifest["months"]) == res.written
+    assert manifest["months"]["2025-02"]["employees"] == ["ana", "default"]
+
+    tabla = read_history(tmp_path / "hist")
+    assert tabla.num_rows == 7
+    assert read_history(tmp_path / "hist", employees=["ana"]).num_rows == 1
+    assert read_history(tmp_path / "hist", start=date(2025, 3, 1)).num_rows == 2
+
+
+def test_second_export_only_rewrites_changed_months(historico, tmp_path):
+    export_history(historico, tmp_path / "hist")
+    sin_cambios = export_history(historico, tmp_path / "hist")
+    assert sin_cambios.written == [] and sin_cambios.unchanged == 3
+
+    historico.add(turno(date(2025, 2, 6), "09:00", "12:00"))
+    res = export_history(historico, tmp_path / "hist")
+    assert res.written == ["2025-02"] and res.unchanged == 2
+    assert res.rows == 7  # los meses de "default": los de "ana" ni se leen
+    horas = {(r["month"], r["employee_id"]): r["hours"] for r in monthly_totals(tmp_path / "hist").to_pylist()}
+    assert horas[("2025-02", "default")] == 11.0
+
+
+def test_format_change_rewrites_everything(historico, tmp_path):
+    export_history(historico, tmp_path / "hist", fmt="parquet")
+    res = export_history(historico, tmp_path / "hist", fmt="arrow")
+    assert res.written == ["2025-01", "2025-02", "2025-03"]
+    assert not list((tmp_path / "hist").glob("month=*/*.parquet"))
+    assert read_history(tmp_path / "hist").num_rows == 7
+
+
+def test_export_without_writes_reads_no_rows(historico, tmp_path):
+    export_history(historico, tmp_path / "hist")
+    res = export_history(historico, tmp_path / "hist")
+    assert res.rows == 0 and res.unchanged == 3
+
+    historico.for_employee("ana").upsert_many([turno(date(2025, 2, 10), "09:00", "13:00")])  # mismos datos
+    res = export_history(historico, tmp_path / "hist")
+    assert res.rows == 3 and res.written == [] and res.unchanged == 3
+
+
+def test_export_rewrites_month_with_missing_file(historico, tmp_path):
+    export_history(historico, tmp_path / "hist")
+    next((tmp_path / "hist").glob("month=2025-01/*")).unlink()
+    res = export_history(historico, tmp_path / "hist")
+    assert res.written == ["2025-01"] and res.unchanged == 2
+    assert read_history(tmp_path / "hist").num_rows == 7
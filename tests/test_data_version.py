@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from datetime import date
+
+from conftest import turno
+from repository import WorkShiftRepository
+from snapshots import MonthSnapshotCache
+
+
+def test_months_with_data_follows_writes(repo):
+    cache = MonthSnapshotCache(repo)
+    assert cache.months_with_data() == frozenset()
+    repo.upsert_many([turno(date(2025, 3, 3)), turno(date(2025, 4, 1))])
+    assert cache.months_with_data() == {"2025-03", "2025-04"}
+
+
+def test_version_is_stored_per_employee(repo):
+    repo.add(turno(date(2025, 3, 3)))
+    assert repo.data_version == 1
+    assert repo.for_employee("ana").data_version == 0
+    assert repo.bump_data_version() == 2
+
+
+def test_write_from_another_instance_invalidates(repo, db_url):
+    """Otro proceso (CLI, otro worker) escribe en la misma BD: data_version está en la BD."""
+    cache = MonthSnapshotCache(repo)  # version_ttl_s=0: relee la versión en cada consulta
+    repo.add(turno(date(2025, 3, 3)))
+    snap = cache.get("2025-03")
+
+    otro = WorkShiftRepository(db_url)
+    otro.add(turno(date(2025, 3, 4)))
+    assert cache.get("2025-03") is not snap
+    assert len(cache.get("2025-03").batch) == 2
+    otro.engine.dispose()
+
+
+def test_version_ttl_bounds_rereads(db_url):
+    lento = WorkShiftRepository(db_url, version_ttl_s=3600)
+    cache = MonthSnapshotCache(lento)
+    snap = cache.get("2025-03")
+
+    otro = WorkShiftRepository(db_url)
+    otro.add(turno(date(2025, 3, 3)))
+    assert cache.get("2025-03") is snap          # dentro del TTL: sin releer la versión
+    lento.add(turno(date(2025, 3, 4)))           # una escritura propia la relee al momento
+    assert len(cache.get("2025-03").batch) == 2
+    for r in (lento, otro):
+        r.engine.dispose()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from archiver import EmployeeArchivers
+from conftest import turno
+from pdf_cache import PdfCache
+from reports import MonthReports
+from repository import DEFAULT_EMPLOYEE, validate_employee_id
+from snapshots import MonthSnapshotCache
+
+
+def test_employees_do_not_share_days(repo):
+    repo.add(turno(date(2025, 3, 3)))
+    repo.for_employee("ana").add(turno(date(2025, 3, 3), "09:00", "11:00"))
+    assert len(repo.list_all()) == 1
+    assert [f.hours_worked for f in repo.for_employee("ana").list_all()] == [2.0]
+    assert repo.list_employees() == ["ana", DEFAULT_EMPLOYEE]
+
+
+@pytest.mark.parametrize("employee_id", ["", ".", "..", "a.b", "a/b", "x" * 65])
+def test_rejects_unsafe_employee_ids(repo, employee_id):
+    with pytest.raises(ValueError):
+        validate_employee_id(employee_id)
+    with pytest.raises(ValueError):
+        repo.for_employee(employee_id)
+
+
+def test_employees_have_separate_versions(repo):
+    ana = repo.for_employee("ana")
+    cache = MonthSnapshotCache(repo)
+    repo.add(turno(date(2025, 3, 3)))
+    snap = cache.get("2025-03")
+    ana.add(turno(date(2025, 3, 3)))
+    assert cache.get("2025-03") is snap
+
+
+def _archivers(repo, tmp_path, max_cached):
+    return EmployeeArchivers(
+        repo, lambda r: MonthReports(MonthSnapshotCache(r), PdfCache(None)),
+        lambda emp: tmp_path / emp, grace_days=0, max_cached=max_cached,
+    )
+
+
+def test_archivers_stay_bounded(repo, tmp_path):
+    for emp in ("ana", "luis", "marta", "pepe"):
+        repo.for_employee(emp).add(turno(date(2025, 3, 3)))
+    archivers = _archivers(repo, tmp_path, max_cached=2)
+    ana = archivers.get("ana")
+
+    hechos = archivers.run_due(date(2025, 4, 10))
+    assert sorted(hechos) == ["ana", "luis", "marta", "pepe"]
+    assert all(meses == ["2025-03"] for meses in hechos.values())
+    assert len(archivers) == 1  # el hilo de fondo no llena el LRU
+
+    archivers.get("luis")
+    archivers.get("marta")
+    assert len(archivers) == 2
+    assert archivers.get("ana") is not ana  # expulsado: se vuelve a crear
+    assert list(archivers.get("pepe").listing()) == ["2025-03"]
+
+
+def test_archiver_error_survives_eviction(repo, tmp_path):
+    repo.for_employee("ana").add(turno(date(2025, 3, 3)))
+    (tmp_path / "ana" / "manifest.json").mkdir(parents=True)  # el manifest no se puede escribir
+    archivers = _archivers(repo, tmp_path, max_cached=1)
+    archivers.run_due(date(2025, 4, 10))
+    assert archivers.get("ana").last_error
+    archivers.get("luis")
+    assert archivers.get("ana").last_error  # recreado tras la expulsión, conserva el error
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+import time
+import zipfile
+from datetime import date
+
+import pytest
+
+from conftest import turno
+from export import export_zip, limpia_exportaciones, meses_del_anio, nuevo_zip_temporal
+from pdf_cache import PdfCache
+from reports import MonthReports
+from snapshots import MonthSnapshotCache
+
+
+@pytest.fixture
+def reports(repo):
+    repo.add_many([turno(date(2025, m, 3)) for m in (1, 2, 5)])
+    return MonthReports(MonthSnapshotCache(repo), PdfCache(None))
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_export_zip_one_pdf_per_month_with_data(reports, tmp_path, processes):
+    ruta = nuevo_zip_temporal(tmp_path, "reportes_")
+    avances = []
+    res = export_zip(reports, meses_del_anio(2025), ruta, workers=2, processes=processes,
+                     progress=lambda hechos, total: avances.append((hechos, total)))
+    assert res.months == ["2025-01", "2025-02", "2025-05"]
+    assert len(res.skipped) == 9
+    assert (res.rendered, res.cached) == (3, 0)
+    assert avances[-1] == (3, 3)
+    with zipfile.ZipFile(ruta) as zf:
+        assert sorted(zf.namelist()) == [f"reporte_{m}.pdf" for m in res.months]
+        assert zf.read("reporte_2025-01.pdf").startswith(b"%PDF")
+
+
+def test_export_zip_reuses_cached_pdfs(reports, tmp_path):
+    export_zip(reports, meses_del_anio(2025), tmp_path / "a.zip", processes=False)
+    res = export_zip(reports, meses_del_anio(2025), tmp_path / "b.zip", processes=False)
+    assert (res.rendered, res.cached) == (0, 3)
+
+
+def test_limpia_exportaciones_only_old_zips(tmp_path):
+    viejo = nuevo_zip_temporal(tmp_path, "viejo_")
+    nuevo = nuevo_zip_temporal(tmp_path, "nuevo_")
+    hace_dos_dias = time.time() - 2 * 24 * 3600
+    os.utime(viejo, (hace_dos_dias, hace_dos_dias))
+    assert limpia_exportaciones(tmp_path, 24 * 3600) == 1
+    assert not viejo.exists() and nuevo.exists()
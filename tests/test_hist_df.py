@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from config import UMBRAL_DIARIO_H
+from conftest import turno
+from formatting import formatea_minutos_signed
+from reports import df_para_pdf, hist_df_desde_batch, hist_df_desde_filas
+from snapshots import MonthSnapshotCache, rango_mes
+
+
+def _hist_df_por_filas(filas) -> pd.DataFrame:
+    """El Histórico como se construía antes: un dict por fila, formato celda a celda."""
+    dias = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+    rows = []
+    for f in filas:
+        hw = float(f.hours_worked or 0.0)
+        delta_min = int(round((hw - UMBRAL_DIARIO_H) * 60))
+        rows.append({
+            "ID": f.id,
+            "Fecha": f.work_date.isoformat(),
+            "Día": dias[f.work_date.weekday()],
+            "Inicio": f.start_time.strftime("%H:%M"),
+            "Fin": f.end_time.strftime("%H:%M"),
+            "Descanso (min)": int(f.break_minutes),
+            "Horas": round(hw, 2),
+            "Extras (min)": delta_min,
+            "Extras": formatea_minutos_signed(delta_min),
+            "Notas": f.notes or "",
+        })
+    return pd.DataFrame(rows)
+
+
+def _mes_variado(repo) -> None:
+    horarios = [("09:00", "17:35", 30), ("22:00", "06:00", 0), ("08:00", "09:05", 0),
+                ("07:15", "19:50", 45), ("10:00", "10:00", 0), ("06:00", "12:00", 0)]
+    repo.upsert_many([
+        turno(date(2025, 3, 1) + timedelta(days=i), ini, fin, desc, notas="nota" if i % 3 == 0 else None)
+        for i, (ini, fin, desc) in enumerate(horarios * 5)
+    ])
+
+
+def test_hist_df_matches_row_builder(repo):
+    _mes_variado(repo)
+    filas = repo.list_range_rows(*rango_mes("2025-03"))
+    esperado = _hist_df_por_filas(filas)
+    pd.testing.assert_frame_equal(hist_df_desde_filas(filas), esperado)
+    pd.testing.assert_frame_equal(hist_df_desde_batch(MonthSnapshotCache(repo).get("2025-03").batch), esperado)
+
+
+def test_hist_df_dtypes(repo):
+    _mes_variado(repo)
+    df = hist_df_desde_batch(MonthSnapshotCache(repo).get("2025-03").batch)
+    esperado = _hist_df_por_filas(repo.list_range_rows(*rango_mes("2025-03")))
+    assert df.dtypes.to_dict() == esperado.dtypes.to_dict()
+    for col in ("ID", "Descanso (min)", "Extras (min)"):
+        assert df[col].dtype == "int64"
+    assert df["Horas"].dtype == "float64"
+
+
+def test_hist_df_empty_month(repo):
+    df = hist_df_desde_batch(MonthSnapshotCache(repo).get("2025-03").batch)
+    assert df.empty
+    assert df_para_pdf(df) == (df, 0.0, 0)
+
+
+def test_df_para_pdf_totals(repo):
+    _mes_variado(repo)
+    df = hist_df_desde_batch(MonthSnapshotCache(repo).get("2025-03").batch)
+    tabla, horas, extras = df_para_pdf(df)
+    assert list(tabla.columns) == ["Fecha", "Día", "Inicio", "Fin", "Descanso (min)", "Extras", "Notas", "Horas"]
+    assert horas == pytest.approx(df["Horas"].sum())
+    assert extras == int(df["Extras (min)"].sum())
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import os
+
+from pdf_cache import PdfCache, content_key
+
+
+def test_content_key_changes_with_rows_and_params():
+    filas = [(1, "2025-03-03", 540, 1020)]
+    assert content_key(filas, "ana", "2025-03") == content_key(list(filas), "ana", "2025-03")
+    assert content_key(filas, "ana", "2025-03") != content_key(filas, "luis", "2025-03")
+    assert content_key(filas, "ana") != content_key(filas + [(2, "2025-03-04", 540, 1020)], "ana")
+
+
+def test_render_only_on_miss(tmp_path):
+    cache = PdfCache(tmp_path)
+    renders = []
+    render = lambda: renders.append(1) or b"%PDF-1"
+    assert cache.get_or_render("k", render) == b"%PDF-1"
+    assert cache.get_or_render("k", render) == b"%PDF-1"
+    assert PdfCache(tmp_path).get_or_render("k", render) == b"%PDF-1"  # otro proceso: desde disco
+    assert len(renders) == 1
+    cache.put("vacio", b"")  # un render fallido no se cachea
+    assert not cache.peek("vacio")
+
+
+def test_disk_eviction_is_lru(tmp_path):
+    cache = PdfCache(tmp_path, max_memory_items=1, max_disk_items=2)
+    cache.put("a", b"A")
+    cache.put("b", b"B")
+    for i, nombre in enumerate(("a", "b")):  # mtimes explícitos: "a" es el más antiguo
+        os.utime(tmp_path / f"{nombre}.pdf", (1_000 + i, 1_000 + i))
+    assert PdfCache(tmp_path).get("a") == b"A"  # acierto en disco: "a" pasa a reciente
+    cache.put("c", b"C")
+    assert sorted(p.stem for p in tmp_path.glob("*.pdf")) == ["a", "c"]
+
+
+def test_caches_in_separate_folders_keep_their_own_limit(tmp_path):
+    ana = PdfCache(tmp_path / "ana", max_disk_items=1)
+    luis = PdfCache(tmp_path / "luis", max_disk_items=1)
+    ana.put("a1", b"A")
+    luis.put("l1", b"L")
+    luis.put("l2", b"L")
+    assert [p.stem for p in (tmp_path / "ana").glob("*.pdf")] == ["a1"]
+    assert [p.stem for p in (tmp_path / "luis").glob("*.pdf")] == ["l2"]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from conftest import turno
+from domain import ShiftBatch
+from reports import df_para_pdf, hist_df_desde_batch
+
+
+# =========================
+# PDF: renderer con anchos precalculados frente a Table midiendo cada celda
+# =========================
+@pytest.fixture
+def renderers(monkeypatch):
+    pytest.importorskip("reportlab")
+    from reportlab import rl_config
+    from pdf_render import PdfRenderer
+    monkeypatch.setattr(rl_config, "invariant", 1)  # sin fecha ni id aleatorio: bytes comparables
+    return PdfRenderer(), PdfRenderer(fixed_widths=False)
+
+
+def _tabla_pdf(n: int) -> pd.DataFrame:
+    horarios = [("09:00", "17:35", 30), ("22:00", "06:00", 0), ("07:15", "19:50", 45)]
+    shifts = [
+        turno(date(2025, 1, 1) + timedelta(days=i), *horarios[i % 3], notas="nota larga" if i % 7 == 0 else None)
+        for i in range(n)
+    ]
+    return df_para_pdf(hist_df_desde_batch(ShiftBatch.from_shifts(shifts)))[0]
+
+
+def test_pdf_bytes_match_measured_table(renderers):
+    rapido, medido = renderers
+    for n in range(0, 200):
+        df = _tabla_pdf(n)
+        args = (df, "Registro — Mes de prueba", "Horas extras: 2 h", "Total bruto: 1.000,00 €")
+        assert rapido.render(*args) == medido.render_platypus(*args), f"{n} filas"
+
+
+def test_pdf_canvas_path_for_large_tables(renderers):
+    rapido, medido = renderers
+    df = _tabla_pdf(450)
+    lienzo = rapido.render(df, "Registro", "l1", "l2")
+    platypus = medido.render_platypus(df, "Registro", "l1", "l2")
+    # Dibujada directamente (otros bytes) pero con la misma paginación
+    assert lienzo.startswith(b"%PDF") and lienzo != platypus
+    assert lienzo.count(b"/Type /Page\n") == platypus.count(b"/Type /Page\n") > 1
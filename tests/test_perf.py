@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import perf
+from conftest import turno
+
+
+@pytest.fixture
+def medida(repo):
+    perf.instrument_engine(repo.engine)
+    stats = perf.begin("test")
+    yield stats
+    perf.end()
+
+
+def test_counts_queries_and_rows_read(repo, medida):
+    repo.upsert_many([turno(date(2025, 3, d)) for d in (3, 4, 5)])
+    antes = medida.queries
+    assert len(repo.list_range_rows(date(2025, 3, 1), date(2025, 3, 31))) == 3
+    assert medida.queries > antes
+    filas = medida.rows
+    assert len(repo.list_batch(date(2025, 3, 1), date(2025, 3, 4))) == 2
+    assert medida.rows == filas + 2
+
+
+def test_failed_statement_does_not_leak_timer(repo, medida):
+    with repo.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_existe"))
+        assert conn.info.get("perf_t0") == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["perf_t0"] == []
+
+
+def test_emit_only_when_asked(monkeypatch, capsys):
+    monkeypatch.delenv("PERF_LOG", raising=False)
+    perf.emit({"event": "rerun"})
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv("PERF_LOG", "1")
+    monkeypatch.setattr(perf.log, "handlers", [])
+    perf.emit({"event": "rerun", "total_ms": 1.5})
+    assert json.loads(capsys.readouterr().out) == {"event": "rerun", "total_ms": 1.5}
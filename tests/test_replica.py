@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from sqlalchemy import event, select
+
+from conftest import turno
+from replica import ReplicatedWorkShiftRepository, conflicts
+from repository import WorkShiftRepository
+
+
+@pytest.fixture
+def remoto(tmp_path):
+    r = WorkShiftRepository(f"sqlite:///{(tmp_path / 'remote.db').as_posix()}", version_ttl_s=0)
+    yield r
+    r.engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path, remoto):
+    r = ReplicatedWorkShiftRepository(remoto.primary_url, tmp_path / "replica.db")
+    yield r
+    r.stop_sync()
+    r.engine.dispose()
+
+
+def _horas(repo: WorkShiftRepository) -> dict[date, float]:
+    return {f.work_date: f.hours_worked for f in repo.list_all()}
+
+
+def test_bootstrap_pulls_existing_remote(tmp_path, remoto):
+    remoto.for_employee("ana").upsert_many([turno(date(2025, 3, d)) for d in (3, 4)])
+    replica = ReplicatedWorkShiftRepository(remoto.primary_url, tmp_path / "replica.db")
+    assert _horas(replica.for_employee("ana")) == {date(2025, 3, 3): 8.0, date(2025, 3, 4): 8.0}
+    assert replica.for_employee("ana").month_rollup("2025-03").days == 2
+
+
+def test_push_uploads_outbox(replica, remoto):
+    replica.add(turno(date(2025, 3, 3)))
+    replica.add(turno(date(2025, 3, 3), "09:00", "12:00"))  # dos ediciones, un día
+    assert replica.pending() == 2
+    assert replica.push() == 1
+    assert replica.pending() == 0
+    assert _horas(remoto) == {date(2025, 3, 3): 3.0}
+    assert remoto.month_rollup("2025-03").hours == 3.0
+
+
+def test_pull_brings_remote_changes_and_bumps_version(replica, remoto):
+    version = replica.data_version
+    remoto.add(turno(date(2025, 3, 3), "09:00", "13:00"))
+    assert replica.pull() == 1
+    assert _horas(replica) == {date(2025, 3, 3): 4.0}
+    assert replica.month_rollup("2025-03").hours == 4.0
+    assert replica.data_version > version
+
+
+def test_pull_keeps_pending_local_day(replica, remoto):
+    replica.add(turno(date(2025, 3, 3), "09:00", "11:00"))
+    remoto.add(turno(date(2025, 3, 3), "09:00", "18:00"))
+    replica.pull()
+    assert _horas(replica) == {date(2025, 3, 3): 2.0}
+    assert replica.pending() == 1
+
+
+def test_push_does_not_overwrite_newer_remote_day(replica, remoto):
+    remoto.add(turno(date(2025, 3, 3)))
+    replica.pull()
+    replica.add(turno(date(2025, 3, 3), "09:00", "11:00"))   # edición sobre el valor bajado
+    remoto.add(turno(date(2025, 3, 3), "09:00", "18:00"))    # otro lo cambia antes de subirla
+    version = replica.data_version
+    assert replica.push() == 0
+    assert _horas(remoto) == {date(2025, 3, 3): 9.0}
+    assert _horas(replica) == {date(2025, 3, 3): 9.0}        # gana el remoto
+    assert replica.month_rollup("2025-03").hours == 9.0
+    assert replica.data_version > version
+    assert replica.pending() == 0
+    assert replica.sync_status()["conflicts"] == 1
+    with replica.engine.connect() as conn:
+        guardada = conn.execute(select(conflicts.c.work_date, conflicts.c.hours_worked)).all()
+    assert guardada == [(date(2025, 3, 3), 2.0)]             # la edición local no se pierde
+
+
+def test_push_after_sync_overwrites(replica, remoto):
+    remoto.add(turno(date(2025, 3, 3)))
+    replica.pull()
+    replica.add(turno(date(2025, 3, 3), "09:00", "11:00"))
+    replica.add(turno(date(2025, 3, 4)))                      # día nuevo en los dos lados
+    assert replica.push() == 2
+    replica.add(turno(date(2025, 3, 3), "09:00", "12:00"))    # la base es ahora lo subido
+    assert replica.push() == 1
+    assert _horas(remoto) == {date(2025, 3, 3): 3.0, date(2025, 3, 4): 8.0}
+    assert replica.sync_status()["conflicts"] == 0
+
+
+def test_pull_is_incremental(replica, remoto):
+    remoto.for_employee("ana").add(turno(date(2025, 3, 3)))
+    remoto.for_employee("luis").add(turno(date(2025, 3, 3)))
+    assert replica.pull() == 2
+
+    sentencias: list[tuple[str, object]] = []
+    event.listen(replica._remote().engine, "before_cursor_execute",
+                 lambda conn, cur, sql, params, ctx, many: sentencias.append((sql, params)))
+
+    # Sin cambios en el remoto: solo se lee data_version
+    assert replica.pull() == 0
+    assert not [s for s, _ in sentencias if "FROM workshiftdb" in s]
+
+    # Un cambio de luis: solo se leen sus filas
+    remoto.for_employee("luis").add(turno(date(2025, 3, 4)))
+    sentencias.clear()
+    assert replica.pull() == 1
+    lecturas = [p for s, p in sentencias if "FROM workshiftdb" in s]
+    assert len(lecturas) == 1 and "luis" in lecturas[0] and "ana" not in lecturas[0]
+    assert sorted(_horas(replica.for_employee("luis"))) == [date(2025, 3, 3), date(2025, 3, 4)]
+
+
+def test_outbox_from_before_base_is_pushed_unchecked(tmp_path, remoto):
+    ruta = tmp_path / "replica.db"
+    antigua = ReplicatedWorkShiftRepository(remoto.primary_url, ruta)
+    antigua.add(turno(date(2025, 3, 3), "09:00", "11:00"))
+    with antigua.engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE replica_base")   # réplica de antes de replica_base
+    antigua.engine.dispose()
+    remoto.add(turno(date(2025, 3, 3)))
+
+    replica = ReplicatedWorkShiftRepository(remoto.primary_url, ruta)
+    assert replica.push() == 1
+    assert _horas(remoto) == {date(2025, 3, 3): 2.0}
+    replica.engine.dispose()
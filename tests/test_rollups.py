@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import date
+
+from conftest import turno
+from services import WorkHoursCalculator
+
+
+def test_rollups_follow_writes(repo):
+    repo.upsert_many([turno(date(2025, 3, d)) for d in (3, 4, 10)])
+    mes = repo.month_rollup("2025-03")
+    assert (mes.hours, mes.worked_minutes, mes.days) == (24.0, 1440, 3)
+    semanas = repo.list_week_rollups(date(2025, 3, 1), date(2025, 3, 31))
+    assert sorted((w.week_start, w.days) for w in semanas) == [(date(2025, 3, 3), 2), (date(2025, 3, 10), 1)]
+
+
+def test_week_crossing_months_is_one_rollup(repo):
+    repo.upsert_many([turno(date(2025, 3, 31)), turno(date(2025, 4, 1), "09:00", "13:00")])
+    [semana] = repo.list_week_rollups(date(2025, 3, 31), date(2025, 4, 6))
+    assert (semana.week_start, semana.hours, semana.days) == (date(2025, 3, 31), 12.0, 2)
+    assert repo.month_rollup("2025-03").hours == 8.0
+    assert repo.month_rollup("2025-04").hours == 4.0
+
+
+def test_rollup_minutes_match_per_day_summary(repo):
+    turnos = [turno(date(2025, 3, d), "09:00", "17:35", 30) for d in range(3, 10)]
+    repo.upsert_many(turnos)
+    calc = WorkHoursCalculator(daily_threshold=6.0, weekly_threshold=30.0)
+    [w] = repo.list_week_rollups(date(2025, 3, 3), date(2025, 3, 9))
+    delta, exceso = calc.rollup_minutes_batch([w.hours], [w.worked_minutes], [w.days])
+    esperado = calc.weekly_summary_batch([t.work_date for t in turnos], [t.hours_worked for t in turnos])
+    assert (int(delta[0]), int(exceso[0])) == (int(esperado["delta_minutes"][0]), int(esperado["excess_minutes"][0]))
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from datetime import date
+
+from conftest import turno
+from snapshots import MonthSnapshotCache
+
+
+def test_snapshot_reused_until_write(repo):
+    cache = MonthSnapshotCache(repo)
+    repo.add(turno(date(2025, 3, 3)))
+    snap = cache.get("2025-03")
+    assert cache.get("2025-03") is snap
+    assert len(snap.batch) == 1
+
+    repo.add(turno(date(2025, 3, 4)))
+    nuevo = cache.get("2025-03")
+    assert nuevo is not snap and len(nuevo.batch) == 2
+    assert nuevo.data_version > snap.data_version
+
+
+def test_invalidate_drops_month(repo):
+    cache = MonthSnapshotCache(repo)
+    repo.add(turno(date(2025, 3, 3)))
+    snap = cache.get("2025-03")
+    otro = cache.get("2025-04")
+    cache.invalidate("2025-03")
+    assert cache.get("2025-03") is not snap
+    assert cache.get("2025-04") is otro
+
+
+def test_lru_evicts_oldest_month(repo):
+    cache = MonthSnapshotCache(repo, max_entries=2)
+    enero = cache.get("2025-01")
+    cache.get("2025-02")
+    cache.get("2025-03")
+    assert cache.get("2025-01") is not enero
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import date, time
+
+import pytest
+from sqlalchemy import Column, Date, Float, Index, Integer, MetaData, String, Table, Time, create_engine, inspect, select
+
+from conftest import turno
+from repository import (
+    DEFAULT_EMPLOYEE, SCHEMA_VERSION, SchemaVersionDB, WorkShiftDB, WorkShiftRepository, _dialect_insert,
+)
+
+
+def _filas(repo: WorkShiftRepository) -> list[tuple]:
+    t = WorkShiftDB.__table__
+    with repo.engine.connect() as conn:
+        return conn.execute(
+            select(t.c.employee_id, t.c.work_date, t.c.start_time, t.c.hours_worked).order_by(t.c.id)
+        ).all()
+
+
+def test_add_replaces_same_day(repo):
+    repo.add(turno(date(2025, 3, 3), "09:00", "17:00"))
+    repo.add(turno(date(2025, 3, 3), "10:00", "14:00"))
+    assert _filas(repo) == [(DEFAULT_EMPLOYEE, date(2025, 3, 3), time(10), 4.0)]
+
+
+def test_unsupported_database_fails_on_construction():
+    with pytest.raises(ValueError, match="no soportada: 'mysql'.*postgresql, sqlite"):
+        WorkShiftRepository("mysql://u:p@localhost/horas")
+    with pytest.raises(ValueError, match="no soportada"):
+        _dialect_insert("oracle", WorkShiftDB.__table__)
+
+
+# =========================
+# Migración de BDs anteriores
+# =========================
+def _bd_antigua(url: str, filas: list[tuple]) -> None:
+    """Esquema original: sin employee_id, índice no único por día y sin acumulados."""
+    meta = MetaData()
+    t = Table(
+        "workshiftdb", meta,
+        Column("id", Integer, primary_key=True),
+        Column("work_date", Date, nullable=False),
+        Column("start_time", Time, nullable=False),
+        Column("end_time", Time, nullable=False),
+        Column("break_minutes", Integer, nullable=False),
+        Column("hours_worked", Float, nullable=False),
+        Column("overtime_hours", Float, nullable=False),
+        Column("notes", String),
+    )
+    Index("ix_workshiftdb_work_date", t.c.work_date)
+    engine = create_engine(url)
+    meta.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(t.insert(), [
+            {"id": i, "work_date": d, "start_time": time(h1), "end_time": time(h2), "break_minutes": 0,
+             "hours_worked": float(h2 - h1), "overtime_hours": 0.0, "notes": None}
+            for i, d, h1, h2 in filas
+        ])
+    engine.dispose()
+
+
+def test_migration_compacts_duplicates_and_backfills(db_url):
+    _bd_antigua(db_url, [
+        (1, date(2025, 3, 3), 9, 17),
+        (2, date(2025, 3, 3), 9, 13),   # duplicado posterior: es el que se queda
+        (3, date(2025, 3, 4), 9, 15),
+    ])
+    repo = WorkShiftRepository(db_url)
+    assert repo.schema_upgraded
+
+    assert _filas(repo) == [(DEFAULT_EMPLOYEE, date(2025, 3, 3), time(9), 4.0),
+                            (DEFAULT_EMPLOYEE, date(2025, 3, 4), time(9), 6.0)]
+    indices = {ix["name"]: ix for ix in inspect(repo.engine).get_indexes("workshiftdb")}
+    assert "ix_workshiftdb_work_date" not in indices
+    unico = indices["ux_workshiftdb_employee_work_date"]
+    assert unico["unique"] and unico["column_names"] == ["employee_id", "work_date"]
+
+    mes = repo.month_rollup("2025-03")
+    assert (mes.hours, mes.days) == (10.0, 2)
+    assert repo.data_versions() == {DEFAULT_EMPLOYEE: 1}
+    with repo.engine.connect() as conn:
+        assert conn.execute(select(SchemaVersionDB.version)).scalar() == SCHEMA_VERSION
+    repo.engine.dispose()
+
+    # Segunda apertura: misma versión de esquema, sin DDL
+    assert not WorkShiftRepository(db_url).schema_upgraded
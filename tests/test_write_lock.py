@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from conftest import turno
+from repository import WorkShiftRepository
+
+
+def _sentencias(repo: WorkShiftRepository) -> list[str]:
+    vistas: list[str] = []
+    event.listen(repo.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: vistas.append(statement.split()[0:2]))
+    return vistas
+
+
+def test_writes_begin_immediate_reads_plain_begin(repo):
+    assert repo.engine.sqlite_profile == "wal"
+    vistas = _sentencias(repo)
+    repo.add(turno(date(2025, 3, 3)))
+    assert vistas[0] == ["BEGIN", "IMMEDIATE"]
+    vistas.clear()
+    repo.list_range_rows(date(2025, 3, 1), date(2025, 3, 31))
+    assert vistas[0] == ["BEGIN"]
+
+
+def test_off_profile_leaves_transactions_to_the_driver(db_url):
+    repo = WorkShiftRepository(db_url, sqlite_profile="off", version_ttl_s=0)
+    vistas = _sentencias(repo)
+    repo.add(turno(date(2025, 3, 3)))
+    assert ["BEGIN", "IMMEDIATE"] not in vistas
+    assert not repo.write_lock.enabled
+    repo.engine.dispose()
+
+
+def test_concurrent_writers_take_turns(repo):
+    errores = []
+
+    def escribe(emp: str) -> None:
+        try:
+            scoped = repo.for_employee(emp)
+            for i in range(10):
+                scoped.add(turno(date(2025, 3, 1) + timedelta(days=i)))
+        except Exception as e:  # se comprueba abajo
+            errores.append(e)
+
+    hilos = [threading.Thread(target=escribe, args=(f"emp-{n}",)) for n in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
+    assert repo.write_lock.snapshot()["writes"] == 40
+    assert all(len(repo.for_employee(f"emp-{n}").list_all()) == 10 for n in range(4))
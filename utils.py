@@ -1,23 +1,43 @@
-# utils.py
-import pandas as pd
+from __future__ import annotations
+
+import numpy as np
 from typing import Iterable
-from domain import WorkShift
+from domain import ShiftBatch, WorkShift
+from formatting import HHMM
+from lazy import lazy_module
+from services import iso_year_week
+
+pd = lazy_module("pandas")
+
+def batch_frame(batch: ShiftBatch) -> pd.DataFrame:
+    """Typed DataFrame over the batch arrays (numeric columns are not copied)."""
+    return pd.DataFrame({
+        "work_date": batch.dates(),
+        "start_minute": batch.start_minute,
+        "end_minute": batch.end_minute,
+        "break_minutes": batch.break_minutes,
+        "hours_worked": batch.hours_worked,
+        "overtime_hours": batch.overtime_hours,
+        "notes": batch.notes,
+    }, copy=False)
+
+def _batch_to_dataframe(batch: ShiftBatch) -> pd.DataFrame:
+    order = np.argsort(-batch.work_date.astype(np.int64), kind="stable")
+    dates = batch.dates()[order]
+    years, weeks = iso_year_week(dates)
+    notes = batch.notes[order]
+    return pd.DataFrame({
+        "Date": np.datetime_as_string(dates, unit="D").astype(object),
+        "ISO Week": (pd.Series(years).astype(str) + "-W" + pd.Series(weeks).astype(str).str.zfill(2)).to_numpy(),
+        "Start": HHMM[batch.start_minute[order]],
+        "End": HHMM[batch.end_minute[order]],
+        "Break (min)": batch.break_minutes[order].astype(np.int64),
+        "Hours Worked": batch.hours_worked[order],
+        "Overtime (daily)": batch.overtime_hours[order],
+        "Notes": np.where(pd.isna(notes), "", notes).astype(object),
+    }, copy=False)
 
-def shifts_to_dataframe(shifts: Iterable[WorkShift]) -> pd.DataFrame:
-    rows = []
-    for s in shifts:
-        year, week = s.iso_year_week
-        rows.append({
-            "Date": s.work_date.isoformat(),
-            "ISO Week": f"{year}-W{week:02d}",
-            "Start": s.start_time.strftime("%H:%M"),
-            "End": s.end_time.strftime("%H:%M"),
-            "Break (min)": s.break_minutes,
-            "Hours Worked": s.hours_worked,
-            "Overtime (daily)": s.overtime_hours,
-            "Notes": s.notes or ""
-        })
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df = df.sort_values(["Date"], ascending=False).reset_index(drop=True)
-    return df
+def shifts_to_dataframe(shifts: Iterable[WorkShift] | ShiftBatch) -> pd.DataFrame:
+    """Newest first; WorkShift iterables are packed into a ShiftBatch so every column is built vectorized."""
+    batch = shifts if isinstance(shifts, ShiftBatch) else ShiftBatch.from_shifts(shifts)
+    return _batch_to_dataframe(batch) if len(batch) else pd.DataFrame()